@@ -11,15 +11,79 @@ GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "dummy_key_for_development")
 if not GEMINI_API_KEY or GEMINI_API_KEY == "dummy_key_for_development":
     print("Warning: Using dummy Gemini API key. AI responses will not work.")
 
-# Telegram Channel that users must join
+# Telegram Channel(s) that users must join, comma separated
 REQUIRED_CHANNEL = os.environ.get("REQUIRED_CHANNEL", "@your_channel")
 REQUIRED_CHANNEL_ID = os.environ.get("REQUIRED_CHANNEL_ID")  # Numeric ID for the channel
 
 # Join request timeout in seconds (5 minutes)
 JOIN_REQUEST_TIMEOUT = 300
 
+# Per-chat join settings (ChatSettings) are cached in-process
+JOIN_CONFIG_CACHE_TTL = 300      # Seconds before a chat's settings are re-read
+JOIN_CONFIG_CACHE_SIZE = 10000   # Chats kept in the cache
+
+# Join-request deadlines are swept from a min-heap by one coroutine
+SWEEP_BATCH_SIZE = 100         # Due requests handled per batch
+SWEEP_MAX_SLEEP = 60           # Longest idle sleep between heap checks
+JOIN_SWEEP_CONCURRENCY = 10    # Requests of a batch processed at once
+JOIN_RECHECK_DELAY = 60        # Seconds before a request whose lookup failed is checked again
+
+# Required-channel membership cache, kept current by chat_member updates
+# when the bot is an admin of the channel
+MEMBERSHIP_CACHE_TTL = 600       # Seconds a confirmed membership is trusted
+MEMBERSHIP_NEGATIVE_TTL = 15     # Seconds before a non-member is re-checked
+MEMBERSHIP_CACHE_SIZE = 100000   # (channel, user) entries kept
+MEMBERSHIP_LOOKUP_CONCURRENCY = 20  # get_chat_member calls in flight at once
+
+# Outbound message queue (join DMs and notices); rate limits are the send gateway's
+OUTBOUND_CONCURRENCY = 8       # Sends handed to the gateway at once, most urgent first
+OUTBOUND_MAX_RETRIES = 5       # RetryAfter retries before a message is dropped
+OUTBOUND_DRAIN_TIMEOUT = 10    # Seconds spent sending what is still queued at shutdown
+
+# Send gateway: rate limiter every Bot API call goes through
+GATEWAY_GLOBAL_RATE = 30       # API calls per second across all chats
+GATEWAY_PRIVATE_RATE = 1       # Messages per second to one private chat
+GATEWAY_GROUP_RATE = 20 / 60   # Messages per second to one group (20 per minute)
+GATEWAY_CHAT_BURST = 3         # Messages one chat may receive back to back
+GATEWAY_CHAT_BUCKETS = 10000   # Per-chat buckets kept before idle ones are pruned
+
+# HTTP connection pools: API calls and getUpdates long polling use separate
+# pools so a pending poll never holds a connection sends are waiting for
+HTTP_POOL_SIZE = 64            # Connections for API calls
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_READ_TIMEOUT = 10.0
+HTTP_WRITE_TIMEOUT = 10.0
+HTTP_POOL_TIMEOUT = 5.0        # Wait for a free pooled connection
+HTTP_KEEPALIVE_IDLE = 30       # Seconds before TCP keep-alive probes start on idle connections
+UPDATES_POOL_SIZE = 2          # Connections for getUpdates
+POLLING_TIMEOUT = 30           # Long-polling timeout passed to getUpdates
+
+# Updates of different chats are handled concurrently; each chat's (and each
+# user's button presses) stay in order. 1 handles one update at a time.
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", "32"))
+
+# Retries of transient Bot API errors (TimedOut, NetworkError)
+RETRY_MAX_ATTEMPTS = 4         # Tries per call, the first one included
+RETRY_BASE_DELAY = 0.5         # Backoff before the first retry, doubled per retry
+RETRY_MAX_DELAY = 8            # Longest single backoff
+RETRY_DEADLINE = 30            # Seconds after which a call is not retried any more
+
+# Database used by the web app and for persisting moderation state
+DATABASE_URL = os.environ.get("DATABASE_URL") or "sqlite:///apex_bot.db"
+PERSIST_FLUSH_INTERVAL = 0.25  # Seconds between write-behind batches
+PERSIST_BATCH_SIZE = 500       # Queued writes that trigger an early flush
+PERSIST_MAX_RETRIES = 3        # Failed flushes of a batch before it is dropped
+
 # Webhook settings
 WEBHOOK_URL_PATH = "/webhook/apex-project"
+# "polling" runs direct_bot.py next to the web app; "webhook" has the web app
+# receive updates at WEBHOOK_URL_PATH and run the bot in-process
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")  # Public base URL, e.g. https://apex-bot.onrender.com; unset for local testing
+WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")  # Required in webhook mode
+WEBHOOK_MAX_CONNECTIONS = 40   # Concurrent webhook connections Telegram may open
+WEBHOOK_START_TIMEOUT = 30     # Seconds to wait for the bot loop to come up
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # Bearer token for /metrics; the route is off when unset
 
 # AI Assistant Configuration
 AI_MODEL = "gemini-1.5-flash"
@@ -41,15 +105,74 @@ Remember: simple, and mysterious,wisdom,knowledge,fast.
 MAX_FLOOD_MESSAGES = 5  # Max messages allowed in short time period
 FLOOD_TIME_WINDOW = 5   # Time window in seconds to check for flood
 SLOW_MODE_INTERVAL = 3  # Default slow mode interval in seconds
+
+# Auto slow mode (per-chat message rate tracked as an EWMA)
+SLOW_MODE_AUTO_WINDOW = 30          # EWMA time constant in seconds
+SLOW_MODE_AUTO_THRESHOLD = 1.0      # Messages per second that switch on the first step
+SLOW_MODE_AUTO_STEPS = [10, 30, 60] # Slow mode delays; each step needs twice the rate of the previous
+SLOW_MODE_AUTO_HYSTERESIS = 0.5     # Step down once the rate is below this fraction of the step's threshold
+SLOW_MODE_AUTO_MIN_DWELL = 60       # Seconds a step is held before it can be relaxed
+
+# Self-tuning flood limits (per-chat histogram of per-user message bursts)
+FLOOD_LIMIT_MIN = 3              # Default lower bound for a chat's learned flood limit
+FLOOD_LIMIT_MAX = 20             # Default upper bound; admins can change both with /floodbounds
+FLOOD_BASELINE_BINS = 64         # Histogram buckets (messages per FLOOD_TIME_WINDOW)
+FLOOD_BASELINE_PERCENTILE = 0.99 # Share of normal bursts that stay under the limit
+FLOOD_BASELINE_MARGIN = 1.5      # Headroom multiplied onto the percentile
+FLOOD_BASELINE_MIN_SAMPLES = 50  # Bursts needed before the learned limit replaces MAX_FLOOD_MESSAGES
+FLOOD_BASELINE_HALF_LIFE = 86400 # Seconds for old bursts to lose half their weight
+FLOOD_BASELINE_INTERVAL = 60     # Seconds between limit recomputations
+
+# Bulk moderation (/banall, /muteall, /warnall, /purge, /approveall, /declineall)
+BULK_CONCURRENCY = 4             # Workers per bulk job
+BULK_RATE_LIMIT = 20             # API calls started per second per job
+BULK_MAX_RETRIES = 3             # Retries after a RetryAfter before a target counts as failed
+BULK_PROGRESS_INTERVAL = 3       # Seconds between edits of the progress message
+BULK_CHECKPOINT_EVERY = 25       # Targets processed between checkpoint writes
+BULK_CHECKPOINT_DIR = os.environ.get("BULK_CHECKPOINT_DIR", "bulk_jobs")
+BULK_MAX_TARGETS = 5000          # Largest user list or purge range accepted
+BULK_RECENT_JOINS = 5000         # Joins remembered per chat for "recent <minutes>"
+
+# Moderation audit log (binary segment files)
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", "audit_log")
+AUDIT_SEGMENT_BYTES = 4 * 1024 * 1024  # Segment size before rotating
+AUDIT_RETENTION_DAYS = 90              # Older records are compacted away on rotation
+AUDIT_INDEX_PER_KEY = 500              # Newest records indexed per chat and per user
+AUDIT_MAX_DETAIL = 256                 # Bytes of free-text detail kept per record
+AUDIT_DEFAULT_LIMIT = 10               # Records shown by /audit
+AUDIT_MAX_LIMIT = 50                   # Most records /audit will show
+
 WARNING_EXPIRE_HOURS = 24  # Warnings expire after 24 hours
 MAX_WARNINGS = 3        # Number of warnings before a user is banned
 
+# Expiry service (timer wheel for warnings, mutes, flood windows)
+EXPIRY_TICK_SECONDS = 1     # Timer resolution
+EXPIRY_WHEEL_SLOTS = 512    # Wheel size; longer delays wrap around
+
+# Message deletions (filtered content, spam waves, welcome cleanup) are batched per chat
+DELETE_BATCH_WINDOW = 1.0   # Seconds a chat's deletions are collected before one deleteMessages call
+DELETE_MAX_RETRIES = 3      # Times a transient failure is queued again before giving up
+DELETE_RETRY_DELAY = 5      # Seconds before a failed deletion is queued again
+
+# Welcome message settings
+WELCOME_COALESCE_WINDOW = 3  # Seconds to collect joins before sending one combined welcome
+WELCOME_DELETE_DELAY = 60    # Seconds before the welcome message is deleted
+WELCOME_MAX_NAMES = 10       # Names listed in a combined welcome before "and N others"
+
 # Banned content and filters
 BANNED_CONTENT_TYPES = ['url']  # Content types that can be filtered
 BANNED_PHRASES = [
     # All banned phrases have been removed as requested
     # Users can now say whatever they want
 ]
+MAX_FILTER_RULES = 1000  # Max phrase/regex filter rules per chat
+
+# Cross-user duplicate (spam wave) detection
+DUPLICATE_WINDOW_SECONDS = 60  # Time window for near-identical messages
+DUPLICATE_MIN_USERS = 3        # Distinct users posting the same text before acting
+DUPLICATE_MAX_DISTANCE = 3     # Max differing SimHash bits to count as the same text
+DUPLICATE_BUFFER_SIZE = 128    # Fingerprints remembered per chat
+DUPLICATE_MIN_LENGTH = 16      # Shorter messages (e.g. "ok", "gm") are ignored
 
 # Welcome message template
 WELCOME_MESSAGE = """
@@ -82,6 +205,20 @@ HELP_MESSAGE = """
 • /warn - Give a user a warning
 • /pin - Make a message stay at the top
 • /settings - Change group settings
+• /filter - Block a phrase (or re:pattern)
+• /unfilter - Remove a blocked phrase
+• /filters - List blocked phrases
+• /allowdomain, /denydomain - Allow or block links to a domain
+• /domains - List domain rules
+• /floodbounds - Set the range for the learned flood limit
+• /banall, /muteall, /warnall - Act on user IDs or recent joins
+• /purge - Delete a range of messages
+• /bulkresume - Resume interrupted bulk jobs
+• /audit - Recent moderation actions for a user or the group
+• /joinconfig - Channels, waiting period and auto-decline for join requests
+• /pending - Summary of pending join requests
+• /approveall - Approve pending join requests in bulk
+• /declineall - Decline pending join requests in bulk
 
 _"We work in shadows. We know secrets. We are Apex."_
 
@@ -17,37 +17,18 @@ logger = logging.getLogger(__name__)
 # Import configuration
 from config import BOT_TOKEN, REQUIRED_CHANNEL, JOIN_REQUEST_TIMEOUT
 
-# Import handler registrations
-from handlers.ai_assistant import register_ai_assistant_handlers
-from handlers.group_management import register_group_management_handlers
-from handlers.join_request import register_join_request_handlers
+from utils.app_factory import build_application, register_handlers, start_polling
 
 async def main():
     """Start the bot"""
-    # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Create the Application with the shared HTTP and rate-limiting setup
+    application = build_application()
     
-    # Initialize data structures
-    user_warnings = {}
-    flood_control = {}
-    chat_settings = {}
-    pending_join_requests = {}
+    # Initialize bot_data and register handlers
+    register_handlers(application)
     
-    # Add the data structures to application.bot_data
-    application.bot_data["pending_join_requests"] = pending_join_requests
-    application.bot_data["user_warnings"] = user_warnings
-    application.bot_data["flood_control"] = flood_control
-    application.bot_data["chat_settings"] = chat_settings
-    
-    # Register handlers
-    register_ai_assistant_handlers(application)
-    register_group_management_handlers(application, user_warnings, flood_control, chat_settings)
-    register_join_request_handlers(application, pending_join_requests)
-    
-    # Start the bot
-    await application.initialize()
-    await application.start()
-    await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+    # Start the bot; post_init loads persisted state before the first update
+    await start_polling(application)
     
     # Get bot info and print
     bot_info = await application.bot.get_me()
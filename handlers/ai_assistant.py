@@ -20,6 +20,7 @@ except ImportError:
         CommandHandler, MessageHandler, filters
     )
 from utils.ai_helper import generate_ai_response
+from utils.send_gateway import send_priority, PRIORITY_CHATTER
 
 logger = logging.getLogger(__name__)
 
@@ -67,13 +68,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /help command"""
-    from config import HELP_MESSAGE
-    
-    # Format the help message with the bot's username
-    formatted_help = HELP_MESSAGE.format(bot_username=context.bot.username)
+    from utils.message_catalog import help_text
     
+    # Help message formatted once for the bot's username
     await update.message.reply_text(
-        formatted_help,
+        help_text(context.bot.username),
         parse_mode="Markdown"
     )
 
@@ -126,27 +125,33 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
     if update.message.text.startswith('/'):
         return
     
+    # Answered in the background: the chat's next update does not wait for Gemini
+    context.application.create_task(answer_private_message(update, context, update.message.text), update=update)
+
+async def answer_private_message(update: Update, context: ContextTypes.DEFAULT_TYPE, message_text) -> None:
+    """Generate and send the AI answer to a private message"""
     user = update.effective_user
-    message_text = update.message.text
-    
-    # Send typing action
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-    
-    logger.info(f"Processing private message from {user.id}: {message_text}")
     
-    # Get AI response
-    try:
-        response = await generate_ai_response(message_text, is_private=True)
+    # AI chatter yields to moderation and join traffic at the send gateway
+    with send_priority(PRIORITY_CHATTER):
+        # Send typing action
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
         
-        await update.message.reply_text(
-            response,
-            parse_mode="Markdown"
-        )
-    except Exception as e:
-        logger.error(f"Error generating AI response: {e}")
-        await update.message.reply_text(
-            "I apologize, but an error occurred while processing your request. Please try again later."
-        )
+        logger.info(f"Processing private message from {user.id}: {message_text}")
+        
+        # Get AI response
+        try:
+            response = await generate_ai_response(message_text, is_private=True)
+        
+            await update.message.reply_text(
+                response,
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Error generating AI response: {e}")
+            await update.message.reply_text(
+                "I apologize, but an error occurred while processing your request. Please try again later."
+            )
 
 async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle messages sent in groups that mention the bot"""
@@ -165,8 +170,6 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
         not re.search(apex_mention_pattern, str(message.text), re.IGNORECASE)):
         return
     
-    user = update.effective_user
-    
     # Remove the bot mention from the message (with type safety)
     prompt = str(message.text)
     prompt = re.sub(bot_mention_pattern, '', prompt, flags=re.IGNORECASE).strip()
@@ -176,24 +179,35 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
     if not prompt:
         return
     
-    # Send typing action
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-    
-    logger.info(f"Processing group question from {user.id} in {message.chat.id}: {prompt}")
+    # Answered in the background: moderation of this and later messages in the
+    # chat does not wait for Gemini
+    context.application.create_task(answer_group_question(update, context, prompt), update=update)
+
+async def answer_group_question(update: Update, context: ContextTypes.DEFAULT_TYPE, prompt) -> None:
+    """Generate and send the AI answer to a group message that mentions the bot"""
+    message = update.message
+    user = update.effective_user
     
-    # Get AI response
-    try:
-        response = await generate_ai_response(prompt, is_private=False)
+    # AI chatter yields to moderation and join traffic at the send gateway
+    with send_priority(PRIORITY_CHATTER):
+        # Send typing action
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        
+        logger.info(f"Processing group question from {user.id} in {message.chat.id}: {prompt}")
+        
+        # Get AI response
+        try:
+            response = await generate_ai_response(prompt, is_private=False)
         
-        await message.reply_text(
-            response,
-            parse_mode="Markdown"
-        )
-    except Exception as e:
-        logger.error(f"Error generating AI response for group message: {e}")
-        await message.reply_text(
-            "I apologize, but an error occurred while processing your request. Please try again later."
-        )
+            await message.reply_text(
+                response,
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Error generating AI response for group message: {e}")
+            await message.reply_text(
+                "I apologize, but an error occurred while processing your request. Please try again later."
+            )
 
 def register_ai_assistant_handlers(dp):
     """Register all handlers related to AI assistant functionality"""
@@ -1,13 +1,14 @@
 import logging
 import time
 import re
+from collections import deque
 from config import BOT_TOKEN
 
 # Check if we're in development mode
 dev_mode = BOT_TOKEN == "dummy_token_for_development"
 
 try:
-    from telegram import Update, ChatPermissions, InlineKeyboardMarkup, InlineKeyboardButton
+    from telegram import Update, ChatPermissions
     from telegram.ext import (
         ContextTypes,
         CommandHandler,
@@ -18,17 +19,36 @@ try:
 except ImportError:
     # In development mode, import from our mock module
     from mock_telegram import (
-        Update, ChatPermissions, InlineKeyboardMarkup, InlineKeyboardButton,
+        Update, ChatPermissions,
         ContextTypes, CommandHandler, MessageHandler, CallbackQueryHandler, filters
     )
 from config import (
-    MAX_FLOOD_MESSAGES,
     FLOOD_TIME_WINDOW,
     SLOW_MODE_INTERVAL,
+    SLOW_MODE_AUTO_MIN_DWELL,
     WARNING_EXPIRE_HOURS,
     MAX_WARNINGS,
     BANNED_CONTENT_TYPES,
-    WELCOME_MESSAGE
+    WELCOME_MESSAGE,
+    WELCOME_COALESCE_WINDOW,
+    WELCOME_DELETE_DELAY,
+    WELCOME_MAX_NAMES,
+    BULK_MAX_TARGETS,
+    BULK_RECENT_JOINS,
+    AUDIT_DEFAULT_LIMIT,
+    AUDIT_MAX_LIMIT
+)
+from utils.callback_codec import SETTING_LINKS, SETTING_SLOW_MODE, SETTING_WELCOME, SETTING_AUTO_SLOW_MODE
+from utils.message_catalog import SETTINGS_CLOSED_TEXT, settings_text, settings_keyboard
+from utils.audit_log import (
+    audit,
+    AUDIT_BAN,
+    AUDIT_MUTE,
+    AUDIT_WARN,
+    AUDIT_PIN,
+    AUDIT_SETTINGS,
+    AUDIT_PURGE,
+    AUDIT_FILTER,
 )
 
 logger = logging.getLogger(__name__)
@@ -43,6 +63,142 @@ async def is_admin(chat_id, user_id, context):
         logger.error(f"Error checking admin status: {e}")
         return False
 
+def track_mute(context, chat_id, user_id, duration):
+    """Remember an active mute until it runs out (Telegram lifts the restriction itself)"""
+    mutes = context.bot_data.setdefault("active_mutes", {})
+    mutes.setdefault(chat_id, {})[user_id] = time.time() + duration
+    
+    from utils.expiry import get_expiry_service
+    get_expiry_service(context).schedule("mute", (chat_id, user_id), duration)
+
+def parse_duration(time_arg, default=3600):
+    """Parse a duration like 30m, 2h or 1d into seconds (bare numbers are minutes)"""
+    time_arg = time_arg.lower()
+    match = re.match(r'^(\d+)', time_arg)
+    if not match:
+        return default
+    time_value = int(match.group(1))
+    if "m" in time_arg:
+        return time_value * 60
+    elif "h" in time_arg:
+        return time_value * 3600
+    elif "d" in time_arg:
+        return time_value * 86400
+    return time_value * 60  # Default to minutes
+
+async def expire_flood_window(context, key, data) -> None:
+    """Forget a user's flood window after they have been quiet for FLOOD_TIME_WINDOW"""
+    chat_id, user_id = key
+    
+    # The timer carries the user's peak burst, which feeds the chat's learned limit
+    if data:
+        from utils.flood_baseline import get_flood_baseline
+        get_flood_baseline(context.bot_data, chat_id).record(data, time.time())
+    
+    chat_flood = context.bot_data.get("flood_control", {}).get(chat_id)
+    if chat_flood is None:
+        return
+    chat_flood.pop(user_id, None)
+    if not chat_flood:
+        context.bot_data["flood_control"].pop(chat_id, None)
+
+async def expire_warnings(context, key, data) -> None:
+    """Drop expired warnings and re-arm the timer for the next oldest one"""
+    chat_id, user_id = key
+    chat_warnings = context.bot_data.get("user_warnings", {}).get(chat_id, {})
+    user_warnings = chat_warnings.get(user_id)
+    if user_warnings is None:
+        return
+    
+    expiry_time = time.time() - (WARNING_EXPIRE_HOURS * 3600)
+    user_warnings["timestamps"] = [t for t in user_warnings["timestamps"] if t > expiry_time]
+    user_warnings["count"] = len(user_warnings["timestamps"])
+    
+    # Their rows go too, so the table only holds warnings that still count
+    from utils.persistence import queue_warning_clear
+    queue_warning_clear(context.bot_data, chat_id, user_id, expiry_time)
+    
+    if user_warnings["timestamps"]:
+        from utils.expiry import get_expiry_service
+        next_expiry = user_warnings["timestamps"][0] - expiry_time
+        get_expiry_service(context).schedule("warning", key, next_expiry)
+    else:
+        chat_warnings.pop(user_id, None)
+        logger.info(f"All warnings expired for user {user_id} in chat {chat_id}")
+
+async def expire_mute(context, key, data) -> None:
+    """Forget a mute once Telegram has lifted it"""
+    chat_id, user_id = key
+    chat_mutes = context.bot_data.get("active_mutes", {}).get(chat_id, {})
+    chat_mutes.pop(user_id, None)
+    logger.info(f"Mute expired for user {user_id} in chat {chat_id}")
+
+async def track_message_rate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Track each group's message rate and drive auto slow mode"""
+    message = update.message
+    if not message:
+        return
+    
+    chat_id = message.chat.id
+    now = time.time()
+    from utils.rate_tracker import get_chat_rate
+    chat_rate = get_chat_rate(context.bot_data, chat_id)
+    chat_rate.observe(now)
+    
+    # Manual slow mode takes precedence over auto mode
+    chat_settings = context.bot_data.setdefault("chat_settings", {}).get(chat_id, {})
+    if chat_settings.get("slow_mode_auto", False) and not chat_settings.get("slow_mode", False):
+        await apply_auto_slow_mode(context, chat_id, chat_rate, now)
+
+async def apply_auto_slow_mode(context, chat_id, chat_rate, now) -> None:
+    """Move the chat's slow mode to the level its message rate calls for"""
+    level = chat_rate.target_level(now)
+    if level is None:
+        return
+    
+    # Claim the new level before the API call so concurrent messages don't repeat it
+    previous_level = chat_rate.level
+    chat_rate.set_level(level, now)
+    try:
+        await context.bot.set_chat_slow_mode_delay(chat_id=chat_id, seconds=chat_rate.interval())
+        logger.info(f"Auto slow mode in chat {chat_id} set to {chat_rate.interval()}s at {chat_rate.current(now):.2f} msg/s")
+    except Exception as e:
+        chat_rate.set_level(previous_level, now)
+        logger.error(f"Failed to set auto slow mode in chat {chat_id}: {e}")
+        return
+    
+    # Quiet chats send no messages, so a timer re-checks whether to relax
+    from utils.expiry import get_expiry_service
+    if chat_rate.level:
+        get_expiry_service(context).schedule("slow_mode_relax", chat_id, SLOW_MODE_AUTO_MIN_DWELL)
+    else:
+        get_expiry_service(context).cancel("slow_mode_relax", chat_id)
+
+async def relax_auto_slow_mode(context, key, data) -> None:
+    """Re-evaluate auto slow mode for a chat that may have gone quiet"""
+    chat_id = key
+    chat_rate = context.bot_data.get("chat_rates", {}).get(chat_id)
+    chat_settings = context.bot_data.get("chat_settings", {}).get(chat_id, {})
+    if chat_rate is None or not chat_rate.level:
+        return
+    if not chat_settings.get("slow_mode_auto", False) or chat_settings.get("slow_mode", False):
+        return
+    
+    await apply_auto_slow_mode(context, chat_id, chat_rate, time.time())
+    
+    from utils.expiry import get_expiry_service
+    expiry = get_expiry_service(context)
+    if chat_rate.level and not expiry.pending("slow_mode_relax", chat_id):
+        expiry.schedule("slow_mode_relax", chat_id, SLOW_MODE_AUTO_MIN_DWELL)
+
+def reset_auto_slow_mode(context, chat_id) -> None:
+    """Forget the auto slow mode level after slow mode was changed by hand"""
+    chat_rate = context.bot_data.get("chat_rates", {}).get(chat_id)
+    if chat_rate is not None and chat_rate.level:
+        chat_rate.set_level(0, time.time())
+    from utils.expiry import get_expiry_service
+    get_expiry_service(context).cancel("slow_mode_relax", chat_id)
+
 async def check_flood_control(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle flood control for group messages"""
     message = update.message
@@ -66,8 +222,15 @@ async def check_flood_control(update: Update, context: ContextTypes.DEFAULT_TYPE
     user_msgs = [t for t in user_msgs if current_time - t <= FLOOD_TIME_WINDOW]
     chat_flood[user_id] = user_msgs
     
-    # Check if user is flooding
-    if len(user_msgs) > MAX_FLOOD_MESSAGES:
+    # Drop the user's window entirely once they go quiet, keeping their peak burst
+    from utils.expiry import get_expiry_service
+    expiry = get_expiry_service(context)
+    peak = max(len(user_msgs), expiry.cancel("flood_window", (chat_id, user_id)) or 0)
+    expiry.schedule("flood_window", (chat_id, user_id), FLOOD_TIME_WINDOW, data=peak)
+    
+    # Check if user is flooding against the chat's learned limit
+    from utils.flood_baseline import get_flood_baseline
+    if len(user_msgs) > get_flood_baseline(context.bot_data, chat_id).limit:
         try:
             # Mute the user for a short time
             until_date = current_time + 60  # 1 minute mute
@@ -83,6 +246,7 @@ async def check_flood_control(update: Update, context: ContextTypes.DEFAULT_TYPE
                 permissions=permissions,
                 until_date=until_date
             )
+            track_mute(context, chat_id, user_id, 60)
             
             # Generate AI-powered flood warning
             from utils.ai_helper import generate_banned_content_response
@@ -110,6 +274,7 @@ async def check_flood_control(update: Update, context: ContextTypes.DEFAULT_TYPE
             # Clear the user's message history after taking action
             chat_flood[user_id] = []
             
+            audit(context.bot_data, AUDIT_MUTE, chat_id, 0, user_id, "60s: message flooding")
             logger.info(f"Muted user {user_id} in chat {chat_id} for flooding")
         except Exception as e:
             logger.error(f"Failed to apply flood control for user {user_id}: {e}")
@@ -128,60 +293,174 @@ async def check_banned_content(update: Update, context: ContextTypes.DEFAULT_TYP
     settings = context.bot_data.setdefault("chat_settings", {})
     chat_settings = settings.setdefault(chat_id, {"banned_content": []})
     
-    # Check for banned content types
-    if "url" in chat_settings.get("banned_content", []) and message.entities:
+    # Check links against the chat's domain allow/deny lists
+    from utils.link_filter import get_link_policy
+    links_blocked = "url" in chat_settings.get("banned_content", [])
+    link_policy = get_link_policy(context.bot_data, chat_id)
+    if (links_blocked or link_policy.deny_count) and message.entities:
         for entity in message.entities:
-            if entity.type == "url" or entity.type == "text_link":
-                try:
-                    await message.delete()
-                    
-                    # Generate AI-powered roast for posting links
-                    from utils.ai_helper import generate_banned_content_response
-                    roast = await generate_banned_content_response(message.from_user.first_name, "links")
-                    
-                    # Fall back to default message if AI fails
-                    if not roast:
-                        roast = f"⚠️ Links are not allowed in this chat, {message.from_user.first_name}."
-                    
-                    await message.reply_text(
-                        roast,
-                        parse_mode="Markdown"
-                    )
-                    await issue_warning(chat_id, user_id, "posting links", context)
-                    logger.info(f"Deleted link from user {user_id} in chat {chat_id}")
-                    return
-                except Exception as e:
-                    logger.error(f"Failed to delete link message: {e}")
-    
-    # Banned phrases check has been disabled as requested
-    # Users can now say whatever they want
-    pass
-
-async def issue_warning(chat_id, user_id, reason, context):
-    """Issue a warning to a user"""
+            if entity.type == "url":
+                url = message.parse_entity(entity)
+            elif entity.type == "text_link":
+                url = entity.url or ""
+            else:
+                continue
+            
+            if link_policy.is_blocked(url, links_blocked):
+                # Batched with the chat's other deletions; the sender is only
+                # warned once it is gone, without holding up the chat meanwhile
+                from utils.deletion_batcher import queue_deletion
+                deletion = queue_deletion(context, chat_id, [message.message_id])
+                context.application.create_task(
+                    punish_filtered_message(
+                        context, deletion, message, "links", "posting links",
+                        f"⚠️ Links are not allowed in this chat, {message.from_user.first_name}."
+                    ),
+                    update=update
+                )
+                return
+    
+    # Check per-chat phrase and regex rules in a single pass over the text
+    from utils.content_filter import get_chat_filter
+    try:
+        matched_rule = get_chat_filter(context.bot_data, chat_id).match(message.text)
+    except Exception as e:
+        logger.error(f"Content filter failed in chat {chat_id}: {e}")
+        return
+    if matched_rule:
+        from utils.deletion_batcher import queue_deletion
+        deletion = queue_deletion(context, chat_id, [message.message_id])
+        context.application.create_task(
+            punish_filtered_message(
+                context, deletion, message, "banned phrases", "using banned phrases",
+                f"⚠️ That language is not allowed in this chat, {message.from_user.first_name}."
+            ),
+            update=update
+        )
+        logger.info(f"Deleting message from user {user_id} in chat {chat_id} matching filter rule {matched_rule!r}")
+
+async def punish_filtered_message(context, deletion, message, content, reason, fallback) -> None:
+    """Roast and warn the sender of a filtered message once the deletion went through"""
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    try:
+        if not await deletion:
+            logger.warning(f"Could not delete {content} from user {user_id} in chat {chat_id}, not warning")
+            return
+        
+        # Generate AI-powered roast for the filtered content
+        from utils.ai_helper import generate_banned_content_response
+        roast = await generate_banned_content_response(message.from_user.first_name, content)
+        
+        # Fall back to default message if AI fails
+        if not roast:
+            roast = fallback
+        
+        # Not a reply: the message it would quote is gone
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=roast,
+            parse_mode="Markdown"
+        )
+        await issue_warning(chat_id, user_id, reason, context)
+        logger.info(f"Deleted {content} from user {user_id} in chat {chat_id}")
+    except Exception as e:
+        logger.error(f"Failed to handle {content} from user {user_id} in chat {chat_id}: {e}")
+
+async def check_duplicate_spam(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Remove near-identical messages posted by several users in a short time"""
+    message = update.message
+    if not message or not message.text:
+        return
+    
+    from utils.duplicate_detector import simhash, get_duplicate_window
+    fingerprint = simhash(message.text)
+    if fingerprint is None:
+        return
+    
+    chat_id = message.chat.id
+    window = get_duplicate_window(context.bot_data, chat_id)
+    wave = window.observe(fingerprint, message.from_user.id, message.message_id, time.time())
+    if not wave:
+        return
+    
+    # Admins are never treated as part of a spam wave
+    offenders = {}
+    for user_id, message_id in wave:
+        if user_id not in offenders:
+            offenders[user_id] = [] if not await is_admin(chat_id, user_id, context) else None
+        if offenders[user_id] is not None:
+            offenders[user_id].append(message_id)
+    offenders = {user_id: ids for user_id, ids in offenders.items() if ids}
+    if not offenders:
+        return
+    
+    message_ids = [message_id for ids in offenders.values() for message_id in ids]
+    try:
+        from utils.deletion_batcher import queue_deletion
+        queue_deletion(context, chat_id, message_ids)
+        
+        # One summary for the wave instead of a message per user
+        if len(message_ids) > 1:
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=(
+                    f"🧹 *Spam wave neutralized*\n\n"
+                    f"{len(message_ids)} identical transmissions from {len(offenders)} operatives were purged. "
+                    f"Each sender has received a warning."
+                ),
+                parse_mode="Markdown"
+            )
+        for user_id in offenders:
+            await issue_warning(chat_id, user_id, "spamming duplicate messages", context, notify=False)
+        logger.info(f"Removed {len(message_ids)} duplicate messages from {len(offenders)} users in chat {chat_id}")
+    except Exception as e:
+        logger.error(f"Failed to handle duplicate spam in chat {chat_id}: {e}")
+
+async def issue_warning(chat_id, user_id, reason, context, notify=True, warned_by=None, raise_errors=False):
+    """Issue a warning to a user; with notify=False only bans are announced
+
+    The warning is always recorded. Failing API calls are logged; with
+    raise_errors=True a failed ban is raised as well. Announcements are
+    never worth failing the warning for.
+    """
     warnings = context.bot_data.setdefault("user_warnings", {})
     chat_warnings = warnings.setdefault(chat_id, {})
     user_warnings = chat_warnings.setdefault(user_id, {"count": 0, "timestamps": []})
     
     # Update warnings count and add timestamp
     current_time = time.time()
-    user_warnings["count"] += 1
     user_warnings["timestamps"].append(current_time)
-    
-    # Remove expired warnings
-    expiry_time = current_time - (WARNING_EXPIRE_HOURS * 3600)
-    user_warnings["timestamps"] = [t for t in user_warnings["timestamps"] if t > expiry_time]
     user_warnings["count"] = len(user_warnings["timestamps"])
     
+    # Written to the database in the background; this never waits on it
+    from utils.persistence import queue_warning, queue_warning_clear
+    queue_warning(context.bot_data, chat_id, user_id, reason, current_time, warned_by)
+    audit(context.bot_data, AUDIT_WARN, chat_id, warned_by or 0, user_id, reason)
+    
+    # Expired warnings are dropped by the expiry service, oldest first
+    from utils.expiry import get_expiry_service
+    expiry = get_expiry_service(context)
+    if not expiry.pending("warning", (chat_id, user_id)):
+        expiry.schedule("warning", (chat_id, user_id), WARNING_EXPIRE_HOURS * 3600)
+    
+    banned = False
     try:
-        user = await context.bot.get_chat_member(chat_id=chat_id, user_id=user_id)
-        username = user.user.first_name
-        
         if user_warnings["count"] >= MAX_WARNINGS:
             # Ban the user
             await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+            banned = True
+            
+            # Clear the user's warnings after banning
+            chat_warnings.pop(user_id, None)
+            expiry.cancel("warning", (chat_id, user_id))
+            queue_warning_clear(context.bot_data, chat_id, user_id, current_time)
+            audit(context.bot_data, AUDIT_BAN, chat_id, 0, user_id, f"{MAX_WARNINGS} warnings")
+            logger.info(f"Banned user {user_id} from chat {chat_id} after {MAX_WARNINGS} warnings")
             
             # Generate AI ban message
+            user = await context.bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+            username = user.user.first_name
             from utils.ai_helper import generate_banned_content_response
             ban_message = await generate_banned_content_response(username, "behavior after multiple warnings")
             
@@ -194,10 +473,10 @@ async def issue_warning(chat_id, user_id, reason, context):
                 text=ban_message,
                 parse_mode="Markdown"
             )
-            # Clear the user's warnings after banning
-            chat_warnings[user_id] = {"count": 0, "timestamps": []}
-            logger.info(f"Banned user {user_id} from chat {chat_id} after {MAX_WARNINGS} warnings")
-        else:
+        elif notify:
+            user = await context.bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+            username = user.user.first_name
+            
             # Generate AI warning message
             from utils.ai_helper import generate_warning_message
             warning_message = await generate_warning_message(username, reason)
@@ -221,6 +500,8 @@ async def issue_warning(chat_id, user_id, reason, context):
             logger.info(f"Issued warning to user {user_id} in chat {chat_id}, current count: {user_warnings['count']}")
     except Exception as e:
         logger.error(f"Failed to issue warning to user {user_id}: {e}")
+        if raise_errors and not banned and user_warnings["count"] >= MAX_WARNINGS:
+            raise
 
 async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /ban command"""
@@ -267,6 +548,7 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             ban_message,
             parse_mode="Markdown"
         )
+        audit(context.bot_data, AUDIT_BAN, chat_id, user_id, target_user.id, reason)
         logger.info(f"Admin {user_id} banned user {target_user.id} from chat {chat_id}")
     except Exception as e:
         logger.error(f"Failed to ban user {target_user.id}: {e}")
@@ -294,23 +576,7 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     target_user = message.reply_to_message.from_user
     
     # Parse duration (default to 1 hour)
-    duration = 3600  # 1 hour in seconds
-    if context.args:
-        time_arg = context.args[0].lower()
-        try:
-            match = re.match(r'^(\d+)', time_arg)
-            if match:
-                time_value = int(match.group(1))
-                if "m" in time_arg:
-                    duration = time_value * 60
-                elif "h" in time_arg:
-                    duration = time_value * 3600
-                elif "d" in time_arg:
-                    duration = time_value * 86400
-                else:
-                    duration = time_value * 60  # Default to minutes
-        except (AttributeError, ValueError):
-            duration = 3600  # Default to 1 hour if parsing fails
+    duration = parse_duration(context.args[0]) if context.args else 3600
     
     reason = " ".join(context.args[1:]) if len(context.args) > 1 else "No reason provided"
     
@@ -334,6 +600,7 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             permissions=permissions,
             until_date=until_date
         )
+        track_mute(context, chat_id, target_user.id, duration)
         
         # Format duration for display
         duration_text = ""
@@ -365,6 +632,7 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             mute_message,
             parse_mode="Markdown"
         )
+        audit(context.bot_data, AUDIT_MUTE, chat_id, user_id, target_user.id, f"{duration}s: {reason}")
         logger.info(f"Admin {user_id} muted user {target_user.id} in chat {chat_id} for {duration} seconds")
     except Exception as e:
         logger.error(f"Failed to mute user {target_user.id}: {e}")
@@ -396,7 +664,7 @@ async def warn_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     reason = " ".join(context.args) if context.args else "No reason provided"
     
     try:
-        await issue_warning(chat_id, target_user.id, reason, context)
+        await issue_warning(chat_id, target_user.id, reason, context, warned_by=user_id)
         logger.info(f"Admin {user_id} warned user {target_user.id} in chat {chat_id}")
     except Exception as e:
         logger.error(f"Failed to warn user {target_user.id}: {e}")
@@ -442,13 +710,32 @@ async def pin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             parse_mode="Markdown"
         )
         
+        audit(context.bot_data, AUDIT_PIN, chat_id, user_id, 0, f"message {message.reply_to_message.message_id}")
         logger.info(f"Admin {user_id} pinned message {message.reply_to_message.message_id} in chat {chat_id}")
     except Exception as e:
         logger.error(f"Failed to pin message: {e}")
         await message.reply_text("⚠️ Failed to pin message. Please check my permissions.")
 
-async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle the /settings command to configure group settings"""
+def parse_bulk_targets(args, context, chat_id):
+    """Resolve `<user_id...>` or `recent <minutes>` into a list of user IDs
+
+    Raises:
+        ValueError: If the arguments are missing or not numbers
+    """
+    if not args:
+        raise ValueError("no targets given")
+    if args[0].lower() == "recent":
+        if len(args) != 2:
+            raise ValueError("recent takes one number of minutes")
+        cutoff = time.time() - int(args[1]) * 60
+        joins = context.bot_data.get("recent_joins", {}).get(chat_id, ())
+        user_ids = (user_id for joined_at, user_id in joins if joined_at >= cutoff)
+    else:
+        user_ids = (int(arg) for arg in args)
+    return list(dict.fromkeys(user_ids))
+
+async def _start_bulk_user_job(update: Update, context: ContextTypes.DEFAULT_TYPE, action, args, job_args, usage) -> None:
+    """Shared body of /banall, /muteall and /warnall"""
     message = update.message
     chat_id = message.chat.id
     user_id = message.from_user.id
@@ -458,69 +745,393 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await message.reply_text("⚠️ You do not have permission to use this command.")
         return
     
-    # Get current settings
-    settings = context.bot_data.setdefault("chat_settings", {})
-    chat_settings = settings.setdefault(chat_id, {"banned_content": []})
+    try:
+        targets = parse_bulk_targets(args, context, chat_id)
+    except ValueError:
+        await message.reply_text(f"⚠️ Usage: {usage}")
+        return
     
-    # Create inline keyboard for settings
-    keyboard = [
-        [
-            InlineKeyboardButton(
-                "🔗 Links: " + ("❌ Blocked" if "url" in chat_settings.get("banned_content", []) else "✅ Allowed"),
-                callback_data=f"toggle_setting_url_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                "⏱ Slow Mode: " + ("✅ On" if chat_settings.get("slow_mode", False) else "❌ Off"),
-                callback_data=f"toggle_setting_slow_mode_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                "📢 Welcome Messages: " + ("✅ On" if chat_settings.get("welcome_msg", True) else "❌ Off"),
-                callback_data=f"toggle_setting_welcome_msg_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton("Close", callback_data="close_settings")
-        ]
-    ]
+    # One administrator lookup for the whole job instead of one per target
+    try:
+        admins = await context.bot.get_chat_administrators(chat_id=chat_id)
+    except Exception as e:
+        logger.error(f"Failed to get administrators of chat {chat_id}: {e}")
+        await message.reply_text("⚠️ Failed to check administrators. Please check my permissions.")
+        return
+    admin_ids = {admin.user.id for admin in admins}
+    targets = [target for target in targets if target not in admin_ids]
     
-    await message.reply_text(
-        "⚙️ *Apex Project Group Settings*\n\n"
-        "Configure protection protocols below:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode="Markdown"
+    if not targets:
+        await message.reply_text("📭 No matching users (administrators are skipped).")
+        return
+    if len(targets) > BULK_MAX_TARGETS:
+        await message.reply_text(f"⚠️ Too many users ({len(targets)}); the limit is {BULK_MAX_TARGETS}.")
+        return
+    
+    from utils.bulk_executor import new_job, start_bulk_job
+    job = new_job(chat_id, action, targets, dict(job_args, admin_id=user_id))
+    start_bulk_job(context, job)
+    logger.info(f"Admin {user_id} started bulk {action} job {job['id']} on {len(targets)} users in chat {chat_id}")
+
+async def banall_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /banall command"""
+    await _start_bulk_user_job(
+        update, context, "ban", context.args, {},
+        "/banall <user_id...> or /banall recent <minutes>"
     )
 
-async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle callbacks for toggling settings"""
-    query = update.callback_query
+async def muteall_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /muteall command"""
+    args = context.args or []
+    duration = parse_duration(args[0]) if args else 3600
+    await _start_bulk_user_job(
+        update, context, "mute", args[1:], {"duration": duration},
+        "/muteall <duration> <user_id...> or /muteall <duration> recent <minutes>"
+    )
+
+async def warnall_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /warnall command"""
+    await _start_bulk_user_job(
+        update, context, "warn", context.args, {"reason": "bulk moderation"},
+        "/warnall <user_id...> or /warnall recent <minutes>"
+    )
+
+async def purge_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /purge command to delete a range of messages"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
     
-    if not query:
-        logger.error("Callback received with no query object")
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
         return
-        
-    await query.answer()
     
-    # Parse the callback data
-    if not query.data:
-        logger.error("Callback query missing data")
+    # Either everything from the replied-to message, or the last N messages
+    if message.reply_to_message:
+        first_id = message.reply_to_message.message_id
+    elif context.args and context.args[0].isdigit():
+        first_id = message.message_id - int(context.args[0])
+    else:
+        await message.reply_text("⚠️ Usage: reply to the first message with /purge, or /purge <count>")
         return
-        
-    data_parts = query.data.split('_')
-    if len(data_parts) < 4 or data_parts[0] != "toggle" or data_parts[1] != "setting":
-        logger.error(f"Invalid callback data format: {query.data}")
+    
+    message_ids = list(range(max(1, first_id), message.message_id + 1))
+    if len(message_ids) > BULK_MAX_TARGETS:
+        await message.reply_text(f"⚠️ Too many messages ({len(message_ids)}); the limit is {BULK_MAX_TARGETS}.")
         return
     
-    setting_name = data_parts[2]
+    # deleteMessages takes up to 100 IDs, so each target is one chunk
+    chunks = [message_ids[start:start + 100] for start in range(0, len(message_ids), 100)]
+    from utils.bulk_executor import new_job, start_bulk_job
+    job = new_job(chat_id, "purge", chunks, {"admin_id": user_id})
+    start_bulk_job(context, job)
+    logger.info(f"Admin {user_id} started purge job {job['id']} on {len(message_ids)} messages in chat {chat_id}")
+
+async def bulkresume_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /bulkresume command to restart interrupted bulk jobs"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
     
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    from utils.bulk_executor import load_checkpoints, start_bulk_job
+    resumed = [job["id"] for job in load_checkpoints(chat_id) if start_bulk_job(context, job)]
+    if not resumed:
+        await message.reply_text("📭 No interrupted bulk jobs in this chat.")
+        return
+    await message.reply_text(f"▶️ Resumed {len(resumed)} bulk job(s): {', '.join(resumed)}")
+    logger.info(f"Admin {user_id} resumed bulk jobs {resumed} in chat {chat_id}")
+
+async def bulk_ban(context, chat_id, user_id, args) -> None:
+    """Bulk operation: ban one user"""
+    await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+    audit(context.bot_data, AUDIT_BAN, chat_id, args.get("admin_id", 0), user_id, "bulk")
+
+async def bulk_mute(context, chat_id, user_id, args) -> None:
+    """Bulk operation: mute one user for args["duration"] seconds"""
+    permissions = ChatPermissions(
+        can_send_messages=False,
+        can_send_media_messages=False,
+        can_send_other_messages=False
+    )
+    await context.bot.restrict_chat_member(
+        chat_id=chat_id,
+        user_id=user_id,
+        permissions=permissions,
+        until_date=int(time.time() + args["duration"])
+    )
+    track_mute(context, chat_id, user_id, args["duration"])
+    audit(context.bot_data, AUDIT_MUTE, chat_id, args.get("admin_id", 0), user_id, f"{args['duration']}s: bulk")
+
+async def bulk_warn(context, chat_id, user_id, args) -> None:
+    """Bulk operation: warn one user without a per-user announcement"""
+    # A failed ban reaches the executor, which counts it as failed or, on
+    # RetryAfter, backs off and tries again (recording another warning for a
+    # user who is banned and cleared in that same retry)
+    await issue_warning(chat_id, user_id, args["reason"], context, notify=False, warned_by=args.get("admin_id"), raise_errors=True)
+
+async def bulk_purge(context, chat_id, message_ids, args) -> None:
+    """Bulk operation: delete one chunk of up to 100 messages"""
+    # Through the batcher, so purges and moderation deletions share its calls and retries
+    from utils.deletion_batcher import queue_deletion
+    if not await queue_deletion(context, chat_id, message_ids):
+        raise RuntimeError(f"messages {message_ids[0]}-{message_ids[-1]} could not all be deleted")
+    audit(context.bot_data, AUDIT_PURGE, chat_id, args.get("admin_id", 0), 0, f"messages {message_ids[0]}-{message_ids[-1]}")
+
+async def filter_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /filter command to add a banned phrase or regex rule"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    rule = " ".join(context.args) if context.args else ""
+    if not rule:
+        await message.reply_text(
+            "⚠️ Usage: /filter <phrase> or /filter re:<pattern>"
+        )
+        return
+    
+    from utils.content_filter import get_chat_filter
     try:
-        chat_id = int(data_parts[3])
+        get_chat_filter(context.bot_data, chat_id).add_rule(rule)
+    except ValueError as e:
+        await message.reply_text(f"⚠️ Could not add filter: {e}")
+        return
+    
+    await message.reply_text(f"🚫 Filter added: {rule}")
+    audit(context.bot_data, AUDIT_FILTER, chat_id, user_id, 0, f"added {rule}")
+    logger.info(f"Admin {user_id} added filter rule {rule!r} in chat {chat_id}")
+
+async def unfilter_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /unfilter command to remove a banned phrase or regex rule"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    rule = " ".join(context.args) if context.args else ""
+    if not rule:
+        await message.reply_text(
+            "⚠️ Usage: /unfilter <phrase> or /unfilter re:<pattern>"
+        )
+        return
+    
+    from utils.content_filter import get_chat_filter
+    if get_chat_filter(context.bot_data, chat_id).remove_rule(rule):
+        await message.reply_text(f"✅ Filter removed: {rule}")
+        audit(context.bot_data, AUDIT_FILTER, chat_id, user_id, 0, f"removed {rule}")
+        logger.info(f"Admin {user_id} removed filter rule {rule!r} in chat {chat_id}")
+    else:
+        await message.reply_text("⚠️ No such filter in this chat.")
+
+async def filters_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /filters command to list the chat's filter rules"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    from utils.content_filter import get_chat_filter
+    rules = get_chat_filter(context.bot_data, chat_id).rules()
+    if not rules:
+        await message.reply_text("📭 No filters are active in this chat.")
+        return
+    
+    rule_lines = "\n".join(f"• {rule}" for rule in rules)
+    await message.reply_text(f"🚫 Active filters ({len(rules)}):\n{rule_lines}")
+
+async def _update_domain_rules(update: Update, context: ContextTypes.DEFAULT_TYPE, policy) -> None:
+    """Shared body of /allowdomain, /denydomain and /removedomain"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    if not context.args:
+        await message.reply_text("⚠️ Usage: provide one or more domains, e.g. example.com or *.example.com")
+        return
+    
+    from utils.link_filter import get_link_policy
+    link_policy = get_link_policy(context.bot_data, chat_id)
+    changed, rejected = [], []
+    for rule in context.args:
+        if policy is None:
+            if link_policy.remove_rule(rule):
+                changed.append(rule)
+            else:
+                rejected.append(rule)
+            continue
+        try:
+            changed.append(link_policy.set_rule(rule, policy))
+        except ValueError:
+            rejected.append(rule)
+    
+    action = {"allow": "Allowed", "deny": "Denied", None: "Removed"}[policy]
+    reply = f"🔗 {action}: {', '.join(changed) if changed else 'nothing'}"
+    if rejected:
+        reply += f"\n⚠️ Skipped: {', '.join(rejected)}"
+    await message.reply_text(reply)
+    if changed:
+        audit(context.bot_data, AUDIT_FILTER, chat_id, user_id, 0, f"{action.lower()} domains {', '.join(changed)}")
+    logger.info(f"Admin {user_id} updated domain rules in chat {chat_id}: {action} {changed}")
+
+async def allowdomain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /allowdomain command"""
+    from utils.link_filter import ALLOW
+    await _update_domain_rules(update, context, ALLOW)
+
+async def denydomain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /denydomain command"""
+    from utils.link_filter import DENY
+    await _update_domain_rules(update, context, DENY)
+
+async def removedomain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /removedomain command"""
+    await _update_domain_rules(update, context, None)
+
+async def domains_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /domains command to list the chat's domain rules"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    from utils.link_filter import get_link_policy
+    rules = get_link_policy(context.bot_data, chat_id).trie.rules()
+    if not rules:
+        await message.reply_text("📭 No domain rules in this chat.")
+        return
+    
+    rule_lines = "\n".join(f"{'✅' if policy == 'allow' else '❌'} {rule}" for rule, policy in sorted(rules.items()))
+    await message.reply_text(f"🔗 Domain rules ({len(rules)}):\n{rule_lines}")
+
+async def floodbounds_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /floodbounds command to bound the chat's learned flood limit"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    from utils.flood_baseline import get_flood_baseline
+    baseline = get_flood_baseline(context.bot_data, chat_id)
+    if context.args:
+        try:
+            low, high = (int(arg) for arg in context.args)
+            baseline.set_bounds(low, high)
+        except ValueError:
+            await message.reply_text("⚠️ Usage: /floodbounds <min> <max>, with 1 <= min <= max")
+            return
+        audit(context.bot_data, AUDIT_SETTINGS, chat_id, user_id, 0, f"flood bounds {low}-{high}")
+        logger.info(f"Admin {user_id} set flood bounds {low}-{high} in chat {chat_id}")
+    
+    await message.reply_text(format_flood_status(baseline))
+
+def format_flood_status(baseline):
+    """Describe a chat's current flood limit and where it comes from"""
+    low, high = baseline.bounds
+    source = "learned" if baseline.learned is not None else "default"
+    return (
+        f"🌊 Flood limit: {baseline.limit} messages per {FLOOD_TIME_WINDOW}s ({source})\n"
+        f"Bounds: {low}-{high}, based on {baseline.samples:.0f} recent bursts"
+    )
+
+async def audit_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /audit command to show recent moderation actions"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    # Target: the replied-to user, a user ID, or the whole chat with "chat"
+    args = list(context.args or [])
+    target_id = None
+    try:
+        if message.reply_to_message:
+            target_id = message.reply_to_message.from_user.id
+        elif args and args[0].lower() == "chat":
+            args = args[1:]
+        elif args:
+            target_id = int(args.pop(0))
+        limit = int(args[0]) if args else AUDIT_DEFAULT_LIMIT
     except ValueError:
-        logger.error(f"Invalid chat_id in callback data: {data_parts[3]}")
+        await message.reply_text("⚠️ Usage: /audit [user_id|chat] [count], or reply to a user with /audit [count]")
         return
+    limit = min(max(limit, 1), AUDIT_MAX_LIMIT)
+    
+    from utils.audit_log import get_audit_log
+    records = get_audit_log(context.bot_data).query(chat_id, target_id, limit)
+    subject = f"user {target_id}" if target_id else "this chat"
+    if not records:
+        await message.reply_text(f"📭 No recorded actions for {subject}.")
+        return
+    
+    lines = "\n".join(record.describe() for record in records)
+    await message.reply_text(f"📜 Last {len(records)} actions for {subject}:\n{lines}")
+
+async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /settings command to configure group settings"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    # Get current settings
+    settings = context.bot_data.setdefault("chat_settings", {})
+    chat_settings = settings.setdefault(chat_id, {"banned_content": []})
+    
+    from utils.flood_baseline import get_flood_baseline
+    baseline = get_flood_baseline(context.bot_data, chat_id)
+    await message.reply_text(
+        settings_text(baseline.limit, FLOOD_TIME_WINDOW, baseline.learned is not None),
+        reply_markup=settings_keyboard(chat_settings),
+        parse_mode="Markdown"
+    )
+
+async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, setting_id) -> None:
+    """Handle callbacks for toggling settings"""
+    query = update.callback_query
+    await query.answer()
+    
+    # The settings panel lives in the chat it configures
+    chat_id = query.message.chat.id
     
     # Check if user is admin
     user_id = query.from_user.id
@@ -532,7 +1143,7 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
     settings = context.bot_data.setdefault("chat_settings", {})
     chat_settings = settings.setdefault(chat_id, {"banned_content": []})
     
-    if setting_name == "url":
+    if setting_id == SETTING_LINKS:
         if "url" in chat_settings.get("banned_content", []):
             chat_settings["banned_content"].remove("url")
             setting_status = "✅ Allowed"
@@ -542,10 +1153,9 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
         
         logger.info(f"Admin {user_id} changed link setting to {setting_status} in chat {chat_id}")
     
-    elif setting_name == "slow_mode":
+    elif setting_id == SETTING_SLOW_MODE:
         current_status = chat_settings.get("slow_mode", False)
         new_status = not current_status
-        chat_settings["slow_mode"] = new_status
         
         # Apply slow mode to the chat
         try:
@@ -555,6 +1165,8 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
             else:
                 await context.bot.set_chat_slow_mode_delay(chat_id=chat_id, seconds=0)
                 setting_status = "❌ Off"
+            chat_settings["slow_mode"] = new_status
+            reset_auto_slow_mode(context, chat_id)
             
             logger.info(f"Admin {user_id} changed slow mode to {setting_status} in chat {chat_id}")
         except Exception as e:
@@ -562,7 +1174,24 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
             await query.edit_message_text("⚠️ Failed to set slow mode. Please check my permissions.")
             return
     
-    elif setting_name == "welcome_msg":
+    elif setting_id == SETTING_AUTO_SLOW_MODE:
+        new_status = not chat_settings.get("slow_mode_auto", False)
+        chat_settings["slow_mode_auto"] = new_status
+        setting_status = "✅ On" if new_status else "❌ Off"
+        
+        # Switching auto mode off lifts whatever delay it had applied
+        chat_rate = context.bot_data.get("chat_rates", {}).get(chat_id)
+        if not new_status and chat_rate is not None and chat_rate.level and not chat_settings.get("slow_mode", False):
+            try:
+                await context.bot.set_chat_slow_mode_delay(chat_id=chat_id, seconds=0)
+            except Exception as e:
+                logger.error(f"Failed to lift auto slow mode: {e}")
+        if not new_status:
+            reset_auto_slow_mode(context, chat_id)
+        
+        logger.info(f"Admin {user_id} changed auto slow mode to {setting_status} in chat {chat_id}")
+    
+    elif setting_id == SETTING_WELCOME:
         current_status = chat_settings.get("welcome_msg", True)
         new_status = not current_status
         chat_settings["welcome_msg"] = new_status
@@ -570,36 +1199,19 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
         
         logger.info(f"Admin {user_id} changed welcome messages to {setting_status} in chat {chat_id}")
     
-    # Recreate the keyboard with updated settings
-    keyboard = [
-        [
-            InlineKeyboardButton(
-                "🔗 Links: " + ("❌ Blocked" if "url" in chat_settings.get("banned_content", []) else "✅ Allowed"),
-                callback_data=f"toggle_setting_url_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                "⏱ Slow Mode: " + ("✅ On" if chat_settings.get("slow_mode", False) else "❌ Off"),
-                callback_data=f"toggle_setting_slow_mode_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                "📢 Welcome Messages: " + ("✅ On" if chat_settings.get("welcome_msg", True) else "❌ Off"),
-                callback_data=f"toggle_setting_welcome_msg_{chat_id}"
-            )
-        ],
-        [
-            InlineKeyboardButton("Close", callback_data="close_settings")
-        ]
-    ]
+    else:
+        logger.error(f"Unknown setting id in callback data: {setting_id}")
+        return
+    
+    audit(context.bot_data, AUDIT_SETTINGS, chat_id, user_id, 0, f"{AUDIT_SETTING_LABELS[setting_id]} {setting_status}")
     
+    # Recreate the keyboard with updated settings
     try:
+        from utils.flood_baseline import get_flood_baseline
+        baseline = get_flood_baseline(context.bot_data, chat_id)
         await query.edit_message_text(
-            "⚙️ *Apex Project Group Settings*\n\n"
-            "Configure protection protocols below:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            settings_text(baseline.limit, FLOOD_TIME_WINDOW, baseline.learned is not None),
+            reply_markup=settings_keyboard(chat_settings),
             parse_mode="Markdown"
         )
     except Exception as e:
@@ -608,56 +1220,112 @@ async def toggle_setting_callback(update: Update, context: ContextTypes.DEFAULT_
 async def close_settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the close settings button callback"""
     query = update.callback_query
-    
-    if not query:
-        logger.error("Callback received with no query object")
-        return
-        
     await query.answer()
     
     try:
         await query.edit_message_text(
-            "⚙️ *Protocol Configuration Complete*\n\n"
-            "The Apex Project security parameters have been updated according to your specifications.\n\n"
-            "_Our sentinels are vigilant. Our protocols are active._\n\n"
-            "⚠️ *This control panel will self-destruct momentarily.* ⚠️",
+            SETTINGS_CLOSED_TEXT,
             parse_mode="Markdown"
         )
     except Exception as e:
         logger.error(f"Failed to update close settings message: {e}")
 
-async def delete_welcome_message(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Delete a welcome message after the specified time"""
+# Setting names written to the audit log
+AUDIT_SETTING_LABELS = {
+    SETTING_LINKS: "links",
+    SETTING_SLOW_MODE: "slow mode",
+    SETTING_AUTO_SLOW_MODE: "auto slow mode",
+    SETTING_WELCOME: "welcome messages",
+}
+
+# Setting names used by keyboards sent before the callback codec
+LEGACY_SETTING_NAMES = {"url": SETTING_LINKS, "slow_mode": SETTING_SLOW_MODE, "welcome_msg": SETTING_WELCOME}
+
+def parse_legacy_settings_callback(data):
+    """Translate `toggle_setting_<name>_<chat>` and `close_settings` payloads"""
+    from utils.callback_codec import ACTION_TOGGLE_SETTING, ACTION_CLOSE_SETTINGS
+    if data == "close_settings":
+        return ACTION_CLOSE_SETTINGS, ()
+    setting_name = data[len("toggle_setting_"):].rsplit("_", 1)[0]
+    if setting_name not in LEGACY_SETTING_NAMES:
+        raise ValueError(f"unknown legacy setting in callback data: {data}")
+    return ACTION_TOGGLE_SETTING, (LEGACY_SETTING_NAMES[setting_name],)
+
+async def delete_welcome_message(context, key, data) -> None:
+    """Delete the welcome messages of a burst once WELCOME_DELETE_DELAY has passed"""
+    chat_id = key[0]
+    message_ids = data or []
+    
+    if not message_ids:
+        logger.error(f"Expiry data missing message IDs for welcome message deletion in chat {chat_id}")
+        return
+    
+    # Batched with the chat's other deletions
+    from utils.deletion_batcher import queue_deletion
+    queue_deletion(context, chat_id, message_ids)
+    logger.info(f"Queued deletion of welcome messages {message_ids} in chat {chat_id}")
+
+def format_member_names(names):
+    """Join member names for a combined welcome, e.g. 'A, B and 3 others'"""
+    if len(names) > WELCOME_MAX_NAMES:
+        shown = names[:WELCOME_MAX_NAMES]
+        return f"{', '.join(shown)} and {len(names) - len(shown)} others"
+    if len(names) > 1:
+        return f"{', '.join(names[:-1])} and {names[-1]}"
+    return names[0]
+
+async def flush_welcome_buffer(context, key, data) -> None:
+    """Send one combined welcome for everyone who joined during the coalescing window"""
+    chat_id = key
+    buffers = context.bot_data.setdefault("welcome_buffers", {})
+    members = buffers.pop(chat_id, [])
+    if not members:
+        return
+    
+    names = format_member_names([name for _, name in members])
+    
     try:
-        # Extract data safely
-        job_data = {}
-        if hasattr(context, 'job') and context.job:
-            if hasattr(context.job, 'data'):
-                job_data = context.job.data
+        # Generate AI welcome message
+        from utils.ai_helper import generate_welcome_message
+        welcome_text = await generate_welcome_message(names)
         
-        if not job_data:
-            logger.error("Job context missing required data for welcome message deletion")
-            return
-            
-        if not isinstance(job_data, dict) or "chat_id" not in job_data or "message_id" not in job_data:
-            logger.error(f"Job data missing required fields for welcome message deletion: {job_data}")
-            return
-            
-        chat_id = job_data["chat_id"]
-        message_id = job_data["message_id"]
+        # Fall back to default message if AI fails
+        if not welcome_text:
+            welcome_text = WELCOME_MESSAGE.format(user_name=names)
         
-        # Delete the welcome message
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Deleted welcome message {message_id} in chat {chat_id}")
+        # Send welcome message and get the message object
+        welcome_msg = await context.bot.send_message(
+            chat_id=chat_id,
+            text=welcome_text,
+            parse_mode="Markdown"
+        )
+        logger.info(f"Sent combined welcome message to {len(members)} users in chat {chat_id}")
         
+        # Schedule a single deletion for the whole burst
+        from utils.expiry import get_expiry_service
+        get_expiry_service(context).schedule(
+            "welcome_delete",
+            (chat_id, welcome_msg.message_id),
+            WELCOME_DELETE_DELAY,
+            data=[welcome_msg.message_id]
+        )
+        logger.info(f"Scheduled welcome message deletion for message {welcome_msg.message_id} in {WELCOME_DELETE_DELAY} seconds")
     except Exception as e:
-        logger.error(f"Failed to delete welcome message: {e}")
+        logger.error(f"Failed to send welcome message: {e}")
 
 async def handle_new_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle new members joining the chat"""
     message = update.message
     chat_id = message.chat.id
     
+    # Remember joins for bulk commands like /banall recent <minutes>,
+    # whether or not the chat welcomes them
+    now = time.time()
+    recent_joins = context.bot_data.setdefault("recent_joins", {})
+    if chat_id not in recent_joins:
+        recent_joins[chat_id] = deque(maxlen=BULK_RECENT_JOINS)
+    recent_joins[chat_id].extend((now, member.id) for member in message.new_chat_members if not member.is_bot)
+    
     # Check if welcome messages are enabled
     settings = context.bot_data.setdefault("chat_settings", {})
     chat_settings = settings.setdefault(chat_id, {})
@@ -665,45 +1333,19 @@ async def handle_new_chat_members(update: Update, context: ContextTypes.DEFAULT_
     if not chat_settings.get("welcome_msg", True):
         return
     
-    for new_member in message.new_chat_members:
-        # Skip if the new member is a bot
-        if new_member.is_bot:
-            continue
-        
-        try:
-            # Generate AI welcome message
-            from utils.ai_helper import generate_welcome_message
-            welcome_text = await generate_welcome_message(new_member.first_name)
-            
-            # Fall back to default message if AI fails
-            if not welcome_text:
-                welcome_text = WELCOME_MESSAGE.format(user_name=new_member.first_name)
-            
-            # Send welcome message and get the message object
-            welcome_msg = await context.bot.send_message(
-                chat_id=chat_id,
-                text=welcome_text,
-                parse_mode="Markdown"
-            )
-            logger.info(f"Sent welcome message to user {new_member.id} in chat {chat_id}")
-            
-            # Schedule deletion after 60 seconds (1 minute)
-            try:
-                job_name = f"delete_welcome_{welcome_msg.message_id}"
-                if hasattr(context, 'job_queue') and context.job_queue:
-                    context.job_queue.run_once(
-                        delete_welcome_message,
-                        60,  # 60 seconds = 1 minute
-                        data={"chat_id": chat_id, "message_id": welcome_msg.message_id},
-                        name=job_name
-                    )
-                    logger.info(f"Scheduled welcome message deletion for message {welcome_msg.message_id} in 60 seconds")
-                else:
-                    logger.error(f"No job queue available for scheduling welcome message deletion")
-            except Exception as job_error:
-                logger.error(f"Failed to schedule welcome message deletion: {job_error}")
-        except Exception as e:
-            logger.error(f"Failed to send welcome message: {e}")
+    # Skip bots among the new members
+    new_members = [(member.id, member.first_name) for member in message.new_chat_members if not member.is_bot]
+    if not new_members:
+        return
+    
+    # Collect joins per chat; the first join of a burst schedules the flush
+    buffers = context.bot_data.setdefault("welcome_buffers", {})
+    flush_pending = chat_id in buffers
+    buffers.setdefault(chat_id, []).extend(new_members)
+    
+    if not flush_pending:
+        from utils.expiry import get_expiry_service
+        get_expiry_service(context).schedule("welcome_flush", chat_id, WELCOME_COALESCE_WINDOW)
 
 def register_group_management_handlers(dp, user_warnings, flood_control, chat_settings):
     """Register all handlers related to group management"""
@@ -713,15 +1355,53 @@ def register_group_management_handlers(dp, user_warnings, flood_control, chat_se
     dp.add_handler(CommandHandler("warn", warn_command, filters=filters.ChatType.GROUPS))
     dp.add_handler(CommandHandler("pin", pin_command, filters=filters.ChatType.GROUPS))
     dp.add_handler(CommandHandler("settings", settings_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("filter", filter_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("unfilter", unfilter_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("filters", filters_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("allowdomain", allowdomain_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("denydomain", denydomain_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("removedomain", removedomain_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("domains", domains_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("floodbounds", floodbounds_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("banall", banall_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("muteall", muteall_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("warnall", warnall_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("purge", purge_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("bulkresume", bulkresume_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("audit", audit_command, filters=filters.ChatType.GROUPS))
     
-    # Callback handlers
-    dp.add_handler(CallbackQueryHandler(toggle_setting_callback, pattern=r"^toggle_setting_"))
-    dp.add_handler(CallbackQueryHandler(close_settings_callback, pattern=r"^close_settings$"))
+    # Callback handlers, dispatched by action byte through the shared router
+    from utils.callback_codec import callback_router, ACTION_TOGGLE_SETTING, ACTION_CLOSE_SETTINGS
+    callback_router.route(ACTION_TOGGLE_SETTING, toggle_setting_callback)
+    callback_router.route(ACTION_CLOSE_SETTINGS, close_settings_callback)
+    callback_router.route_legacy("toggle_setting_", parse_legacy_settings_callback)
+    callback_router.route_legacy("close_settings", parse_legacy_settings_callback)
+    callback_router.attach(dp, CallbackQueryHandler)
     
     # Message handlers - simplified approach for both development and production
-    # This avoids filter operator issues in mock implementation
-    dp.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, check_flood_control))
-    dp.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, check_banned_content))
+    # This avoids filter operator issues in mock implementation.
+    # Each moderation check gets its own handler group: within one group only the
+    # first matching handler runs, which would otherwise hide them behind the AI handler.
+    dp.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, check_flood_control), group=1)
+    dp.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, check_banned_content), group=2)
+    dp.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, check_duplicate_spam), group=3)
+    dp.add_handler(MessageHandler(filters.ChatType.GROUPS, track_message_rate), group=4)
     dp.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_chat_members))
     
+    # Expiry handlers for time-bound moderation state
+    from utils.expiry import register_expiry_handler
+    register_expiry_handler("flood_window", expire_flood_window)
+    register_expiry_handler("warning", expire_warnings)
+    register_expiry_handler("mute", expire_mute)
+    register_expiry_handler("slow_mode_relax", relax_auto_slow_mode)
+    register_expiry_handler("welcome_flush", flush_welcome_buffer)
+    register_expiry_handler("welcome_delete", delete_welcome_message)
+    
+    # Bulk operations, looked up by name so checkpointed jobs can be resumed
+    from utils.bulk_executor import register_bulk_operation
+    register_bulk_operation("ban", bulk_ban, "Banning users")
+    register_bulk_operation("mute", bulk_mute, "Muting users")
+    register_bulk_operation("warn", bulk_warn, "Warning users", repeatable=False)
+    register_bulk_operation("purge", bulk_purge, "Purging messages")
+    
     logger.info("Group management handlers registered")
@@ -1,27 +1,72 @@
+import asyncio
 import logging
 import time
-from config import BOT_TOKEN
+from config import BOT_TOKEN, JOIN_SWEEP_CONCURRENCY, JOIN_RECHECK_DELAY, BULK_MAX_TARGETS
 
 # Check if we're in development mode
 dev_mode = BOT_TOKEN == "dummy_token_for_development"
 
 try:
-    from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+    from telegram import Update
+    from telegram.error import Forbidden, BadRequest
     from telegram.ext import (
         ContextTypes,
         ChatJoinRequestHandler,
+        ChatMemberHandler,
         CallbackQueryHandler,
+        CommandHandler,
+        filters,
     )
 except ImportError:
     # In development mode, import from our mock module
     from mock_telegram import (
-        Update, InlineKeyboardMarkup, InlineKeyboardButton,
-        ContextTypes, ChatJoinRequestHandler, CallbackQueryHandler
+        Update, Forbidden, BadRequest,
+        ContextTypes, ChatJoinRequestHandler, ChatMemberHandler, CallbackQueryHandler, CommandHandler, filters
     )
-from config import REQUIRED_CHANNEL, JOIN_REQUEST_TIMEOUT
+from utils.callback_codec import callback_router, ACTION_CHECK_JOINED
+from utils.audit_log import audit, AUDIT_JOIN_APPROVED, AUDIT_JOIN_DECLINED, AUDIT_SETTINGS
+from utils.message_catalog import (
+    ACCESS_GRANTED_TEXT,
+    SECURITY_BREACH_TEXT,
+    REQUEST_NULLIFIED_TEXT,
+    REQUEST_DECLINED_TEXT,
+    CRITICAL_ERROR_TEXT,
+    SYSTEM_MALFUNCTION_TEXT,
+    join_request_text,
+    verification_failed_text,
+    verification_reminder_text,
+    join_keyboard,
+)
+from utils.join_config import get_join_config, set_join_config
+from utils.outbound_queue import get_outbound_queue, queue_message, PRIORITY_HIGH, PRIORITY_LOW
+from utils.send_gateway import send_priority, PRIORITY_JOIN
+from utils.membership_cache import is_channel_member, record_membership
+from utils.telegram_helper import MEMBER_STATUSES
+from utils.bulk_executor import SKIPPED
 
 logger = logging.getLogger(__name__)
 
+def add_pending_request(context, chat_id, user_id, entry):
+    """Track a pending join request and queue it for persistence"""
+    context.bot_data.setdefault("pending_join_requests", {})[(chat_id, user_id)] = entry
+    from utils.persistence import queue_pending_put
+    queue_pending_put(context.bot_data, chat_id, user_id, entry)
+
+def remove_pending_request(context, chat_id, user_id):
+    """Forget a pending join request, its deadline and its persisted row"""
+    entry = context.bot_data.get("pending_join_requests", {}).pop((chat_id, user_id), None)
+    from utils.deadline_sweeper import get_sweeper
+    get_sweeper(context, "join_request").discard((chat_id, user_id))
+    from utils.persistence import queue_pending_remove
+    queue_pending_remove(context.bot_data, chat_id, user_id)
+    return entry
+
+def find_pending_request(pending_requests, user_id, chat_id):
+    """Return the (chat_id, user_id) key of a request; chat_id 0 matches any chat (legacy buttons)"""
+    if chat_id:
+        return (chat_id, user_id) if (chat_id, user_id) in pending_requests else None
+    return next((key for key in pending_requests if key[1] == user_id), None)
+
 async def handle_join_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle incoming chat join requests"""
     request = update.chat_join_request
@@ -30,121 +75,94 @@ async def handle_join_request(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     logger.info(f"Received join request from {user.id} ({user.username or user.first_name}) for chat {chat.id}")
     
-    # Store the join request details with timestamp
-    if "pending_join_requests" not in context.bot_data:
-        context.bot_data["pending_join_requests"] = {}
-        
-    context.bot_data["pending_join_requests"][user.id] = {
-        "chat_id": chat.id,
-        "request_id": request.id,
-        "timestamp": time.time()
-    }
+    # Requirements of this chat (cached, so normally no database round trip)
+    join_config = await get_join_config(context.bot_data, chat.id)
     
-    # Create inline keyboard for user to join the required channel
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(text="Execute Protocol 7-A", url=f"https://t.me/{REQUIRED_CHANNEL.replace('@', '')}")],
-        [InlineKeyboardButton(text="Protocol 7-A Complete", callback_data=f"check_joined_{user.id}")]
-    ])
+    # Store the join request details with timestamp, one entry per (chat, user)
+    add_pending_request(context, chat.id, user.id, {
+        "chat_id": chat.id,
+        "user_id": user.id,
+        "user_chat_id": getattr(request, "user_chat_id", None),
+        "timestamp": time.time(),
+        "timeout": join_config.timeout
+    })
     
-    # Send message to the user
+    # Schedule the timeout check with error handling
     try:
-        await context.bot.send_message(
-            chat_id=user.id,
-            text=(
-                "🔒 *ACCESS REQUEST RECEIVED* 🔒\n\n"
-                f"Greetings, {user.first_name}. The Apex Project has logged your infiltration attempt.\n\n"
-                "⚠️ *VERIFICATION PROTOCOLS ACTIVATED:* ⚠️\n"
-                f"📡 *PROTOCOL 7-A*: Subscribe to {REQUIRED_CHANNEL}\n"
-                f"⏳ *PROTOCOL 7-B*: Endure a {int(JOIN_REQUEST_TIMEOUT/60)}-minute verification period\n\n"
-                "_Both protocols must be satisfied for clearance. Those who fail will be forgotten._\n\n"
-                "The shadows are watching. Follow the instructions precisely."
-            ),
-            parse_mode="Markdown",
-            reply_markup=keyboard
-        )
-        
-        # Schedule job to check after timeout period with error handling
+        from utils.deadline_sweeper import get_sweeper
+        get_sweeper(context, "join_request").push((chat.id, user.id), time.time() + join_config.timeout)
+        logger.info(f"Scheduled timed join request check for user {user.id} in {join_config.timeout} seconds")
+    except Exception as job_error:
+        logger.error(f"Failed to schedule job for join request: {job_error}")
+        # The join request will still work through the button callback, just without the automatic timeout check
+    
+    async def send_verification():
         try:
-            job_name = f"join_request_{user.id}"
-            if hasattr(context, 'job_queue') and context.job_queue:
-                context.job_queue.run_once(
-                    check_join_request_timeout,
-                    JOIN_REQUEST_TIMEOUT,
-                    data={"user_id": user.id, "chat_id": chat.id},
-                    name=job_name
+            with send_priority(PRIORITY_JOIN):
+                await context.bot.send_message(
+                    chat_id=user.id,
+                    text=join_request_text(user.first_name, join_config.channels, join_config.timeout),
+                    parse_mode="Markdown",
+                    reply_markup=join_keyboard(user.id, chat.id, join_config.channels)
                 )
-                logger.info(f"Scheduled timed join request check for user {user.id} in {JOIN_REQUEST_TIMEOUT} seconds")
-            else:
-                logger.error(f"No job queue available for scheduling join request for user {user.id}")
-        except Exception as job_error:
-            logger.error(f"Failed to schedule job for join request: {job_error}")
-            # The join request will still work through the button callback, just without the automatic timeout check
-        
-    except Exception as e:
-        logger.error(f"Failed to send message to user {user.id}: {e}")
-        # If we can't message the user, we should not leave their request pending
-        try:
-            await request.decline()
-        except Exception as decline_error:
-            logger.error(f"Failed to decline request for user {user.id}: {decline_error}")
+        except (Forbidden, BadRequest) as e:
+            if isinstance(e, BadRequest) and "chat not found" not in str(e).lower():
+                raise
+            await decline_unreachable_request(context, request, e)
+    
+    # Queued rather than sent inline, so surges wait for the rate limit instead of failing
+    get_outbound_queue(context).submit(user.id, send_verification, PRIORITY_HIGH)
+
+async def decline_unreachable_request(context, request, error) -> None:
+    """Decline a join request whose user the bot cannot message"""
+    user = request.from_user
+    chat = request.chat
+    logger.error(f"Failed to send message to user {user.id}: {error}")
+    # If we can't message the user, we should not leave their request pending
+    if remove_pending_request(context, chat.id, user.id) is None:
+        return
+    try:
+        await request.decline()
+        audit(context.bot_data, AUDIT_JOIN_DECLINED, chat.id, 0, user.id, "could not message user")
+    except Exception as decline_error:
+        logger.error(f"Failed to decline request for user {user.id}: {decline_error}")
 
-async def check_joined_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def check_joined_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id, chat_id) -> None:
     """Handle callback when user claims they've joined the channel"""
     query = update.callback_query
-    
-    if not query:
-        logger.error("Callback received with no query object")
-        return
-        
     await query.answer()
     
-    if not query.data:
-        logger.error("Callback query missing data")
-        return
-        
-    data_parts = query.data.split('_')
-    if len(data_parts) < 3 or data_parts[0] != "check" or data_parts[1] != "joined":
-        logger.error(f"Invalid callback data format: {query.data}")
-        return
-    
-    try:
-        user_id = int(data_parts[2])
-    except ValueError:
-        logger.error(f"Invalid user_id in callback data: {data_parts[2]}")
-        return
-    
     # Only allow the actual user to check their join status
     if query.from_user.id != user_id:
         await query.message.reply_text(
-            "⚠️ *SECURITY BREACH DETECTED* ⚠️\n\n"
-            "Unauthorized access attempt logged and reported.\n\n"
-            "_The Apex Project does not tolerate interference with another's verification process._",
+            SECURITY_BREACH_TEXT,
             parse_mode="Markdown"
         )
         return
     
     pending_requests = context.bot_data.get("pending_join_requests", {})
-    if user_id not in pending_requests:
+    key = find_pending_request(pending_requests, user_id, chat_id)
+    if key is None:
         await query.edit_message_text(
-            "⛔ *ACCESS REQUEST NULLIFIED* ⛔\n\n"
-            "Your application to The Apex Project has either expired or been purged from our systems.\n\n"
-            "_The shadows wait for no one. Reapply if you seek enlightenment._",
+            REQUEST_NULLIFIED_TEXT,
             parse_mode="Markdown"
         )
         return
+    request_data = pending_requests[key]
+    chat_id = request_data["chat_id"]
+    join_config = await get_join_config(context.bot_data, chat_id)
+    timeout = request_data.get("timeout", join_config.timeout)
     
-    # Check if user has joined the required channel
+    # Check if user has joined the required channels
     try:
-        user_in_channel = await check_user_in_channel(context, user_id)
+        missing = await missing_channels(context, user_id, join_config.channels)
         
-        if user_in_channel:
+        if not missing:
             # Check if enough time has passed
-            request_data = pending_requests[user_id]
             elapsed_time = time.time() - request_data["timestamp"]
             
-            if elapsed_time >= JOIN_REQUEST_TIMEOUT:
+            if elapsed_time >= timeout:
                 # Approve the request
-                chat_id = request_data["chat_id"]
                 try:
                     await context.bot.approve_chat_join_request(
                         chat_id=chat_id,
@@ -152,27 +170,24 @@ async def check_joined_callback(update: Update, context: ContextTypes.DEFAULT_TY
                     )
                     
                     # Remove from pending requests
-                    del pending_requests[user_id]
+                    remove_pending_request(context, chat_id, user_id)
                     
                     await query.edit_message_text(
-                        "✅ *ACCESS GRANTED*\n\n"
-                        "Your verification is complete. Welcome to The Apex Project.\n\n"
-                        "_Remember to adhere to all protocols._",
+                        ACCESS_GRANTED_TEXT,
                         parse_mode="Markdown"
                     )
                     
+                    audit(context.bot_data, AUDIT_JOIN_APPROVED, chat_id, 0, user_id, "verified")
                     logger.info(f"Approved join request for user {user_id} to chat {chat_id}")
                     
                 except Exception as e:
                     logger.error(f"Failed to approve request for user {user_id}: {e}")
                     await query.edit_message_text(
-                        "⚠️ *CRITICAL ERROR DETECTED* ⚠️\n\n"
-                        "The Apex Project access mechanism encountered a critical malfunction.\n\n"
-                        "_Report this code to the Inner Circle: ERROR-AP-7842_",
+                        CRITICAL_ERROR_TEXT,
                         parse_mode="Markdown"
                     )
             else:
-                remaining_time = int(JOIN_REQUEST_TIMEOUT - elapsed_time)
+                remaining_time = int(timeout - elapsed_time)
                 await query.edit_message_text(
                     "⏳ *PROTOCOL 7-B IN PROGRESS* ⏳\n\n"
                     f"Protocol 7-A verification successful. Temporal alignment required before full access.\n\n"
@@ -181,63 +196,49 @@ async def check_joined_callback(update: Update, context: ContextTypes.DEFAULT_TY
                     parse_mode="Markdown"
                 )
         else:
-            # User hasn't joined the channel
+            # User hasn't joined every channel; only the missing ones are listed
             await query.edit_message_text(
-                "❌ *VERIFICATION FAILED* ❌\n\n"
-                f"Access to The Apex Project requires subscription to {REQUIRED_CHANNEL}.\n\n"
-                "_Those who seek knowledge must first demonstrate loyalty. Join our official channel to continue the initiation process._",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton(text="Execute Protocol 7-A", url=f"https://t.me/{REQUIRED_CHANNEL.replace('@', '')}")],
-                    [InlineKeyboardButton(text="Verify Protocol 7-A", callback_data=f"check_joined_{user_id}")]
-                ]),
+                verification_failed_text(missing),
+                reply_markup=join_keyboard(user_id, chat_id, missing, "Verify Protocol 7-A"),
                 parse_mode="Markdown"
             )
     except Exception as e:
         logger.error(f"Error checking if user {user_id} joined channel: {e}")
         await query.edit_message_text(
-            "⚠️ *SYSTEM MALFUNCTION DETECTED* ⚠️\n\n"
-            "Our surveillance systems encountered an anomaly while verifying your status.\n\n"
-            "_Shadow protocols suggest you attempt verification again momentarily._",
+            SYSTEM_MALFUNCTION_TEXT,
             parse_mode="Markdown"
         )
 
-async def check_join_request_timeout(context: ContextTypes.DEFAULT_TYPE) -> None:
+async def sweep_join_requests(context, keys) -> None:
+    """Handle a batch of join requests whose waiting period is over
+
+    Requests run JOIN_SWEEP_CONCURRENCY at a time; concurrent membership
+    lookups for the same (channel, user) share one call through the
+    membership cache.
+    """
+    semaphore = asyncio.Semaphore(JOIN_SWEEP_CONCURRENCY)
+
+    async def process(chat_id, user_id):
+        async with semaphore:
+            await check_join_request_timeout(context, chat_id, user_id)
+
+    await asyncio.gather(*(process(chat_id, user_id) for chat_id, user_id in keys))
+
+async def check_join_request_timeout(context, chat_id, user_id) -> None:
     """Check if a join request has timed out and can be approved"""
-    try:
-        # Extract data safely
-        job_data = {}
-        if hasattr(context, 'job') and context.job:
-            if hasattr(context.job, 'data'):
-                job_data = context.job.data
-            elif hasattr(context, 'job_data'):
-                job_data = context.job_data
-        
-        if not job_data:
-            logger.error("Job context missing required data")
-            return
-            
-        if not isinstance(job_data, dict) or "user_id" not in job_data or "chat_id" not in job_data:
-            logger.error(f"Job data missing required fields: {job_data}")
-            return
-    except Exception as e:
-        logger.error(f"Error extracting job data: {e}")
-        return
-        
-    user_id = job_data["user_id"]
-    chat_id = job_data["chat_id"]
-    
     logger.info(f"Checking timed join request for user {user_id}")
     
     pending_requests = context.bot_data.get("pending_join_requests", {})
-    if user_id not in pending_requests:
+    if (chat_id, user_id) not in pending_requests:
         logger.info(f"Join request for user {user_id} no longer pending")
         return
+    join_config = await get_join_config(context.bot_data, chat_id)
     
-    # Check if user has joined the required channel
+    # Check if user has joined the required channels
     try:
-        user_in_channel = await check_user_in_channel(context, user_id)
+        missing, unknown = await channel_memberships(context, user_id, join_config.channels)
         
-        if user_in_channel:
+        if not missing and not unknown:
             # Approve the request
             try:
                 await context.bot.approve_chat_join_request(
@@ -245,73 +246,276 @@ async def check_join_request_timeout(context: ContextTypes.DEFAULT_TYPE) -> None
                     user_id=user_id
                 )
                 
-                # Notify the user
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=(
-                        "✅ *ACCESS GRANTED*\n\n"
-                        "Your verification is complete. Welcome to The Apex Project.\n\n"
-                        "_Remember to adhere to all protocols._"
-                    ),
-                    parse_mode="Markdown"
-                )
-                
                 # Remove from pending requests
-                del pending_requests[user_id]
+                remove_pending_request(context, chat_id, user_id)
                 
+                # Notify the user
+                queue_message(context, user_id, text=ACCESS_GRANTED_TEXT, parse_mode="Markdown")
+                
+                audit(context.bot_data, AUDIT_JOIN_APPROVED, chat_id, 0, user_id, "verified at timeout")
                 logger.info(f"Approved timed join request for user {user_id} to chat {chat_id}")
                 
             except Exception as e:
                 logger.error(f"Failed to approve timed request for user {user_id}: {e}")
-        else:
-            # User hasn't joined the channel - keep request pending but notify them
+        elif join_config.auto_decline and unknown:
+            # Never decline on a failed lookup; check again shortly
+            from utils.deadline_sweeper import get_sweeper
+            get_sweeper(context, "join_request").push((chat_id, user_id), time.time() + JOIN_RECHECK_DELAY)
+            logger.warning(f"Could not check channels {unknown} for user {user_id}, rechecking in {JOIN_RECHECK_DELAY}s")
+        elif join_config.auto_decline:
+            # This chat declines requests whose channels are confirmed as not joined at the timeout
             try:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=(
-                        "⚠️ *VERIFICATION REMINDER* ⚠️\n\n"
-                        f"Your access request to The Apex Project requires subscription to {REQUIRED_CHANNEL}.\n\n"
-                        "_The shadows cannot embrace those who remain unaligned. Your clearance remains suspended until commitment is proven._",
-                    ),
-                    parse_mode="Markdown",
-                    reply_markup=InlineKeyboardMarkup([
-                        [InlineKeyboardButton(text="Execute Protocol 7-A", url=f"https://t.me/{REQUIRED_CHANNEL.replace('@', '')}")],
-                        [InlineKeyboardButton(text="Protocol 7-A Complete", callback_data=f"check_joined_{user_id}")]
-                    ])
-                )
+                await context.bot.decline_chat_join_request(chat_id=chat_id, user_id=user_id)
+                remove_pending_request(context, chat_id, user_id)
+                audit(context.bot_data, AUDIT_JOIN_DECLINED, chat_id, 0, user_id, "not subscribed at timeout")
+                logger.info(f"Declined timed join request for user {user_id} to chat {chat_id}")
+                queue_message(context, user_id, text=REQUEST_DECLINED_TEXT, parse_mode="Markdown")
             except Exception as e:
-                logger.error(f"Failed to send reminder to user {user_id}: {e}")
+                logger.error(f"Failed to decline timed request for user {user_id}: {e}")
+        else:
+            # User hasn't joined the channel - keep request pending but notify them
+            queue_message(
+                context,
+                user_id,
+                text=verification_reminder_text(missing + unknown),
+                parse_mode="Markdown",
+                reply_markup=join_keyboard(user_id, chat_id, missing + unknown)
+            )
     except Exception as e:
         logger.error(f"Error in timed check for user {user_id}: {e}")
 
-async def check_user_in_channel(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
-    """Check if a user is a member of the required channel"""
-    try:
-        if not REQUIRED_CHANNEL:
-            logger.error("REQUIRED_CHANNEL is not set")
-            return True  # If no channel is required, consider it a success
-            
-        # Clean the channel name if needed
-        channel_id = REQUIRED_CHANNEL
-        if channel_id.startswith('@'):
-            channel_id = channel_id[1:]  # Remove @ if present
-            
-        logger.info(f"Checking if user {user_id} is a member of channel {channel_id}")
-            
-        # Try to get the user's membership status
-        member = await context.bot.get_chat_member(chat_id=f"@{channel_id}", user_id=user_id)
+async def channel_memberships(context: ContextTypes.DEFAULT_TYPE, user_id: int, channels) -> tuple:
+    """Split the required channels into those the user has not joined and those that could not be checked"""
+    results = await asyncio.gather(*(check_user_in_channel(context, user_id, channel) for channel in channels))
+    missing = tuple(channel for channel, is_member in zip(channels, results) if is_member is False)
+    unknown = tuple(channel for channel, is_member in zip(channels, results) if is_member is None)
+    return missing, unknown
+
+async def missing_channels(context: ContextTypes.DEFAULT_TYPE, user_id: int, channels) -> tuple:
+    """Return the required channels a user is not confirmed to have joined, checked concurrently"""
+    missing, unknown = await channel_memberships(context, user_id, channels)
+    return tuple(channel for channel in channels if channel in missing or channel in unknown)
+
+async def check_user_in_channels(context: ContextTypes.DEFAULT_TYPE, user_id: int, channels) -> bool:
+    """Check if a user is a member of every required channel"""
+    return not await missing_channels(context, user_id, channels)
+
+async def check_user_in_channel(context: ContextTypes.DEFAULT_TYPE, user_id: int, channel):
+    """Check if a user is a member of a channel (@username or numeric ID); None if unknown"""
+    if not channel:
+        logger.error("Required channel is not set")
+        return True  # If no channel is required, consider it a success
+    
+    return await is_channel_member(context, channel, user_id)
+
+async def track_channel_membership(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Update the membership cache from chat_member updates of channels the bot administers"""
+    member_update = update.chat_member
+    if member_update is None or member_update.chat.type != "channel":
+        return
+    
+    new_member = member_update.new_chat_member
+    record_membership(context.bot_data, member_update.chat, new_member.user.id, new_member.status in MEMBER_STATUSES)
+
+async def joinconfig_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /joinconfig command to view or change this chat's join requirements"""
+    from handlers.group_management import is_admin, parse_duration
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    join_config = await get_join_config(context.bot_data, chat_id)
+    args = context.args or []
+    if args:
+        option, values = args[0].lower(), args[1:]
+        if option == "channels" and values:
+            join_config = join_config.replace(channels=tuple(values))
+        elif option == "timeout" and values:
+            join_config = join_config.replace(timeout=parse_duration(values[0], default=join_config.timeout))
+        elif option == "autodecline" and values and values[0].lower() in ("on", "off"):
+            join_config = join_config.replace(auto_decline=values[0].lower() == "on")
+        else:
+            await message.reply_text(
+                "⚠️ Usage: /joinconfig channels <@channel...> | timeout <duration> | autodecline on|off"
+            )
+            return
         
-        # Check if the membership status is active
-        is_member = member.status in ['member', 'administrator', 'creator']
-        logger.info(f"User {user_id} channel membership status: {member.status}, is member: {is_member}")
-        return is_member
-    except Exception as e:
-        logger.error(f"Error checking channel membership for user {user_id}: {e}")
-        return False
+        try:
+            await set_join_config(context.bot_data, chat_id, join_config)
+        except Exception as e:
+            logger.error(f"Failed to save join settings for chat {chat_id}: {e}")
+            await message.reply_text("⚠️ Failed to save join settings.")
+            return
+        audit(context.bot_data, AUDIT_SETTINGS, chat_id, user_id, 0, f"join {' '.join(args)}")
+        logger.info(f"Admin {user_id} changed join settings in chat {chat_id}: {' '.join(args)}")
+    
+    await message.reply_text(
+        "🔐 Join requirements\n"
+        f"Channels: {', '.join(join_config.channels) or 'none'}\n"
+        f"Waiting period: {join_config.timeout}s\n"
+        f"Unverified at timeout: {'decline' if join_config.auto_decline else 'remind'}"
+    )
+
+def chat_pending_requests(context, chat_id, older_than=0):
+    """Pending requests of one chat waiting at least `older_than` seconds, oldest first"""
+    cutoff = time.time() - older_than
+    entries = [
+        entry for (pending_chat_id, _), entry in context.bot_data.get("pending_join_requests", {}).items()
+        if pending_chat_id == chat_id and entry["timestamp"] <= cutoff
+    ]
+    return sorted(entries, key=lambda entry: entry["timestamp"])
+
+async def pending_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /pending command to summarize this chat's join-request backlog"""
+    from handlers.group_management import is_admin
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    # Check if user is admin
+    if not await is_admin(chat_id, user_id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    entries = chat_pending_requests(context, chat_id)
+    if not entries:
+        await message.reply_text("📭 No pending join requests.")
+        return
+    
+    now = time.time()
+    overdue = sum(1 for entry in entries if now - entry["timestamp"] >= entry["timeout"])
+    oldest = int(now - entries[0]["timestamp"])
+    await message.reply_text(
+        f"📥 Pending join requests: {len(entries)}\n"
+        f"Past their waiting period: {overdue}\n"
+        f"Oldest: {oldest // 60}m {oldest % 60}s\n"
+        "Use /approveall [verified] [duration] or /declineall [duration] to act on them."
+    )
+
+async def _start_bulk_join_job(update: Update, context: ContextTypes.DEFAULT_TYPE, action, older_than, job_args) -> None:
+    """Shared body of /approveall and /declineall"""
+    message = update.message
+    chat_id = message.chat.id
+    user_id = message.from_user.id
+    
+    entries = chat_pending_requests(context, chat_id, older_than)
+    if not entries:
+        await message.reply_text("📭 No matching pending join requests.")
+        return
+    
+    targets = [entry["user_id"] for entry in entries[:BULK_MAX_TARGETS]]
+    if len(entries) > len(targets):
+        await message.reply_text(
+            f"⚠️ {len(entries)} requests match; handling the oldest {BULK_MAX_TARGETS}. Run the command again for the rest."
+        )
+    
+    from utils.bulk_executor import new_job, start_bulk_job
+    job = new_job(chat_id, action, targets, dict(job_args, admin_id=user_id))
+    start_bulk_job(context, job)
+    logger.info(f"Admin {user_id} started bulk {action} job {job['id']} on {len(targets)} join requests in chat {chat_id}")
+
+async def approveall_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /approveall command to approve pending join requests in bulk"""
+    from handlers.group_management import is_admin, parse_duration
+    message = update.message
+    
+    # Check if user is admin
+    if not await is_admin(message.chat.id, message.from_user.id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    # Optional filters: "verified" (joined every required channel) and a minimum wait
+    verified_only = False
+    older_than = 0
+    for arg in context.args or []:
+        if arg.lower() == "verified":
+            verified_only = True
+        elif arg[0].isdigit():
+            older_than = parse_duration(arg)
+        else:
+            await message.reply_text("⚠️ Usage: /approveall [verified] [duration]")
+            return
+    
+    await _start_bulk_join_job(update, context, "approve_join", older_than, {"verified_only": verified_only})
+
+async def declineall_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /declineall command to decline pending join requests in bulk"""
+    from handlers.group_management import is_admin, parse_duration
+    message = update.message
+    
+    # Check if user is admin
+    if not await is_admin(message.chat.id, message.from_user.id, context):
+        await message.reply_text("⚠️ You do not have permission to use this command.")
+        return
+    
+    args = context.args or []
+    if len(args) > 1 or (args and not args[0][0].isdigit()):
+        await message.reply_text("⚠️ Usage: /declineall [duration]")
+        return
+    older_than = parse_duration(args[0]) if args else 0
+    
+    await _start_bulk_join_job(update, context, "decline_join", older_than, {})
+
+async def bulk_approve_join(context, chat_id, user_id, args) -> None:
+    """Bulk operation: approve one pending join request"""
+    if (chat_id, user_id) not in context.bot_data.get("pending_join_requests", {}):
+        return SKIPPED  # Handled by its own timer or button meanwhile
+    if args.get("verified_only"):
+        join_config = await get_join_config(context.bot_data, chat_id)
+        if await missing_channels(context, user_id, join_config.channels):
+            return SKIPPED
+    
+    try:
+        await context.bot.approve_chat_join_request(chat_id=chat_id, user_id=user_id)
+    except BadRequest:
+        # The request no longer exists on Telegram's side
+        remove_pending_request(context, chat_id, user_id)
+        raise
+    remove_pending_request(context, chat_id, user_id)
+    audit(context.bot_data, AUDIT_JOIN_APPROVED, chat_id, args.get("admin_id", 0), user_id, "bulk")
+    queue_message(context, user_id, PRIORITY_LOW, text=ACCESS_GRANTED_TEXT, parse_mode="Markdown")
+
+async def bulk_decline_join(context, chat_id, user_id, args) -> None:
+    """Bulk operation: decline one pending join request"""
+    if (chat_id, user_id) not in context.bot_data.get("pending_join_requests", {}):
+        return SKIPPED
+    
+    try:
+        await context.bot.decline_chat_join_request(chat_id=chat_id, user_id=user_id)
+    except BadRequest:
+        remove_pending_request(context, chat_id, user_id)
+        raise
+    remove_pending_request(context, chat_id, user_id)
+    audit(context.bot_data, AUDIT_JOIN_DECLINED, chat_id, args.get("admin_id", 0), user_id, "bulk")
+
+def parse_legacy_check_joined_callback(data):
+    """Translate `check_joined_<user>` payloads sent before the callback codec"""
+    return ACTION_CHECK_JOINED, (int(data[len("check_joined_"):]), 0)
 
 def register_join_request_handlers(dp, pending_join_requests):
     """Register all handlers related to join requests"""
     dp.add_handler(ChatJoinRequestHandler(handle_join_request))
-    dp.add_handler(CallbackQueryHandler(check_joined_callback, pattern=r"^check_joined_"))
+    dp.add_handler(ChatMemberHandler(track_channel_membership, ChatMemberHandler.CHAT_MEMBER))
+    dp.add_handler(CommandHandler("joinconfig", joinconfig_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("pending", pending_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("approveall", approveall_command, filters=filters.ChatType.GROUPS))
+    dp.add_handler(CommandHandler("declineall", declineall_command, filters=filters.ChatType.GROUPS))
+    
+    callback_router.route(ACTION_CHECK_JOINED, check_joined_callback)
+    callback_router.route_legacy("check_joined_", parse_legacy_check_joined_callback)
+    callback_router.attach(dp, CallbackQueryHandler)
+    
+    from utils.deadline_sweeper import register_sweep_handler
+    register_sweep_handler("join_request", sweep_join_requests)
+    
+    # Bulk operations for /approveall and /declineall, resumable with /bulkresume
+    from utils.bulk_executor import register_bulk_operation
+    register_bulk_operation("approve_join", bulk_approve_join, "Approving join requests")
+    register_bulk_operation("decline_join", bulk_decline_join, "Declining join requests")
     
     logger.info("Join request handlers registered")
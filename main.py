@@ -1,16 +1,18 @@
 #!/usr/bin/env python
 import os
 import sys
+import hmac
 import threading
 import subprocess
 import logging
 import requests
 import time
 from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from models import db, ChatSettings, UserWarning, UserStats, BotStatus
 from apscheduler.schedulers.background import BackgroundScheduler
+from config import BOT_MODE, WEBHOOK_URL_PATH
 
 # Configure logging
 logging.basicConfig(
@@ -39,12 +41,30 @@ scheduler = BackgroundScheduler()
 # Bot process
 bot_process = None
 
+# Bot running in this process (webhook mode)
+bot_runtime = None
+
 # Self-ping URL
 self_url = None
 
+def is_bot_running():
+    """Whether the bot is up, in either mode"""
+    if bot_runtime is not None:
+        return bot_runtime.running
+    return bool(bot_process and bot_process.poll() is None)
+
 def start_bot():
-    """Start the Telegram bot in a subprocess"""
-    global bot_process
+    """Start the Telegram bot: in-process for webhook mode, otherwise in a subprocess"""
+    global bot_process, bot_runtime
+    if BOT_MODE == "webhook":
+        if bot_runtime is None:
+            from utils.webhook_runtime import WebhookRuntime
+            bot_runtime = WebhookRuntime()
+        if bot_runtime.running:
+            return True
+        logger.info("Starting Telegram bot in webhook mode...")
+        return bot_runtime.start()
+    
     try:
         # Kill any existing bot process
         if bot_process and bot_process.poll() is None:
@@ -77,7 +97,7 @@ def start_bot():
 def index():
     """Display bot status page"""
     from config import BOT_TOKEN, REQUIRED_CHANNEL, JOIN_REQUEST_TIMEOUT
-    bot_running = bot_process and bot_process.poll() is None
+    bot_running = is_bot_running()
     
     # Get bot username
     bot_username = "The_Apex_ProjectBot"
@@ -99,9 +119,39 @@ def start_bot_route():
 @app.route('/status')
 def status():
     """API endpoint to check bot status"""
-    bot_running = bot_process and bot_process.poll() is None
+    bot_running = is_bot_running()
     return jsonify({"running": bot_running})
 
+@app.route(WEBHOOK_URL_PATH, methods=['POST'])
+def telegram_webhook():
+    """Receive an update from Telegram and hand it to the bot's event loop"""
+    if bot_runtime is None:
+        return jsonify({"ok": False, "error": "webhook mode is off"}), 404
+    if not bot_runtime.check_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        return jsonify({"ok": False}), 403
+    
+    update = request.get_json(silent=True)
+    if not isinstance(update, dict) or "update_id" not in update:
+        return jsonify({"ok": False, "error": "not an update"}), 400
+    
+    # Non-2xx makes Telegram deliver the update again later
+    if not bot_runtime.submit(update):
+        return jsonify({"ok": False, "error": "bot not running"}), 503
+    return jsonify({"ok": True})
+
+@app.route('/metrics')
+def metrics():
+    """Bot metrics as plain text (webhook mode, where the bot runs in this process)"""
+    from config import METRICS_TOKEN
+    if not METRICS_TOKEN:
+        return jsonify({"ok": False, "error": "metrics are off"}), 404
+    token = request.headers.get("Authorization", "")[len("Bearer "):]
+    if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return jsonify({"ok": False}), 403
+    
+    from utils.metrics import format_metrics
+    return format_metrics() + "\n", 200, {"Content-Type": "text/plain; charset=utf-8"}
+
 # Self-ping endpoint to keep the service alive
 @app.route('/ping')
 def ping():
@@ -111,14 +161,14 @@ def ping():
         status = BotStatus.query.first()
         if status:
             status.last_ping = datetime.utcnow()
-            status.is_running = bot_process and bot_process.poll() is None
+            status.is_running = is_bot_running()
             db.session.commit()
         else:
             # Create a new status record if it doesn't exist
             new_status = BotStatus(
                 start_time=datetime.utcnow(),
                 last_ping=datetime.utcnow(),
-                is_running=bot_process and bot_process.poll() is None
+                is_running=is_bot_running()
             )
             db.session.add(new_status)
             db.session.commit()
@@ -144,7 +194,7 @@ def update_metrics_task():
     with app.app_context():
         status = BotStatus.query.first()
         if status:
-            status.is_running = bot_process and bot_process.poll() is None
+            status.is_running = is_bot_running()
             if not status.is_running and hasattr(app, '_bot_started'):
                 # Attempt to restart the bot if it's not running
                 logger.info("Bot appears to be down, attempting to restart")
@@ -5,6 +5,8 @@ logger.info("Loading mock Telegram classes for development mode")
 
 # Mock Telegram classes for development
 class Update:
+    ALL_TYPES = ["message", "callback_query", "chat_join_request", "chat_member"]
+    
     def __init__(self):
         self.chat = Chat(id=123456789, type="private", title="Test Chat")
         self.from_user = User(id=987654321, first_name="Test", username="test_user")
@@ -18,6 +20,12 @@ class Update:
             from_user=User(id=987654321, first_name="Test", username="test_user"),
             id="test_request_id"
         )
+    
+    @classmethod
+    def de_json(cls, data, bot):
+        update = cls()
+        update.update_id = data.get("update_id")
+        return update
 
 class Chat:
     def __init__(self, id=None, type=None, title=None):
@@ -80,7 +88,7 @@ class Application:
     def __init__(self):
         self.handlers = []
         
-    def add_handler(self, handler):
+    def add_handler(self, handler, group=0):
         self.handlers.append(handler)
         logger.info(f"[MOCK] Added handler: {handler.__class__.__name__}")
         
@@ -90,6 +98,30 @@ class Application:
             
         def bot(self, bot):
             return self
+        
+        def token(self, token):
+            return self
+        
+        def request(self, request):
+            return self
+        
+        def get_updates_request(self, request):
+            return self
+        
+        def rate_limiter(self, rate_limiter):
+            return self
+        
+        def concurrent_updates(self, concurrent_updates):
+            return self
+        
+        def post_init(self, callback):
+            return self
+        
+        def post_stop(self, callback):
+            return self
+        
+        def post_shutdown(self, callback):
+            return self
             
         def build(self):
             return Application()
@@ -202,6 +234,64 @@ class ChatJoinRequest:
         logger.info(f"[MOCK] Declining join request for user {self.from_user.id} in chat {self.chat.id}")
         return True
 
+# Mock of telegram.error.TelegramError
+class TelegramError(Exception):
+    pass
+
+class Forbidden(TelegramError):
+    pass
+
+class NetworkError(TelegramError):
+    pass
+
+class TimedOut(NetworkError):
+    pass
+
+class BadRequest(NetworkError):
+    pass
+
+class RetryAfter(TelegramError):
+    def __init__(self, retry_after):
+        super().__init__(f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+# Mock of telegram.request.HTTPXRequest
+class HTTPXRequest:
+    def __init__(self, **kwargs):
+        self.settings = kwargs
+
+# Mock of telegram.ext.BaseRateLimiter
+class BaseRateLimiter:
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        return await callback(*args, **kwargs)
+
+# Mock of telegram.ext.BaseUpdateProcessor
+class BaseUpdateProcessor:
+    def __init__(self, max_concurrent_updates):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self.max_concurrent_updates = max_concurrent_updates
+        self._semaphore = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def process_update(self, update, coroutine):
+        if self._semaphore is None:
+            import asyncio
+            self._semaphore = asyncio.BoundedSemaphore(self.max_concurrent_updates)
+        async with self._semaphore:
+            await self.do_process_update(update, coroutine)
+
 # Mock handler classes
 class CommandHandler:
     def __init__(self, command, callback, filters=None):
@@ -223,6 +313,15 @@ class ChatJoinRequestHandler:
     def __init__(self, callback):
         self.callback = callback
 
+class ChatMemberHandler:
+    MY_CHAT_MEMBER = -1
+    CHAT_MEMBER = 0
+    ANY_CHAT_MEMBER = 1
+
+    def __init__(self, callback, chat_member_types=MY_CHAT_MEMBER):
+        self.callback = callback
+        self.chat_member_types = chat_member_types
+
 # Mock filters
 class Filters:
     def __init__(self):
@@ -12,6 +12,10 @@ class ChatSettings(db.Model):
     welcome_enabled = db.Column(db.Boolean, default=True)
     ai_responses_enabled = db.Column(db.Boolean, default=True)
     moderation_enabled = db.Column(db.Boolean, default=True)
+    # Join-request gate; empty values fall back to REQUIRED_CHANNEL / JOIN_REQUEST_TIMEOUT
+    required_channels = db.Column(db.Text, nullable=True)  # Comma-separated @usernames or IDs
+    join_timeout = db.Column(db.Integer, nullable=True)    # Seconds
+    auto_decline = db.Column(db.Boolean, default=False)    # Decline at timeout instead of reminding
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -27,9 +31,26 @@ class UserWarning(db.Model):
     warned_at = db.Column(db.DateTime, default=datetime.utcnow)
     warned_by = db.Column(db.BigInteger, nullable=True)
     
+    # Serves hydration and expiry queries for a user's recent warnings
+    __table_args__ = (db.Index('ix_user_warning_chat_user_time', 'chat_id', 'user_id', 'warned_at'),)
+    
     def __repr__(self):
         return f"<UserWarning {self.user_id} in {self.chat_id}>"
 
+class PendingJoinRequest(db.Model):
+    """Join requests waiting for verification, restored when the bot restarts"""
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.BigInteger, nullable=False)
+    user_id = db.Column(db.BigInteger, nullable=False)
+    user_chat_id = db.Column(db.BigInteger, nullable=True)
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow)
+    timeout = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (db.UniqueConstraint('chat_id', 'user_id'),)
+    
+    def __repr__(self):
+        return f"<PendingJoinRequest {self.user_id} for {self.chat_id}>"
+
 class UserStats(db.Model):
     """Statistics for each user"""
     id = db.Column(db.Integer, primary_key=True)
@@ -56,4 +77,31 @@ class BotStatus(db.Model):
     is_running = db.Column(db.Boolean, default=True)
     
     def __repr__(self):
-        return f"<BotStatus started at {self.start_time}>"
\ No newline at end of file
+        return f"<BotStatus started at {self.start_time}>"
+
+def create_db_app():
+    """Create a minimal Flask app bound to `db` for processes without the web app (the bot)"""
+    from flask import Flask
+    from config import DATABASE_URL
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    
+    with app.app_context():
+        db.create_all()
+        # create_all skips columns and indexes added to tables that already exist
+        add_missing_columns(ChatSettings)
+        for index in UserWarning.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+    return app
+
+def add_missing_columns(model):
+    """Add nullable columns that exist on the model but not yet in the database"""
+    existing = {column["name"] for column in db.inspect(db.engine).get_columns(model.__tablename__)}
+    with db.engine.begin() as connection:
+        for column in model.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}"))
\ No newline at end of file
@@ -28,6 +28,7 @@ from config import BOT_TOKEN, REQUIRED_CHANNEL, JOIN_REQUEST_TIMEOUT
 from handlers.ai_assistant import register_ai_assistant_handlers
 from handlers.group_management import register_group_management_handlers
 from handlers.join_request import register_join_request_handlers
+from utils.app_factory import build_application, start_polling, stop_polling
 
 # Data structures for the bot's functionality
 user_warnings = {}  # Track user warnings
@@ -50,7 +51,7 @@ async def main():
             
         # Create the Application and bot
         logger.info("Initializing application...")
-        application = Application.builder().token(BOT_TOKEN).build()
+        application = build_application()
         
         # Setup pending join requests dict in bot_data
         application.bot_data["pending_join_requests"] = {}
@@ -65,6 +66,10 @@ async def main():
         logger.info("Registering join request handlers...")
         register_join_request_handlers(application, application.bot_data["pending_join_requests"])
         
+        # Start polling with all update types; post_init loads persisted state first
+        logger.info("Starting bot in polling mode...")
+        await start_polling(application)
+        
         # Print bot information (for verification)
         bot_info = await application.bot.get_me()
         logger.info(f"Bot initialized: @{bot_info.username} (ID: {bot_info.id})")
@@ -73,11 +78,7 @@ async def main():
         print(f"✓ Required channel set to {REQUIRED_CHANNEL}")
         print(f"✓ Join request timeout set to {JOIN_REQUEST_TIMEOUT} seconds")
         
-        # Start polling with all update types
-        logger.info("Starting bot in polling mode...")
         print("Bot is now running. Press Ctrl+C to stop.")
-        await application.start()
-        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
         
         # Keep the bot running until stopped manually
         await asyncio.Event().wait()
@@ -88,7 +89,7 @@ async def main():
     finally:
         # Ensure proper cleanup
         logger.info("Stopping bot...")
-        await application.stop()
+        await stop_polling(application)
 
 if __name__ == '__main__':
     try:
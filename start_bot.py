@@ -21,7 +21,8 @@ from handlers.group_management import (ban_command, mute_command, warn_command,
                                       settings_command, toggle_setting_callback, close_settings_callback,
                                       handle_new_chat_members, check_flood_control, check_banned_content)
 from handlers.join_request import handle_join_request, check_joined_callback, check_join_request_timeout
-from config import BOT_TOKEN
+from utils.app_factory import build_application
+from config import BOT_TOKEN, POLLING_TIMEOUT
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG,
@@ -36,9 +37,8 @@ pending_join_requests = {}  # Track pending join requests
 
 def main():
     """Start the bot."""
-    # Create the Application with built-in job queue
-    builder = Application.builder().token(BOT_TOKEN)
-    application = builder.build()
+    # Create the Application with the shared HTTP and rate-limiting setup
+    application = build_application()
     
     # Register handlers from each module
     from handlers.join_request import register_join_request_handlers
@@ -54,7 +54,7 @@ def main():
     logger.info("Starting bot in polling mode...")
     
     # This is a more modern approach for python-telegram-bot v20+
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    application.run_polling(allowed_updates=Update.ALL_TYPES, timeout=POLLING_TIMEOUT)
 
 if __name__ == '__main__':
     try:
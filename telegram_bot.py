@@ -26,6 +26,7 @@ logger = logging.getLogger(__name__)
 from config import BOT_TOKEN
 from handlers.ai_assistant import register_ai_assistant_handlers
 from handlers.group_management import register_group_management_handlers
+from utils.app_factory import build_application, start_polling, stop_polling
 
 # Data structures for the bot's functionality
 user_warnings = {}      # Track user warnings
@@ -43,7 +44,7 @@ async def main():
             
         # Create the Application and bot
         logger.info("Initializing application...")
-        application = Application.builder().token(BOT_TOKEN).build()
+        application = build_application()
         
         # Register handlers with detailed error handling
         logger.info("Registering AI assistant handlers...")
@@ -52,17 +53,17 @@ async def main():
         logger.info("Registering group management handlers...")
         register_group_management_handlers(application, user_warnings, flood_control, chat_settings)
         
+        # Start polling with all update types
+        logger.info("Starting bot in polling mode...")
+        await start_polling(application)
+        
         # Print bot information (for verification)
         bot_info = await application.bot.get_me()
         logger.info(f"Bot initialized: @{bot_info.username} (ID: {bot_info.id})")
         print(f"✓ Bot successfully connected as @{bot_info.username}")
         print("✓ Telegram connection established")
         
-        # Start polling with all update types
-        logger.info("Starting bot in polling mode...")
         print("\nBot is now running. Press Ctrl+C to stop.")
-        await application.start()
-        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
         
         # Keep the bot running until stopped manually
         await asyncio.Event().wait()
@@ -74,7 +75,7 @@ async def main():
         # Ensure proper cleanup
         try:
             logger.info("Stopping bot...")
-            await application.stop()
+            await stop_polling(application)
         except Exception as cleanup_error:
             logger.error(f"Error during cleanup: {cleanup_error}")
 
@@ -0,0 +1,52 @@
+import pytest
+
+from utils.audit_log import AUDIT_BAN, AUDIT_WARN, RECORD_HEADER, RECORD_MARKER, AuditLog
+
+@pytest.fixture
+def audit_log(tmp_path):
+    audit_log = AuditLog(directory=str(tmp_path))
+    yield audit_log
+    audit_log.close()
+
+def test_query_newest_first(audit_log):
+    audit_log.append(AUDIT_WARN, -1, 10, 20, "spam")
+    audit_log.append(AUDIT_BAN, -1, 10, 20, "3 warnings")
+    audit_log.append(AUDIT_WARN, -1, 10, 30, "links")
+    audit_log.append(AUDIT_WARN, -2, 10, 20, "other chat")
+    assert [r.detail for r in audit_log.query(-1)] == ["links", "3 warnings", "spam"]
+    assert [r.detail for r in audit_log.query(-1, user_id=20)] == ["3 warnings", "spam"]
+    assert [r.detail for r in audit_log.query(-1, limit=1)] == ["links"]
+    assert audit_log.query(-3) == []
+
+def test_torn_record_is_dropped_on_reopen(tmp_path):
+    audit_log = AuditLog(directory=str(tmp_path))
+    audit_log.append(AUDIT_WARN, -1, 10, 20, "kept")
+    path = audit_log._path(audit_log._active_no)
+    audit_log.close()
+
+    # A crash mid-append leaves a header promising more bytes than were written
+    with open(path, "ab") as f:
+        f.write(RECORD_HEADER.pack(RECORD_MARKER, AUDIT_BAN, 0.0, -1, 10, 20, 100) + b"torn")
+
+    reopened = AuditLog(directory=str(tmp_path))
+    try:
+        assert [r.detail for r in reopened.query(-1)] == ["kept"]
+        reopened.append(AUDIT_BAN, -1, 10, 20, "after restart")
+        assert [r.detail for r in reopened.query(-1)] == ["after restart", "kept"]
+    finally:
+        reopened.close()
+
+def test_segments_rotate_and_stay_queryable(tmp_path):
+    audit_log = AuditLog(directory=str(tmp_path), segment_bytes=RECORD_HEADER.size * 3)
+    try:
+        for i in range(10):
+            audit_log.append(AUDIT_WARN, -1, 10, 20, str(i))
+        assert len(audit_log._segments()) > 1
+        assert [r.detail for r in audit_log.query(-1, limit=10)] == [str(i) for i in reversed(range(10))]
+    finally:
+        audit_log.close()
+
+def test_detail_is_truncated(audit_log):
+    from config import AUDIT_MAX_DETAIL
+    audit_log.append(AUDIT_WARN, -1, 0, 0, "x" * (AUDIT_MAX_DETAIL * 2))
+    assert len(audit_log.query(-1)[0].detail) == AUDIT_MAX_DETAIL
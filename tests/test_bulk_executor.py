@@ -0,0 +1,102 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import bulk_executor
+from utils.bulk_executor import (
+    SKIPPED,
+    BulkExecutor,
+    load_checkpoints,
+    new_job,
+    register_bulk_operation,
+    save_checkpoint,
+)
+
+class _Bot:
+    def __init__(self):
+        self.texts = []
+
+    async def send_message(self, chat_id, text):
+        self.texts.append(text)
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self.texts.append(text)
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_executor, "BULK_CHECKPOINT_DIR", str(tmp_path))
+    return tmp_path
+
+def _run(job):
+    executor = BulkExecutor(SimpleNamespace(bot=_Bot(), bot_data={}), job)
+    executor._interval = 0
+    return asyncio.run(executor.run())
+
+def test_checkpoint_round_trip(checkpoint_dir):
+    first = new_job(-1, "test", [1, 2, 3])
+    first["created_at"] = 1.0
+    second = new_job(-1, "test", [4])
+    second["created_at"] = 2.0
+    save_checkpoint(second)
+    save_checkpoint(first)
+    save_checkpoint(new_job(-2, "test", [5]))
+    (checkpoint_dir / "broken.json").write_text("{")
+    assert [job["id"] for job in load_checkpoints(-1)] == [first["id"], second["id"]]
+
+def test_resumed_job_only_processes_what_is_left(checkpoint_dir):
+    applied = []
+
+    async def operation(context, chat_id, target, args):
+        applied.append(target)
+
+    register_bulk_operation("test-resume", operation, "Testing")
+    job = new_job(-1, "test-resume", ["a", "b", "c", "d"])
+    job["done"] = [0]
+    job["failed"] = [2]
+    save_checkpoint(job)
+
+    resumed = load_checkpoints(-1)[0]
+    result = _run(resumed)
+    assert sorted(applied) == ["b", "d"]
+    assert sorted(result["done"]) == [0, 1, 3]
+    assert result["failed"] == [2]
+    # A finished job leaves no checkpoint behind
+    assert load_checkpoints(-1) == []
+
+def test_non_repeatable_targets_are_claimed_before_they_run(checkpoint_dir):
+    seen_in_checkpoint = []
+
+    async def operation(context, chat_id, target, args):
+        with open(checkpoint_dir / f"{job['id']}.json") as f:
+            seen_in_checkpoint.append(target in json.load(f)["done"])
+        if target == 1:
+            raise RuntimeError("failed")
+        if target == 2:
+            return SKIPPED
+
+    register_bulk_operation("test-once", operation, "Testing", repeatable=False)
+    job = new_job(-1, "test-once", [0, 1, 2])
+    result = _run(job)
+    assert seen_in_checkpoint == [True, True, True]
+    assert result["done"] == [0]
+    assert result["failed"] == [1]
+    assert result["skipped"] == [2]
+
+def test_retry_after_is_retried(checkpoint_dir):
+    attempts = []
+
+    class RetryAfter(Exception):
+        retry_after = 0.01
+
+    async def operation(context, chat_id, target, args):
+        attempts.append(target)
+        if len(attempts) == 1:
+            raise RetryAfter()
+
+    register_bulk_operation("test-retry", operation, "Testing")
+    result = _run(new_job(-1, "test-retry", ["x"]))
+    assert attempts == ["x", "x"]
+    assert result["done"] == [0]
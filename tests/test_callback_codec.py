@@ -0,0 +1,65 @@
+import asyncio
+import base64
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from utils.callback_codec import (
+    ACTION_CHECK_JOINED,
+    ACTION_CLOSE_SETTINGS,
+    ACTION_TOGGLE_SETTING,
+    CALLBACK_VERSION,
+    MAX_CALLBACK_DATA,
+    SETTING_WELCOME,
+    CallbackRouter,
+    decode_callback,
+    encode_callback,
+)
+
+def test_round_trip():
+    user_id, chat_id = 2**40 + 7, -1001234567890
+    data = encode_callback(ACTION_CHECK_JOINED, user_id, chat_id)
+    assert len(data) <= MAX_CALLBACK_DATA
+    assert decode_callback(data) == (ACTION_CHECK_JOINED, (user_id, chat_id))
+    assert decode_callback(encode_callback(ACTION_TOGGLE_SETTING, SETTING_WELCOME)) == (ACTION_TOGGLE_SETTING, (SETTING_WELCOME,))
+    assert decode_callback(encode_callback(ACTION_CLOSE_SETTINGS)) == (ACTION_CLOSE_SETTINGS, ())
+
+def _raw(payload):
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+@pytest.mark.parametrize("data", [
+    "",
+    "!!!",
+    _raw(struct.pack(">BB", CALLBACK_VERSION + 1, ACTION_CLOSE_SETTINGS)),
+    _raw(struct.pack(">BB", CALLBACK_VERSION, 250)),
+    _raw(struct.pack(">BBB", CALLBACK_VERSION, ACTION_CLOSE_SETTINGS, 0)),
+])
+def test_malformed_payloads_are_rejected(data):
+    with pytest.raises(ValueError):
+        decode_callback(data)
+
+def test_router_dispatches_new_and_legacy_payloads():
+    calls = []
+
+    async def check_joined(update, context, user_id, chat_id):
+        calls.append((user_id, chat_id))
+
+    router = CallbackRouter()
+    router.route(ACTION_CHECK_JOINED, check_joined)
+    router.route_legacy("check_joined_", lambda data: (ACTION_CHECK_JOINED, (int(data[len("check_joined_"):]), 0)))
+
+    async def press(data):
+        answered = []
+
+        async def answer():
+            answered.append(True)
+
+        query = SimpleNamespace(data=data, answer=answer)
+        await router.dispatch(SimpleNamespace(callback_query=query), None)
+        return answered
+
+    asyncio.run(press(encode_callback(ACTION_CHECK_JOINED, 5, -10)))
+    asyncio.run(press("check_joined_42"))
+    assert calls == [(5, -10), (42, 0)]
+    assert asyncio.run(press("unknown")) == [True]
@@ -0,0 +1,61 @@
+import pytest
+
+from config import MAX_FILTER_RULES
+from utils.content_filter import AhoCorasick, ChatFilter, normalize_text
+
+def test_normalize_text_folds_case_accents_and_leetspeak():
+    assert normalize_text("Ｓp4M, Ünîcode!") == " spam unicode "
+    assert normalize_text("  ...  ") == ""
+
+def test_aho_corasick_finds_overlapping_keywords():
+    automaton = AhoCorasick()
+    for keyword in ("he", "she", "hers"):
+        automaton.add(keyword, keyword)
+    assert automaton.search("ushers") == "she"
+    assert automaton.search("xyz") is None
+
+def test_aho_corasick_accepts_keywords_after_a_search():
+    automaton = AhoCorasick()
+    automaton.add("abc", "abc")
+    assert automaton.search("xxabd") is None
+    automaton.add("abd", "abd")
+    assert automaton.search("xxabd") == "abd"
+    assert automaton.search("xabcx") == "abc"
+
+def test_phrases_match_whole_words_only():
+    chat_filter = ChatFilter(["scam link"])
+    assert chat_filter.match("Here is a SC4M   link!") == "scam link"
+    assert chat_filter.match("scam linker") is None
+
+def test_removed_phrase_no_longer_matches():
+    chat_filter = ChatFilter(["spam", "junk"])
+    assert chat_filter.match("junk") == "junk"
+    assert chat_filter.remove_rule("junk")
+    assert chat_filter.match("junk") is None
+    assert chat_filter.match("spam") == "spam"
+    assert not chat_filter.remove_rule("junk")
+
+def test_regex_rules_report_the_pattern_that_fired():
+    chat_filter = ChatFilter()
+    chat_filter.add_rule("re:free\\s+money")
+    chat_filter.add_rule("re:t\\.me/\\w+")
+    assert chat_filter.match("visit t.me/scammer") == "re:t\\.me/\\w+"
+    assert chat_filter.match("FREE   money") == "re:free\\s+money"
+    assert chat_filter.match("nothing here") is None
+
+def test_backreference_rules_are_checked_on_their_own():
+    chat_filter = ChatFilter()
+    chat_filter.add_rule("re:(a)b")
+    chat_filter.add_rule("re:(\\w)\\1\\1")
+    assert chat_filter.match("zzz") == "re:(\\w)\\1\\1"
+    assert chat_filter.match("ab") == "re:(a)b"
+
+@pytest.mark.parametrize("rule", ["re:", "re:(unclosed", "re:a(?i)b", "   "])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        ChatFilter().add_rule(rule)
+
+def test_rule_limit():
+    chat_filter = ChatFilter([f"word{i}" for i in range(MAX_FILTER_RULES)])
+    with pytest.raises(ValueError):
+        chat_filter.add_rule("one more")
@@ -0,0 +1,50 @@
+import asyncio
+
+from config import SWEEP_BATCH_SIZE
+from utils.deadline_sweeper import DeadlineSweeper, register_sweep_handler
+
+def test_due_keys_come_out_in_deadline_order():
+    sweeper = DeadlineSweeper(None, {}, "test")
+    for key, deadline in (("c", 30.0), ("a", 10.0), ("b", 20.0)):
+        sweeper.push(key, deadline)
+    assert sweeper._pop_due(5.0) == []
+    assert sweeper._pop_due(25.0) == ["a", "b"]
+    assert len(sweeper) == 1
+    assert sweeper._pop_due(100.0) == ["c"]
+
+def test_push_replaces_and_discard_forgets():
+    sweeper = DeadlineSweeper(None, {}, "test")
+    sweeper.push("a", 10.0)
+    sweeper.push("a", 50.0)
+    sweeper.push("b", 10.0)
+    assert sweeper.discard("b") == 10.0
+    assert sweeper.discard("b") is None
+    assert sweeper._pop_due(20.0) == []
+    assert sweeper.deadline("a") == 50.0
+    assert sweeper._pop_due(50.0) == ["a"]
+    assert sweeper._heap == []
+
+def test_batches_are_bounded():
+    sweeper = DeadlineSweeper(None, {}, "test")
+    for key in range(SWEEP_BATCH_SIZE + 5):
+        sweeper.push(key, 1.0)
+    assert len(sweeper._pop_due(2.0)) == SWEEP_BATCH_SIZE
+    assert len(sweeper._pop_due(2.0)) == 5
+
+def test_run_loop_hands_due_keys_to_the_handler():
+    seen = []
+
+    async def handler(sweeper, keys):
+        seen.extend(keys)
+
+    register_sweep_handler("test-run", handler)
+
+    async def main():
+        sweeper = DeadlineSweeper(None, {}, "test-run")
+        sweeper.start()
+        sweeper.push("soon", 0.0)
+        await asyncio.sleep(0.05)
+        await sweeper.stop()
+
+    asyncio.run(main())
+    assert seen == ["soon"]
@@ -0,0 +1,37 @@
+from config import DUPLICATE_MAX_DISTANCE, DUPLICATE_MIN_USERS, DUPLICATE_WINDOW_SECONDS
+from utils.duplicate_detector import DuplicateWindow, hamming_distance, simhash
+
+SPAM = "Join our crypto giveaway now at the link below, free tokens for everyone!"
+
+def test_near_identical_texts_have_close_fingerprints():
+    fingerprint = simhash(SPAM)
+    for variant in (SPAM + "!!", SPAM.replace("Join", "J0in"), SPAM.upper()):
+        assert hamming_distance(fingerprint, simhash(variant)) <= DUPLICATE_MAX_DISTANCE
+    unrelated = simhash("What time is the meeting tomorrow, does anyone know where it is held?")
+    assert hamming_distance(fingerprint, unrelated) > DUPLICATE_MAX_DISTANCE
+
+def test_short_texts_are_not_fingerprinted():
+    assert simhash("gm") is None
+
+def test_wave_needs_distinct_users():
+    window = DuplicateWindow(size=16)
+    fingerprint = simhash(SPAM)
+    for message_id in range(1, 6):
+        assert window.observe(fingerprint, 1, message_id, 100.0) == []
+
+def test_wave_then_every_further_copy():
+    window = DuplicateWindow(size=16)
+    fingerprint = simhash(SPAM)
+    wave = []
+    for user_id in range(1, DUPLICATE_MIN_USERS + 1):
+        wave = window.observe(fingerprint, user_id, user_id * 10, 100.0 + user_id)
+    assert sorted(wave) == [(user_id, user_id * 10) for user_id in range(1, DUPLICATE_MIN_USERS + 1)]
+    # Later copies inside the window come back alone
+    assert window.observe(fingerprint, 99, 990, 110.0) == [(99, 990)]
+
+def test_copies_outside_the_window_do_not_count():
+    window = DuplicateWindow(size=16)
+    fingerprint = simhash(SPAM)
+    for user_id in range(1, DUPLICATE_MIN_USERS):
+        window.observe(fingerprint, user_id, user_id, 0.0)
+    assert window.observe(fingerprint, 50, 50, DUPLICATE_WINDOW_SECONDS + 1.0) == []
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from utils import expiry
+from utils.expiry import ExpiryService, register_expiry_handler
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(expiry.time, "monotonic", clock)
+    return clock
+
+def _fired(service, clock, until):
+    """Advance the wheel one tick at a time, returning {key: tick it fired at}"""
+    fired = {}
+    while clock.now - service._started_at < until:
+        clock.now += service.tick
+        for timers in service._advance().values():
+            for timer in timers:
+                fired[timer.key] = service._current_tick
+    return fired
+
+def test_timers_past_one_revolution_fire_in_their_round(clock):
+    service = ExpiryService(None, {}, tick=1, slots=8)
+    service.schedule("t", "short", 3)
+    service.schedule("t", "same-slot", 3 + 8)
+    service.schedule("t", "two-rounds", 3 + 16)
+    assert _fired(service, clock, 30) == {"short": 3, "same-slot": 11, "two-rounds": 19}
+    assert len(service) == 0
+
+def test_rescheduling_drops_the_old_deadline(clock):
+    service = ExpiryService(None, {}, tick=1, slots=8)
+    service.schedule("t", "key", 2, data="old")
+    service.schedule("t", "key", 5, data="new")
+    service.schedule("t", "moved-earlier", 20)
+    service.schedule("t", "moved-earlier", 4)
+    assert _fired(service, clock, 30) == {"moved-earlier": 4, "key": 5}
+
+def test_cancel_and_remaining(clock):
+    service = ExpiryService(None, {}, tick=1, slots=8)
+    service.schedule("t", "key", 10, data={"x": 1})
+    assert service.pending("t", "key")
+    assert service.remaining("t", "key") == 10
+    clock.now += 4
+    assert service.remaining("t", "key") == 6
+    assert service.cancel("t", "key") == {"x": 1}
+    assert service.cancel("t", "key") is None
+    assert _fired(service, clock, 30) == {}
+
+def test_delays_round_up_to_whole_ticks(clock):
+    service = ExpiryService(None, {}, tick=2, slots=8)
+    service.schedule("t", "zero", 0)
+    service.schedule("t", "odd", 3)
+    assert _fired(service, clock, 10) == {"zero": 1, "odd": 2}
+
+def test_run_loop_calls_handlers_with_their_data():
+    seen = []
+
+    async def handler(service, key, data):
+        seen.append((key, data))
+
+    register_expiry_handler("test-run", handler)
+
+    async def main():
+        service = ExpiryService(None, {}, tick=0.01, slots=8)
+        service.start()
+        service.schedule("test-run", "a", 0.01, data=1)
+        service.schedule("test-run", "b", 0.2, data=2)
+        await asyncio.sleep(0.1)
+        await service.stop()
+        return service
+
+    service = asyncio.run(main())
+    assert seen == [("a", 1)]
+    assert service.pending("test-run", "b")
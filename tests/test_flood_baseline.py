@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from config import (
+    FLOOD_BASELINE_HALF_LIFE,
+    FLOOD_BASELINE_INTERVAL,
+    FLOOD_BASELINE_MARGIN,
+    FLOOD_BASELINE_MIN_SAMPLES,
+    MAX_FLOOD_MESSAGES,
+)
+from utils.flood_baseline import FloodBaseline
+
+def test_default_limit_until_enough_samples():
+    baseline = FloodBaseline()
+    for _ in range(FLOOD_BASELINE_MIN_SAMPLES - 1):
+        baseline.record(2, 0.0)
+    baseline.recompute(1.0)
+    assert baseline.learned is None
+    assert baseline.limit == MAX_FLOOD_MESSAGES
+
+def test_limit_is_percentile_times_margin():
+    baseline = FloodBaseline()
+    baseline.bounds = (1, 100)
+    for _ in range(FLOOD_BASELINE_MIN_SAMPLES * 4):
+        baseline.record(4, 0.0)
+    baseline.recompute(0.0)
+    assert baseline.limit == math.ceil(4 * FLOOD_BASELINE_MARGIN)
+
+def test_limit_is_clamped_to_bounds():
+    baseline = FloodBaseline()
+    for _ in range(FLOOD_BASELINE_MIN_SAMPLES * 4):
+        baseline.record(1, 0.0)
+    baseline.set_bounds(4, 10)
+    baseline.recompute(0.0)
+    assert baseline.limit == 4
+
+def test_bursts_over_the_limit_are_ignored():
+    baseline = FloodBaseline()
+    baseline.record(MAX_FLOOD_MESSAGES + 1, 0.0)
+    assert baseline.pending == []
+
+def test_records_are_folded_in_per_interval():
+    baseline = FloodBaseline()
+    baseline.record(3, 0.0)
+    baseline.record(3, 1.0)
+    assert baseline.samples == 0
+    baseline.record(3, FLOOD_BASELINE_INTERVAL)
+    assert baseline.samples == 3
+
+def test_old_bursts_decay():
+    baseline = FloodBaseline()
+    for _ in range(10):
+        baseline.record(3, 0.0)
+    baseline.recompute(0.0)
+    baseline.recompute(FLOOD_BASELINE_HALF_LIFE)
+    assert baseline.samples == pytest.approx(5.0)
+
+@pytest.mark.parametrize("low, high", [(0, 5), (6, 5)])
+def test_invalid_bounds(low, high):
+    with pytest.raises(ValueError):
+        FloodBaseline().set_bounds(low, high)
@@ -0,0 +1,54 @@
+import pytest
+
+from utils.link_filter import ALLOW, DENY, DomainTrie, LinkPolicy, normalize_host
+
+def test_normalize_host():
+    assert normalize_host("HTTPS://Sub.Example.COM:8443/path?q=1") == "sub.example.com"
+    assert normalize_host("example.com.") == "example.com"
+    assert normalize_host("bücher.de") == "xn--bcher-kva.de"
+    assert normalize_host("") == ""
+
+def test_most_specific_rule_wins():
+    trie = DomainTrie()
+    trie.add("*.example.com", DENY)
+    trie.add("docs.example.com", ALLOW)
+    assert trie.lookup("example.com") == DENY
+    assert trie.lookup("a.b.example.com") == DENY
+    assert trie.lookup("docs.example.com") == ALLOW
+    assert trie.lookup("x.docs.example.com") == DENY
+    assert trie.lookup("example.org") is None
+
+def test_exact_rule_does_not_cover_subdomains():
+    trie = DomainTrie()
+    trie.add("example.com", DENY)
+    assert trie.lookup("example.com") == DENY
+    assert trie.lookup("www.example.com") is None
+
+def test_remove_prunes_and_reports_policy():
+    trie = DomainTrie()
+    trie.add("*.example.com", DENY)
+    trie.add("a.example.com", ALLOW)
+    assert trie.remove("a.example.com") == ALLOW
+    assert trie.lookup("a.example.com") == DENY
+    assert trie.remove("*.example.com") == DENY
+    assert trie.remove("*.example.com") is None
+    assert len(trie) == 0
+    assert trie._root.children == {}
+
+def test_invalid_rule():
+    with pytest.raises(ValueError):
+        DomainTrie().add("*.", DENY)
+
+def test_link_policy_defaults_and_deny_count():
+    policy = LinkPolicy()
+    policy.set_rule("*.spam.example", DENY)
+    policy.set_rule("good.example", ALLOW)
+    assert policy.deny_count == 1
+    assert policy.is_blocked("http://x.spam.example/", links_blocked=False)
+    assert not policy.is_blocked("https://good.example", links_blocked=True)
+    assert policy.is_blocked("https://other.example", links_blocked=True)
+    assert not policy.is_blocked("https://other.example", links_blocked=False)
+    policy.set_rule("*.spam.example", ALLOW)
+    assert policy.deny_count == 0
+    assert policy.remove_rule("good.example")
+    assert not policy.remove_rule("good.example")
@@ -0,0 +1,41 @@
+from config import SLOW_MODE_AUTO_MIN_DWELL, SLOW_MODE_AUTO_STEPS, SLOW_MODE_AUTO_WINDOW
+from utils.rate_tracker import ChatRate
+
+def _flood(chat_rate, start, seconds, per_second):
+    now = start
+    for _ in range(int(seconds * per_second)):
+        now += 1.0 / per_second
+        chat_rate.observe(now)
+    return now
+
+def test_rate_converges_to_message_rate():
+    chat_rate = ChatRate()
+    now = _flood(chat_rate, 0.0, 10 * SLOW_MODE_AUTO_WINDOW, 2)
+    assert abs(chat_rate.current(now) - 2.0) < 0.05
+
+def test_levels_go_up_at_once():
+    chat_rate = ChatRate()
+    now = _flood(chat_rate, 0.0, 10 * SLOW_MODE_AUTO_WINDOW, 10)
+    assert chat_rate.target_level(now) == len(SLOW_MODE_AUTO_STEPS)
+    chat_rate.set_level(len(SLOW_MODE_AUTO_STEPS), now)
+    assert chat_rate.interval() == SLOW_MODE_AUTO_STEPS[-1]
+    assert chat_rate.target_level(now) is None
+
+def test_levels_come_down_one_step_after_the_dwell():
+    chat_rate = ChatRate()
+    now = _flood(chat_rate, 0.0, 10 * SLOW_MODE_AUTO_WINDOW, 10)
+    top = len(SLOW_MODE_AUTO_STEPS)
+    chat_rate.set_level(top, now)
+
+    # Quiet at once, but the level is held for the dwell time
+    assert chat_rate.target_level(now + SLOW_MODE_AUTO_MIN_DWELL - 1) is None
+    later = now + SLOW_MODE_AUTO_MIN_DWELL + 10 * SLOW_MODE_AUTO_WINDOW
+    assert chat_rate.current(later) < 0.01
+    assert chat_rate.target_level(later) == top - 1
+
+def test_no_step_down_while_rate_is_between_thresholds():
+    chat_rate = ChatRate()
+    # Above the hysteresis band of level 1 but below the threshold of level 2
+    now = _flood(chat_rate, 0.0, 10 * SLOW_MODE_AUTO_WINDOW, 1.5)
+    chat_rate.set_level(1, 0.0)
+    assert chat_rate.target_level(now) is None
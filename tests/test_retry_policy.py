@@ -0,0 +1,36 @@
+from utils import retry_policy
+from utils.retry_policy import PERMANENT, RATE_LIMITED, RETRYABLE, classify_error, retry_delay
+import time
+
+def test_classify_error():
+    assert classify_error(retry_policy.RetryAfter(3)) == RATE_LIMITED
+    assert classify_error(retry_policy.TimedOut("timed out")) == RETRYABLE
+    assert classify_error(retry_policy.NetworkError("reset")) == RETRYABLE
+    assert classify_error(retry_policy.BadRequest("message not found")) == PERMANENT
+    assert classify_error(ValueError("bug")) == PERMANENT
+
+def test_rate_limited_waits_as_told():
+    assert retry_delay(retry_policy.RetryAfter(3), "sendMessage", 1, time.monotonic()) == (RATE_LIMITED, 3.0)
+
+def test_timed_out_send_is_not_repeated():
+    assert retry_delay(retry_policy.TimedOut("timed out"), "sendMessage", 1, time.monotonic()) == (RETRYABLE, None)
+
+def test_send_that_never_left_is_retried():
+    error = retry_policy.NetworkError("connect failed")
+    error.__cause__ = type("ConnectError", (Exception,), {})()
+    kind, delay = retry_delay(error, "sendMessage", 1, time.monotonic())
+    assert kind == RETRYABLE and delay is not None
+
+def test_idempotent_call_is_retried_with_bounded_backoff():
+    kind, delay = retry_delay(retry_policy.TimedOut("timed out"), "deleteMessage", 1, time.monotonic())
+    assert kind == RETRYABLE
+    assert 0 <= delay <= retry_policy.RETRY_BASE_DELAY
+
+def test_no_retry_after_the_last_attempt_or_deadline():
+    error = retry_policy.TimedOut("timed out")
+    assert retry_delay(error, "deleteMessage", retry_policy.RETRY_MAX_ATTEMPTS, time.monotonic())[1] is None
+    started_at = time.monotonic() - retry_policy.RETRY_DEADLINE
+    assert retry_delay(retry_policy.RetryAfter(5), "sendMessage", 1, started_at)[1] is None
+
+def test_permanent_errors_reach_the_caller():
+    assert retry_delay(retry_policy.BadRequest("bad"), "deleteMessage", 1, time.monotonic()) == (PERMANENT, None)
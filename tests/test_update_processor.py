@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils.update_processor import KeyedUpdateProcessor, update_key
+
+def _update(chat_id=None, user_id=None, callback_user_id=None):
+    return SimpleNamespace(
+        callback_query=SimpleNamespace(from_user=SimpleNamespace(id=callback_user_id)) if callback_user_id else None,
+        effective_chat=SimpleNamespace(id=chat_id) if chat_id is not None else None,
+        effective_user=SimpleNamespace(id=user_id) if user_id is not None else None,
+    )
+
+def test_update_key():
+    assert update_key(_update(chat_id=-1, user_id=5)) == ("chat", -1)
+    assert update_key(_update(chat_id=-1, user_id=5, callback_user_id=5)) == ("user", 5)
+    assert update_key(_update(user_id=5)) == ("user", 5)
+    assert update_key(_update()) is None
+
+def _handle(log, name, delay=0.0, fail=False):
+    async def handler():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(name)
+        log.append(("end", name))
+    return handler()
+
+def test_same_chat_in_order_other_chats_concurrently():
+    log = []
+
+    async def main():
+        processor = KeyedUpdateProcessor(8)
+        await asyncio.gather(
+            processor.process_update(_update(chat_id=1), _handle(log, "1a", 0.05)),
+            processor.process_update(_update(chat_id=1), _handle(log, "1b")),
+            processor.process_update(_update(chat_id=2), _handle(log, "2a")),
+        )
+        return processor
+
+    processor = asyncio.run(main())
+    assert log.index(("end", "1a")) < log.index(("start", "1b"))
+    # Chat 2 did not wait for chat 1's slow update
+    assert log.index(("end", "2a")) < log.index(("end", "1a"))
+    assert processor._queues == {}
+
+def test_failure_does_not_strand_the_queue():
+    log = []
+
+    async def main():
+        processor = KeyedUpdateProcessor(8)
+        await asyncio.gather(
+            processor.process_update(_update(chat_id=1), _handle(log, "bad", 0.01, fail=True)),
+            processor.process_update(_update(chat_id=1), _handle(log, "next")),
+        )
+
+    asyncio.run(main())
+    assert log == [("start", "bad"), ("start", "next"), ("end", "next")]
+
+def test_a_busy_chat_holds_one_slot():
+    log = []
+
+    async def main():
+        processor = KeyedUpdateProcessor(2)
+        busy = [processor.process_update(_update(chat_id=1), _handle(log, f"1-{i}", 0.01)) for i in range(5)]
+        other = processor.process_update(_update(chat_id=2), _handle(log, "2"))
+        await asyncio.gather(*busy, other)
+
+    asyncio.run(main())
+    assert log.index(("end", "2")) < log.index(("end", "1-1"))
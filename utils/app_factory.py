@@ -0,0 +1,130 @@
+import logging
+import socket
+from config import (
+    BOT_TOKEN,
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_WRITE_TIMEOUT,
+    HTTP_POOL_TIMEOUT,
+    HTTP_KEEPALIVE_IDLE,
+    UPDATES_POOL_SIZE,
+    POLLING_TIMEOUT,
+    UPDATE_CONCURRENCY,
+)
+try:
+    from telegram import Update
+    from telegram.ext import Application
+    from telegram.request import HTTPXRequest
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import Update, Application, HTTPXRequest
+from utils.send_gateway import SendGateway
+from utils.update_processor import KeyedUpdateProcessor
+from utils.persistence import start_persistence, stop_persistence
+
+logger = logging.getLogger(__name__)
+
+def _socket_options():
+    """TCP keep-alive so idle pooled connections are not silently dropped"""
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, HTTP_KEEPALIVE_IDLE))
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, HTTP_KEEPALIVE_IDLE // 3)))
+    return options
+
+def _request(pool_size):
+    return HTTPXRequest(
+        connection_pool_size=pool_size,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        write_timeout=HTTP_WRITE_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        socket_options=_socket_options(),
+    )
+
+def build_application(token=BOT_TOKEN):
+    """Build the Application every entry point runs
+
+    API calls and getUpdates get their own HTTPXRequest and connection pool,
+    sized and timed from config. Every call goes through the send gateway.
+    Up to UPDATE_CONCURRENCY updates are handled at once, in order per chat.
+    Persistence is hydrated in post_init; background workers are stopped in
+    post_stop, while the bot can still make API calls, and the database
+    writers are flushed in post_shutdown.
+
+    Args:
+        token: Bot token
+
+    Returns:
+        Application: Ready for handlers to be registered
+    """
+    return (
+        Application.builder()
+        .token(token)
+        .request(_request(HTTP_POOL_SIZE))
+        .get_updates_request(_request(UPDATES_POOL_SIZE))
+        .rate_limiter(SendGateway())
+        .concurrent_updates(KeyedUpdateProcessor(UPDATE_CONCURRENCY))
+        .post_init(start_persistence)
+        .post_stop(stop_workers)
+        .post_shutdown(stop_persistence)
+        .build()
+    )
+
+async def stop_workers(application):
+    """Stop the background workers once updates are no longer handled
+
+    Sweepers and timers go first, as their handlers queue messages and
+    deletions; then queued deletions and messages are sent.
+    """
+    bot_data = application.bot_data
+    for sweeper in bot_data.get("sweepers", {}).values():
+        await sweeper.stop()
+    expiry = bot_data.get("expiry_service")
+    if expiry is not None:
+        await expiry.stop()
+    batcher = bot_data.get("deletion_batcher")
+    if batcher is not None:
+        await batcher.stop()
+    outbound = bot_data.get("outbound_queue")
+    if outbound is not None:
+        await outbound.stop()
+
+def register_handlers(application):
+    """Set up bot_data and register every handler module on `application`"""
+    from handlers.ai_assistant import register_ai_assistant_handlers
+    from handlers.group_management import register_group_management_handlers
+    from handlers.join_request import register_join_request_handlers
+
+    user_warnings = application.bot_data.setdefault("user_warnings", {})
+    flood_control = application.bot_data.setdefault("flood_control", {})
+    chat_settings = application.bot_data.setdefault("chat_settings", {})
+    pending_join_requests = application.bot_data.setdefault("pending_join_requests", {})
+
+    register_ai_assistant_handlers(application)
+    register_group_management_handlers(application, user_warnings, flood_control, chat_settings)
+    register_join_request_handlers(application, pending_join_requests)
+
+async def start_polling(application):
+    """Initialize, run post_init and start polling, as run_polling() would
+
+    For entry points that manage their own event loop.
+    """
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await application.updater.start_polling(allowed_updates=Update.ALL_TYPES, timeout=POLLING_TIMEOUT)
+
+async def stop_polling(application):
+    """Counterpart of start_polling(): stop, run post_stop, shut down and run post_shutdown"""
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    if application.running:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
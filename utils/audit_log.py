@@ -0,0 +1,269 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from datetime import datetime, timezone
+from config import (
+    AUDIT_LOG_DIR,
+    AUDIT_SEGMENT_BYTES,
+    AUDIT_RETENTION_DAYS,
+    AUDIT_INDEX_PER_KEY,
+    AUDIT_MAX_DETAIL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Action codes stored in each record
+AUDIT_BAN = 1
+AUDIT_MUTE = 2
+AUDIT_WARN = 3
+AUDIT_PIN = 4
+AUDIT_SETTINGS = 5
+AUDIT_JOIN_APPROVED = 6
+AUDIT_JOIN_DECLINED = 7
+AUDIT_PURGE = 8
+AUDIT_FILTER = 9
+
+AUDIT_ACTION_NAMES = {
+    AUDIT_BAN: "ban",
+    AUDIT_MUTE: "mute",
+    AUDIT_WARN: "warn",
+    AUDIT_PIN: "pin",
+    AUDIT_SETTINGS: "settings",
+    AUDIT_JOIN_APPROVED: "join approved",
+    AUDIT_JOIN_DECLINED: "join declined",
+    AUDIT_PURGE: "purge",
+    AUDIT_FILTER: "filter",
+}
+
+# Every segment starts with this magic; records follow back to back
+SEGMENT_MAGIC = b"APXAUD01"
+# Record header: marker, action, timestamp, chat, actor, target, detail length
+RECORD_HEADER = struct.Struct(">HBxdqqqI")
+RECORD_MARKER = 0xA7A7
+
+class AuditRecord:
+    __slots__ = ("action", "timestamp", "chat_id", "actor_id", "target_id", "detail")
+
+    def __init__(self, action, timestamp, chat_id, actor_id, target_id, detail):
+        self.action = action
+        self.timestamp = timestamp
+        self.chat_id = chat_id
+        self.actor_id = actor_id
+        self.target_id = target_id
+        self.detail = detail
+
+    @property
+    def action_name(self):
+        return AUDIT_ACTION_NAMES.get(self.action, f"action {self.action}")
+
+    def describe(self):
+        """One line for /audit, e.g. `2024-05-01 12:00 ban by admin 1 on user 2: spam`"""
+        when = datetime.fromtimestamp(self.timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M")
+        actor = f"admin {self.actor_id}" if self.actor_id else "bot"
+        target = f" on user {self.target_id}" if self.target_id else ""
+        detail = f": {self.detail}" if self.detail else ""
+        return f"{when} {self.action_name} by {actor}{target}{detail}"
+
+def _iter_records(buf, start=len(SEGMENT_MAGIC)):
+    """Yield (offset, header fields) for every complete record in a segment buffer"""
+    offset = start
+    end = len(buf)
+    while offset + RECORD_HEADER.size <= end:
+        fields = RECORD_HEADER.unpack_from(buf, offset)
+        if fields[0] != RECORD_MARKER or offset + RECORD_HEADER.size + fields[-1] > end:
+            break
+        yield offset, fields
+        offset += RECORD_HEADER.size + fields[-1]
+
+class AuditLog:
+    """Append-only moderation audit log in numbered binary segment files
+
+    Appends write one fixed-size header plus the detail bytes to the active
+    segment and push a (segment, offset) reference onto bounded per-chat and
+    per-(chat, user) indexes, so the hot path costs one write call. Queries
+    follow those references into memory-mapped segments. Segments rotate at
+    AUDIT_SEGMENT_BYTES; on rotation, records older than AUDIT_RETENTION_DAYS
+    are compacted away.
+    """
+
+    def __init__(self, directory=AUDIT_LOG_DIR, segment_bytes=AUDIT_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._by_chat = {}
+        self._by_user = {}
+        self._oldest = {}  # segment -> timestamp of its oldest record
+        self._maps = {}    # sealed segment -> (file, mmap)
+        self._active = None
+        self._active_no = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, segment_no):
+        return os.path.join(self.directory, f"{segment_no:08d}.seg")
+
+    def _segments(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    def _index(self, segment_no, offset, timestamp, chat_id, target_id):
+        ref = (segment_no, offset)
+        chat_refs = self._by_chat.get(chat_id)
+        if chat_refs is None:
+            chat_refs = self._by_chat[chat_id] = deque(maxlen=AUDIT_INDEX_PER_KEY)
+        chat_refs.append(ref)
+        if target_id:
+            user_refs = self._by_user.get((chat_id, target_id))
+            if user_refs is None:
+                user_refs = self._by_user[(chat_id, target_id)] = deque(maxlen=AUDIT_INDEX_PER_KEY)
+            user_refs.append(ref)
+        self._oldest.setdefault(segment_no, timestamp)
+
+    def _scan(self, segment_no):
+        """Index one segment; returns the offset just past its last complete record"""
+        with open(self._path(segment_no), "rb") as f:
+            buf = f.read()
+        if not buf.startswith(SEGMENT_MAGIC):
+            logger.error(f"Skipping audit segment {segment_no} with a bad header")
+            return None
+        end = len(SEGMENT_MAGIC)
+        for offset, (_, _, timestamp, chat_id, _, target_id, length) in _iter_records(buf):
+            self._index(segment_no, offset, timestamp, chat_id, target_id)
+            end = offset + RECORD_HEADER.size + length
+        return end
+
+    def _load(self):
+        self._by_chat.clear()
+        self._by_user.clear()
+        self._oldest.clear()
+        segments = self._segments()
+        end = None
+        for segment_no in segments:
+            end = self._scan(segment_no)
+        if segments and end is not None:
+            self._active_no = segments[-1]
+            self._open_active(truncate_to=end)
+        else:
+            self._active_no = segments[-1] + 1 if segments else 1
+            self._open_active()
+
+    def _open_active(self, truncate_to=None):
+        path = self._path(self._active_no)
+        self._active = open(path, "ab")
+        if truncate_to is not None:
+            # Drop a record torn by a crash mid-write
+            self._active.truncate(truncate_to)
+            self._active.seek(0, os.SEEK_END)
+        elif self._active.tell() == 0:
+            self._active.write(SEGMENT_MAGIC)
+            self._active.flush()
+
+    def close(self):
+        for f, mapped in self._maps.values():
+            mapped.close()
+            f.close()
+        self._maps.clear()
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    def append(self, action, chat_id, actor_id=0, target_id=0, detail=""):
+        """Append one record; returns its (segment, offset) reference"""
+        payload = detail.encode("utf-8")[:AUDIT_MAX_DETAIL]
+        timestamp = time.time()
+        offset = self._active.tell()
+        self._active.write(RECORD_HEADER.pack(
+            RECORD_MARKER, action, timestamp, chat_id, actor_id, target_id, len(payload)
+        ) + payload)
+        self._active.flush()
+        self._index(self._active_no, offset, timestamp, chat_id, target_id)
+        if self._active.tell() >= self.segment_bytes:
+            self._rotate()
+        return self._active_no, offset
+
+    def _rotate(self):
+        self._active.close()
+        self._active_no += 1
+        self._open_active()
+        self.compact()
+
+    def compact(self):
+        """Drop records older than AUDIT_RETENTION_DAYS from sealed segments"""
+        cutoff = time.time() - AUDIT_RETENTION_DAYS * 86400
+        stale = [no for no, oldest in self._oldest.items() if no != self._active_no and oldest < cutoff]
+        if not stale:
+            return
+        for segment_no in stale:
+            self._unmap(segment_no)
+            path = self._path(segment_no)
+            with open(path, "rb") as f:
+                buf = f.read()
+            kept = [
+                buf[offset:offset + RECORD_HEADER.size + fields[-1]]
+                for offset, fields in _iter_records(buf) if fields[2] >= cutoff
+            ]
+            if not kept:
+                os.remove(path)
+                continue
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(SEGMENT_MAGIC)
+                f.writelines(kept)
+            os.replace(tmp_path, path)
+        # Offsets moved, so the index is rebuilt from disk
+        self._active.close()
+        self._load()
+        logger.info(f"Compacted {len(stale)} audit segments")
+
+    def _unmap(self, segment_no):
+        entry = self._maps.pop(segment_no, None)
+        if entry is not None:
+            entry[1].close()
+            entry[0].close()
+
+    def _buffer(self, segment_no, active_map):
+        if segment_no == self._active_no:
+            return active_map
+        entry = self._maps.get(segment_no)
+        if entry is None:
+            f = open(self._path(segment_no), "rb")
+            entry = self._maps[segment_no] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return entry[1]
+
+    def query(self, chat_id, user_id=None, limit=10):
+        """Return the newest `limit` records of a chat, or of one user in it, newest first"""
+        refs = self._by_user.get((chat_id, user_id)) if user_id else self._by_chat.get(chat_id)
+        if not refs:
+            return []
+        refs = list(refs)[-limit:]
+
+        # The active segment keeps growing, so it is mapped per query
+        with open(self._path(self._active_no), "rb") as f:
+            active_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            records = []
+            for segment_no, offset in reversed(refs):
+                buf = self._buffer(segment_no, active_map)
+                _, action, timestamp, chat, actor, target, length = RECORD_HEADER.unpack_from(buf, offset)
+                start = offset + RECORD_HEADER.size
+                detail = buf[start:start + length].decode("utf-8", "replace")
+                records.append(AuditRecord(action, timestamp, chat, actor, target, detail))
+            return records
+        finally:
+            active_map.close()
+
+def get_audit_log(bot_data):
+    """Return the shared audit log, opening it on first use"""
+    audit_log = bot_data.get("audit_log")
+    if audit_log is None:
+        audit_log = AuditLog()
+        bot_data["audit_log"] = audit_log
+    return audit_log
+
+def audit(bot_data, action, chat_id, actor_id=0, target_id=0, detail=""):
+    """Record a moderation action; actor 0 means the bot acted on its own"""
+    try:
+        get_audit_log(bot_data).append(action, chat_id, actor_id, target_id, detail)
+    except (OSError, ValueError, struct.error) as e:
+        logger.error(f"Failed to write audit record for chat {chat_id}: {e}")
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from config import (
+    BULK_CONCURRENCY,
+    BULK_RATE_LIMIT,
+    BULK_MAX_RETRIES,
+    BULK_PROGRESS_INTERVAL,
+    BULK_CHECKPOINT_EVERY,
+    BULK_CHECKPOINT_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bulk operations by action: async def operation(context, chat_id, target, args)
+_operations = {}
+
+# Returned by an operation that had nothing to do for a target (e.g. a join
+# request handled meanwhile), so it is not counted as done
+SKIPPED = "skipped"
+
+def register_bulk_operation(action, operation, label, repeatable=True):
+    """Register the coroutine that applies `action` to one target
+
+    Jobs only store the action name, so a job resumed from its checkpoint
+    finds its operation here. `label` is shown in the progress message.
+    Operations that must not run twice on a target (warnings add up) pass
+    repeatable=False: each target is checkpointed as done before it is
+    applied, so a resumed job skips it.
+    """
+    _operations[action] = (operation, label, repeatable)
+
+def new_job(chat_id, action, targets, args=None):
+    """Create a job applying `action` to every target in `targets`"""
+    return {
+        "id": uuid.uuid4().hex[:8],
+        "chat_id": chat_id,
+        "action": action,
+        "targets": list(targets),
+        "args": args or {},
+        "done": [],
+        "skipped": [],
+        "failed": [],
+        "status_message_id": None,
+        "created_at": time.time(),
+    }
+
+def _checkpoint_path(job_id):
+    return os.path.join(BULK_CHECKPOINT_DIR, f"{job_id}.json")
+
+def save_checkpoint(job):
+    """Atomically write the job's progress to its checkpoint file"""
+    os.makedirs(BULK_CHECKPOINT_DIR, exist_ok=True)
+    path = _checkpoint_path(job["id"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+def remove_checkpoint(job_id):
+    try:
+        os.remove(_checkpoint_path(job_id))
+    except FileNotFoundError:
+        pass
+
+def load_checkpoints(chat_id):
+    """Return the unfinished jobs of a chat, oldest first"""
+    if not os.path.isdir(BULK_CHECKPOINT_DIR):
+        return []
+    jobs = []
+    for name in os.listdir(BULK_CHECKPOINT_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(BULK_CHECKPOINT_DIR, name)) as f:
+                job = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable bulk checkpoint {name}: {e}")
+            continue
+        if job.get("chat_id") == chat_id:
+            jobs.append(job)
+    return sorted(jobs, key=lambda job: job["created_at"])
+
+class BulkExecutor:
+    """Run one bulk job with bounded concurrency, pacing and progress reporting
+
+    BULK_CONCURRENCY workers share a pacer that lets at most BULK_RATE_LIMIT
+    calls start per second. A RetryAfter from Telegram pushes the pacer back,
+    pausing every worker, and the target is retried. Progress is edited into
+    a single status message and checkpointed so the job can be resumed.
+    """
+
+    def __init__(self, context, job):
+        self.context = context
+        self.job = job
+        self._next_at = 0.0
+        self._interval = 1.0 / BULK_RATE_LIMIT
+        self._since_checkpoint = 0
+        self._reported_at = 0.0
+
+    async def _pace(self):
+        now = time.monotonic()
+        start_at = max(now, self._next_at)
+        self._next_at = start_at + self._interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def _apply(self, operation, index):
+        """Apply the operation to one target; returns "done", SKIPPED or "failed" (keys of the job)"""
+        job = self.job
+        target = job["targets"][index]
+        for attempt in range(BULK_MAX_RETRIES + 1):
+            await self._pace()
+            try:
+                if await operation(self.context, job["chat_id"], target, job["args"]) == SKIPPED:
+                    return SKIPPED
+                return "done"
+            except Exception as e:
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is None or attempt == BULK_MAX_RETRIES:
+                    logger.error(f"Bulk {job['action']} failed on {target} in chat {job['chat_id']}: {e}")
+                    return "failed"
+                # Flood limit hit: hold back every worker, not just this one
+                delay = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else retry_after
+                self._next_at = max(self._next_at, time.monotonic() + delay)
+                logger.warning(f"Bulk {job['action']} rate limited, pausing {delay}s")
+        return "failed"
+
+    async def _report(self, label, final=False):
+        job = self.job
+        now = time.monotonic()
+        if not final and now - self._reported_at < BULK_PROGRESS_INTERVAL:
+            return
+        self._reported_at = now
+
+        processed = len(job["done"]) + len(job["skipped"]) + len(job["failed"])
+        text = f"{'✅' if final else '⏳'} {label}: {processed}/{len(job['targets'])} processed"
+        if job["skipped"]:
+            text += f", {len(job['skipped'])} skipped"
+        if job["failed"]:
+            text += f", {len(job['failed'])} failed"
+        if not final:
+            text += f"\nJob {job['id']} (resume with /bulkresume if interrupted)"
+        try:
+            if job["status_message_id"] is None:
+                status = await self.context.bot.send_message(chat_id=job["chat_id"], text=text)
+                job["status_message_id"] = status.message_id
+            else:
+                await self.context.bot.edit_message_text(
+                    chat_id=job["chat_id"],
+                    message_id=job["status_message_id"],
+                    text=text
+                )
+        except Exception as e:
+            logger.error(f"Failed to update bulk progress for job {job['id']}: {e}")
+
+    def _checkpoint(self, force=False):
+        self._since_checkpoint += 1
+        if force or self._since_checkpoint >= BULK_CHECKPOINT_EVERY:
+            self._since_checkpoint = 0
+            try:
+                save_checkpoint(self.job)
+            except OSError as e:
+                logger.error(f"Failed to checkpoint bulk job {self.job['id']}: {e}")
+
+    async def run(self):
+        """Process every target not yet done; returns the job"""
+        job = self.job
+        operation, label, repeatable = _operations[job["action"]]
+        job.setdefault("skipped", [])  # missing in checkpoints of older jobs
+        finished = set(job["done"]) | set(job["skipped"]) | set(job["failed"])
+        pending = iter([i for i in range(len(job["targets"])) if i not in finished])
+
+        async def worker():
+            for index in pending:
+                if repeatable:
+                    job[await self._apply(operation, index)].append(index)
+                    self._checkpoint()
+                else:
+                    # Claimed in the checkpoint first, so a resumed job never repeats it
+                    job["done"].append(index)
+                    self._checkpoint(force=True)
+                    outcome = await self._apply(operation, index)
+                    if outcome != "done":
+                        job["done"].remove(index)
+                        job[outcome].append(index)
+                await self._report(label)
+
+        await self._report(label)
+        self._checkpoint(force=True)
+        await asyncio.gather(*(worker() for _ in range(BULK_CONCURRENCY)))
+
+        await self._report(label, final=True)
+        remove_checkpoint(job["id"])
+        logger.info(
+            f"Bulk {job['action']} job {job['id']} in chat {job['chat_id']} finished: "
+            f"{len(job['done'])} done, {len(job['skipped'])} skipped, {len(job['failed'])} failed"
+        )
+        return job
+
+def start_bulk_job(context, job):
+    """Run a job in the background unless it is already running
+
+    Returns:
+        bool: False if a job with the same id is still running
+    """
+    running = context.bot_data.setdefault("bulk_jobs", {})
+    if job["id"] in running:
+        return False
+
+    # A background task keeps the update loop free while the job runs
+    task = asyncio.get_running_loop().create_task(BulkExecutor(context, job).run())
+    running[job["id"]] = task
+    task.add_done_callback(lambda _: running.pop(job["id"], None))
+    return True
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever a payload layout changes; older payloads are rejected
+CALLBACK_VERSION = 1
+
+# Action bytes shared by all inline keyboards
+ACTION_TOGGLE_SETTING = 1  # fields: setting id (chat comes from the message)
+ACTION_CLOSE_SETTINGS = 2  # no fields
+ACTION_CHECK_JOINED = 3    # fields: user id, chat id
+
+# Setting IDs carried by ACTION_TOGGLE_SETTING
+SETTING_LINKS = 1
+SETTING_SLOW_MODE = 2
+SETTING_WELCOME = 3
+SETTING_AUTO_SLOW_MODE = 4
+
+# Telegram rejects callback_data longer than this many bytes
+MAX_CALLBACK_DATA = 64
+
+_HEADER = struct.Struct(">BB")
+_LAYOUTS = {
+    ACTION_TOGGLE_SETTING: struct.Struct(">B"),
+    ACTION_CLOSE_SETTINGS: struct.Struct(">"),
+    ACTION_CHECK_JOINED: struct.Struct(">qq"),
+}
+
+def encode_callback(action, *fields):
+    """Pack an action and its fixed fields into compact callback_data
+
+    Args:
+        action (int): One of the ACTION_* bytes
+        *fields: Field values in the order of the action's layout
+
+    Returns:
+        str: URL-safe base64 payload, at most MAX_CALLBACK_DATA characters
+    """
+    payload = _HEADER.pack(CALLBACK_VERSION, action) + _LAYOUTS[action].pack(*fields)
+    data = base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+    if len(data) > MAX_CALLBACK_DATA:
+        raise ValueError(f"callback payload for action {action} is {len(data)} bytes")
+    return data
+
+def decode_callback(data):
+    """Unpack callback_data produced by encode_callback
+
+    Returns:
+        tuple: (action, fields)
+
+    Raises:
+        ValueError: If the payload is malformed, from another version or unknown
+    """
+    try:
+        payload = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        raise ValueError(f"invalid callback payload: {data!r}")
+    if len(payload) < _HEADER.size:
+        raise ValueError(f"truncated callback payload: {data!r}")
+
+    version, action = _HEADER.unpack_from(payload)
+    layout = _LAYOUTS.get(action)
+    if version != CALLBACK_VERSION or layout is None or len(payload) != _HEADER.size + layout.size:
+        raise ValueError(f"unsupported callback payload: {data!r}")
+    return action, layout.unpack_from(payload, _HEADER.size)
+
+class CallbackRouter:
+    """Dispatch callback queries to handlers by action byte
+
+    Handlers are called as handler(update, context, *fields). Keyboards sent
+    before the codec existed are translated by legacy parsers, which are only
+    consulted when a payload does not decode.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._legacy = []
+        self._attached = set()
+
+    def route(self, action, handler):
+        """Register the handler for an action byte"""
+        self._routes[action] = handler
+
+    def route_legacy(self, prefix, parser):
+        """Register parser(data) -> (action, fields) for old `prefix...` payloads"""
+        self._legacy.append((prefix, parser))
+
+    def attach(self, dp, handler_class):
+        """Add the single callback query handler to an application once"""
+        if id(dp) in self._attached:
+            return
+        self._attached.add(id(dp))
+        dp.add_handler(handler_class(self.dispatch))
+
+    def _parse(self, data):
+        try:
+            return decode_callback(data)
+        except ValueError:
+            for prefix, parser in self._legacy:
+                if data.startswith(prefix):
+                    return parser(data)
+            raise
+
+    async def dispatch(self, update, context):
+        """Decode the query payload and call the routed handler"""
+        query = update.callback_query
+        if not query or not query.data:
+            logger.error("Callback query missing data")
+            return
+
+        try:
+            action, fields = self._parse(query.data)
+        except (ValueError, IndexError) as e:
+            logger.error(f"Invalid callback data: {e}")
+            await query.answer()
+            return
+
+        handler = self._routes.get(action)
+        if handler is None:
+            logger.error(f"No callback handler for action {action}")
+            await query.answer()
+            return
+        await handler(update, context, *fields)
+
+# Router shared by the settings and join-request keyboards
+callback_router = CallbackRouter()
@@ -0,0 +1,248 @@
+import logging
+import re
+import unicodedata
+import warnings
+from collections import deque
+from config import BANNED_PHRASES, MAX_FILTER_RULES
+
+logger = logging.getLogger(__name__)
+
+# Prefix that marks a filter rule as a regular expression instead of a phrase
+REGEX_PREFIX = "re:"
+
+# Common character substitutions used to dodge word filters
+LEET_MAP = str.maketrans({
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "@": "a",
+    "$": "s",
+})
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Backreferences and conditionals refer to group numbers, which shift once a
+# pattern is joined with others; such patterns are searched on their own
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+def normalize_text(text):
+    """Fold text into the form used for phrase matching
+
+    Applies compatibility decomposition, strips accents, case-folds, folds
+    leetspeak digits/symbols and collapses everything that is not a letter or
+    digit into single spaces. The result is padded with spaces so phrases only
+    match on word boundaries.
+
+    Args:
+        text (str): Raw message text or phrase
+
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.casefold().translate(LEET_MAP)
+    text = _NON_WORD.sub(" ", text).strip()
+    return f" {text} " if text else ""
+
+class AhoCorasick:
+    """Multi-pattern matcher that scans text in a single linear pass
+
+    Keywords can be added after the automaton has been built; only the
+    failure links are recomputed, the existing trie is kept.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [()]     # values of keywords ending exactly at a node
+        self._output = [()]  # own values plus those reachable via failure links
+        self._built = True
+
+    def add(self, keyword, value):
+        """Insert a keyword that reports `value` when found"""
+        node = 0
+        for ch in keyword:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+                self._output.append(())
+            node = next_node
+        self._own[node] = self._own[node] + (value,)
+        self._built = False
+
+    def build(self):
+        """Compute failure links and merged outputs with a breadth-first walk"""
+        queue = deque()
+        for next_node in self._goto[0].values():
+            self._fail[next_node] = 0
+            self._output[next_node] = self._own[next_node]
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for ch, next_node in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[next_node] = fail
+                self._output[next_node] = self._own[next_node] + self._output[fail]
+                queue.append(next_node)
+
+        self._built = True
+
+    def search(self, text):
+        """Return the value of the first keyword found in `text`, or None"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                return output[node][0]
+        return None
+
+    def __len__(self):
+        return len(self._goto)
+
+class ChatFilter:
+    """Phrase and regex rules for one chat, compiled into a single matcher"""
+
+    def __init__(self, phrases=()):
+        self.phrases = {}   # normalized phrase -> phrase as entered by the admin
+        self.patterns = {}  # regex source -> compiled regex
+        self._automaton = None
+        self._combined_regex = None
+        self._standalone = []  # (source, compiled) of patterns not in the combined regex
+        self._regex_dirty = False
+        for phrase in phrases:
+            self.add_rule(phrase)
+
+    def __len__(self):
+        return len(self.phrases) + len(self.patterns)
+
+    def add_rule(self, rule):
+        """Add a phrase, or a regex when prefixed with `re:`
+
+        Raises:
+            ValueError: If the rule is empty, invalid or the chat is at its rule limit
+        """
+        rule = rule.strip()
+        if len(self) >= MAX_FILTER_RULES:
+            raise ValueError(f"rule limit of {MAX_FILTER_RULES} reached")
+
+        if rule.lower().startswith(REGEX_PREFIX):
+            source = rule[len(REGEX_PREFIX):].strip()
+            if not source:
+                raise ValueError("empty pattern")
+            try:
+                # Checked the way it is combined, so it cannot break out of its
+                # group; inline flags like (?i) would apply to every rule
+                with warnings.catch_warnings():
+                    warnings.simplefilter("error")
+                    re.compile(f"(?:{source})", re.IGNORECASE)
+                    pattern = re.compile(source, re.IGNORECASE)
+            except (re.error, DeprecationWarning) as e:
+                raise ValueError(f"invalid pattern: {e}")
+            self.patterns[source] = pattern
+            self._regex_dirty = True
+            return
+
+        normalized = normalize_text(rule)
+        if not normalized:
+            raise ValueError("empty phrase")
+        if normalized in self.phrases:
+            return
+        self.phrases[normalized] = rule
+        # Extend the existing automaton instead of rebuilding it
+        if self._automaton is not None:
+            self._automaton.add(normalized, rule)
+
+    def remove_rule(self, rule):
+        """Remove a phrase or `re:` pattern, returning True if it existed"""
+        rule = rule.strip()
+        if rule.lower().startswith(REGEX_PREFIX):
+            removed = self.patterns.pop(rule[len(REGEX_PREFIX):].strip(), None) is not None
+            self._regex_dirty = self._regex_dirty or removed
+            return removed
+
+        removed = self.phrases.pop(normalize_text(rule), None) is not None
+        if removed:
+            # Aho-Corasick has no cheap delete; rebuild lazily on the next scan
+            self._automaton = None
+        return removed
+
+    def rules(self):
+        """List all rules as they were entered"""
+        return list(self.phrases.values()) + [REGEX_PREFIX + source for source in self.patterns]
+
+    def _compile(self):
+        if self._automaton is None:
+            self._automaton = AhoCorasick()
+            for normalized, rule in self.phrases.items():
+                self._automaton.add(normalized, rule)
+        if self._regex_dirty:
+            combinable = []
+            self._standalone = []
+            for source, pattern in self.patterns.items():
+                if pattern.groupindex or _GROUP_REFERENCE.search(source):
+                    self._standalone.append((source, pattern))
+                else:
+                    combinable.append(source)
+            self._combined_regex = None
+            if combinable:
+                try:
+                    self._combined_regex = re.compile(
+                        "|".join(f"(?:{source})" for source in combinable),
+                        re.IGNORECASE
+                    )
+                except re.error as e:
+                    logger.error(f"Could not combine {len(combinable)} filter patterns, checking them one by one: {e}")
+                    self._standalone = list(self.patterns.items())
+            self._regex_dirty = False
+
+    def match(self, text):
+        """Return the first rule matched by `text`, or None"""
+        if not text or not len(self):
+            return None
+        self._compile()
+
+        if self.phrases:
+            rule = self._automaton.search(normalize_text(text))
+            if rule is not None:
+                return rule
+
+        if self.patterns:
+            text = unicodedata.normalize("NFKC", text)
+            if self._combined_regex is not None and self._combined_regex.search(text):
+                # Only on a hit: find which of the patterns fired
+                for source, pattern in self.patterns.items():
+                    if pattern.search(text):
+                        return REGEX_PREFIX + source
+            for source, pattern in self._standalone:
+                if pattern.search(text):
+                    return REGEX_PREFIX + source
+        return None
+
+def get_chat_filter(bot_data, chat_id):
+    """Return the cached filter for a chat, seeding new chats with BANNED_PHRASES"""
+    filters_by_chat = bot_data.setdefault("content_filters", {})
+    chat_filter = filters_by_chat.get(chat_id)
+    if chat_filter is None:
+        chat_filter = ChatFilter(BANNED_PHRASES)
+        filters_by_chat[chat_id] = chat_filter
+    return chat_filter
@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from config import SWEEP_BATCH_SIZE, SWEEP_MAX_SLEEP
+from utils.metrics import set_gauge, inc
+
+logger = logging.getLogger(__name__)
+
+# Sweep handlers by sweeper name: async def handler(sweeper, keys)
+_handlers = {}
+
+def register_sweep_handler(name, handler):
+    """Register the coroutine that processes a batch of due keys for sweeper `name`
+
+    Like expiry handlers, it receives the sweeper, which exposes `bot` and
+    `bot_data` like a callback context.
+    """
+    _handlers[name] = handler
+
+class DeadlineSweeper:
+    """One coroutine firing wall-clock deadlines from a min-heap in batches
+
+    push() and discard() are O(log n) and O(1): a key's current deadline lives
+    in a dict, and heap entries that no longer match it are skipped when they
+    surface. Due keys are handed to the handler up to SWEEP_BATCH_SIZE at a
+    time; the backlog is published as the `<name>_backlog` gauge.
+    """
+
+    def __init__(self, bot, bot_data, name):
+        self.bot = bot
+        self.bot_data = bot_data
+        self.name = name
+        self._heap = []
+        self._deadlines = {}
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def start(self):
+        """Start the sweep loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Deadline sweeper {self.name!r} started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def push(self, key, deadline):
+        """Fire `key` at `deadline` (epoch seconds), replacing any earlier deadline"""
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+        if self._wakeup is not None and self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def discard(self, key):
+        """Forget `key`; returns its deadline or None"""
+        return self._deadlines.pop(key, None)
+
+    def deadline(self, key):
+        return self._deadlines.get(key)
+
+    def _pop_due(self, now):
+        batch = []
+        while self._heap and len(batch) < SWEEP_BATCH_SIZE:
+            deadline, _, key = self._heap[0]
+            if self._deadlines.get(key) != deadline:
+                heapq.heappop(self._heap)  # discarded or rescheduled
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            del self._deadlines[key]
+            batch.append(key)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = self._pop_due(time.time())
+            set_gauge(f"{self.name}_backlog", len(self._deadlines))
+            if batch:
+                handler = _handlers.get(self.name)
+                if handler is None:
+                    logger.error(f"No sweep handler registered for {self.name!r}, dropping {len(batch)} keys")
+                    continue
+                try:
+                    await handler(self, batch)
+                except Exception as e:
+                    logger.error(f"Sweep handler {self.name!r} failed on a batch of {len(batch)}: {e}")
+                inc(f"{self.name}_processed", len(batch))
+                logger.info(f"Sweeper {self.name!r} processed {len(batch)} keys, backlog {len(self._deadlines)}")
+                continue
+
+            # Sleep until the earliest deadline, or until an earlier one is pushed
+            timeout = SWEEP_MAX_SLEEP
+            if self._heap:
+                timeout = min(timeout, max(0.0, self._heap[0][0] - time.time()))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+def get_sweeper(context, name):
+    """Return the shared sweeper `name`, creating and starting it on first use"""
+    sweepers = context.bot_data.setdefault("sweepers", {})
+    sweeper = sweepers.get(name)
+    if sweeper is None:
+        sweeper = DeadlineSweeper(context.bot, context.bot_data, name)
+        sweepers[name] = sweeper
+    sweeper.start()
+    return sweeper
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from config import DELETE_BATCH_WINDOW, DELETE_MAX_RETRIES, DELETE_RETRY_DELAY
+from utils.retry_policy import classify_error, PERMANENT
+from utils.metrics import set_gauge, inc
+
+try:
+    from telegram.error import BadRequest
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Most message IDs one deleteMessages call accepts
+DELETE_CHUNK_SIZE = 100
+
+class DeletionBatcher:
+    """Collect message deletions per chat and send them as deleteMessages calls
+
+    delete() only records the message; a chat's deletions go out together
+    DELETE_BATCH_WINDOW seconds after the first one, or at once when a full
+    chunk of DELETE_CHUNK_SIZE is waiting. Libraries without deleteMessages
+    get single deleteMessage calls instead. If a bulk call is rejected, its
+    messages are deleted one by one so one undeletable message does not keep
+    the others. Transient failures are queued again after DELETE_RETRY_DELAY
+    seconds, up to DELETE_MAX_RETRIES times.
+
+    delete() returns a future that resolves to True once every message is
+    gone, or False as soon as one of them could not be deleted.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._pending = {}
+        self._timers = {}
+        self._flushing = set()
+        self._retries = {}  # call_later handle -> (chat_id, message_ids, attempts)
+        self._waiters = {}  # (chat_id, message_id) -> futures waiting for its outcome
+        self._stopping = False
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._pending.values())
+
+    def delete(self, chat_id, message_ids, attempts=0):
+        """Queue `message_ids` of `chat_id` for deletion
+
+        Returns:
+            asyncio.Future: Resolves to whether all of them were deleted
+        """
+        loop = asyncio.get_running_loop()
+        message_ids = list(message_ids)
+        pending = self._pending.setdefault(chat_id, {})
+        for message_id in message_ids:
+            pending[message_id] = max(attempts, pending.get(message_id, 0))
+        outcome = self._outcome(loop, chat_id, message_ids)
+        set_gauge("deletion_backlog", len(self))
+        if len(pending) >= DELETE_CHUNK_SIZE:
+            self._flush_chat(chat_id)
+        elif chat_id not in self._timers:
+            self._timers[chat_id] = loop.call_later(DELETE_BATCH_WINDOW, self._flush_chat, chat_id)
+        return outcome
+
+    async def stop(self):
+        """Send every queued deletion and pending retry now and wait for them"""
+        self._stopping = True
+        for handle, (chat_id, message_ids, attempts) in list(self._retries.items()):
+            handle.cancel()
+            self._requeue(handle, chat_id, message_ids, attempts)
+        for chat_id in list(self._pending):
+            self._flush_chat(chat_id)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        self._stopping = False
+
+    def _outcome(self, loop, chat_id, message_ids):
+        outcome = loop.create_future()
+        remaining = set(message_ids)
+        if not remaining:
+            outcome.set_result(True)
+            return outcome
+
+        def settled(message_id, ok):
+            if outcome.done():
+                return
+            remaining.discard(message_id)
+            if not ok or not remaining:
+                outcome.set_result(ok)
+
+        for message_id in remaining:
+            self._waiters.setdefault((chat_id, message_id), []).append(settled)
+        return outcome
+
+    def _settle(self, chat_id, message_ids, ok):
+        for message_id in message_ids:
+            for settled in self._waiters.pop((chat_id, message_id), ()):
+                settled(message_id, ok)
+
+    def _flush_chat(self, chat_id):
+        timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(chat_id, None)
+        set_gauge("deletion_backlog", len(self))
+        if not pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(chat_id, pending))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _send(self, chat_id, pending):
+        message_ids = sorted(pending)
+        if not hasattr(self.bot, "delete_messages"):
+            await self._delete_each(chat_id, message_ids, pending)
+            return
+        for start in range(0, len(message_ids), DELETE_CHUNK_SIZE):
+            chunk = message_ids[start:start + DELETE_CHUNK_SIZE]
+            try:
+                await self.bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+            except Exception as e:
+                if classify_error(e) != PERMANENT:
+                    self._retry(chat_id, chunk, pending, e)
+                elif isinstance(e, BadRequest) and len(chunk) > 1:
+                    await self._delete_each(chat_id, chunk, pending)
+                else:
+                    inc("deletions_failed", len(chunk))
+                    self._settle(chat_id, chunk, False)
+                    logger.error(f"Error deleting {len(chunk)} messages in chat {chat_id}: {e}")
+                continue
+            inc("deletions_ok", len(chunk))
+            inc("deletion_calls")
+            self._settle(chat_id, chunk, True)
+
+    async def _delete_each(self, chat_id, message_ids, pending):
+        for message_id in message_ids:
+            try:
+                await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                if classify_error(e) != PERMANENT:
+                    self._retry(chat_id, [message_id], pending, e)
+                else:
+                    inc("deletions_failed")
+                    self._settle(chat_id, [message_id], False)
+                    logger.warning(f"Error deleting message {message_id} in chat {chat_id}: {e}")
+                continue
+            inc("deletions_ok")
+            inc("deletion_calls")
+            self._settle(chat_id, [message_id], True)
+
+    def _retry(self, chat_id, message_ids, pending, error):
+        attempts = max(pending[message_id] for message_id in message_ids) + 1
+        if attempts > DELETE_MAX_RETRIES or self._stopping:
+            inc("deletions_failed", len(message_ids))
+            self._settle(chat_id, message_ids, False)
+            logger.error(f"Giving up deleting {len(message_ids)} messages in chat {chat_id}: {error}")
+            return
+        logger.warning(f"Deleting {len(message_ids)} messages in chat {chat_id} failed ({error}), retry {attempts} in {DELETE_RETRY_DELAY}s")
+        handle = None
+
+        def retry():
+            self._requeue(handle, chat_id, message_ids, attempts)
+
+        handle = asyncio.get_running_loop().call_later(DELETE_RETRY_DELAY, retry)
+        self._retries[handle] = (chat_id, message_ids, attempts)
+
+    def _requeue(self, handle, chat_id, message_ids, attempts):
+        del self._retries[handle]
+        self.delete(chat_id, message_ids, attempts)
+
+def get_deletion_batcher(context):
+    """Return the shared deletion batcher"""
+    batcher = context.bot_data.get("deletion_batcher")
+    if batcher is None:
+        batcher = context.bot_data["deletion_batcher"] = DeletionBatcher(context.bot)
+    return batcher
+
+def queue_deletion(context, chat_id, message_ids):
+    """Delete `message_ids` of `chat_id` with the next batch
+
+    Returns:
+        asyncio.Future: Resolves to whether all of them were deleted; may be
+        ignored when the outcome does not matter
+    """
+    return get_deletion_batcher(context).delete(chat_id, message_ids)
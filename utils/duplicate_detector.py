@@ -0,0 +1,114 @@
+import logging
+import hashlib
+from array import array
+from utils.content_filter import normalize_text
+from config import (
+    DUPLICATE_WINDOW_SECONDS,
+    DUPLICATE_MIN_USERS,
+    DUPLICATE_MAX_DISTANCE,
+    DUPLICATE_BUFFER_SIZE,
+    DUPLICATE_MIN_LENGTH,
+)
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 4       # Characters per shingle
+MAX_TEXT_LENGTH = 1000  # Only the start of long messages is fingerprinted
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text):
+    """Compute a 64-bit SimHash fingerprint of a message
+
+    Near-identical texts (a changed word, extra emoji, different spacing or
+    leetspeak) produce fingerprints that differ in only a few bits.
+
+    Args:
+        text (str): Message text
+
+    Returns:
+        int: Fingerprint, or None if the text is too short to compare reliably
+    """
+    normalized = normalize_text(text[:MAX_TEXT_LENGTH])
+    if len(normalized) < DUPLICATE_MIN_LENGTH:
+        return None
+
+    # Per bit position: set when most shingle hashes have that bit set
+    rows = [
+        format(_shingle_hash(normalized[start:start + SHINGLE_SIZE]), "064b")
+        for start in range(len(normalized) - SHINGLE_SIZE + 1)
+    ]
+    half = len(rows) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*rows)), 2)
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count("1")
+
+class DuplicateWindow:
+    """Fixed-size ring of recent message fingerprints for one chat
+
+    Memory per chat is bounded by DUPLICATE_BUFFER_SIZE slots of packed
+    integers, independent of message volume.
+    """
+
+    def __init__(self, size=DUPLICATE_BUFFER_SIZE):
+        self.size = size
+        self.fingerprints = array("Q", [0] * size)
+        self.timestamps = array("d", [0.0] * size)
+        self.user_ids = array("q", [0] * size)
+        self.message_ids = array("q", [0] * size)
+        self.actioned = bytearray(size)
+        self.head = 0
+
+    def observe(self, fingerprint, user_id, message_id, now):
+        """Record a message and return the messages that form a spam wave
+
+        A wave is DUPLICATE_MIN_USERS distinct users posting near-identical
+        text within DUPLICATE_WINDOW_SECONDS. Once a wave has been acted on,
+        every further copy inside the window is returned on its own.
+
+        Returns:
+            list: (user_id, message_id) pairs to remove, empty if nothing to do
+        """
+        cutoff = now - DUPLICATE_WINDOW_SECONDS
+        matches = []
+        wave_known = False
+        for slot in range(self.size):
+            if self.timestamps[slot] < cutoff:
+                continue
+            if hamming_distance(fingerprint, self.fingerprints[slot]) > DUPLICATE_MAX_DISTANCE:
+                continue
+            if self.actioned[slot]:
+                wave_known = True
+            else:
+                matches.append(slot)
+
+        slot = self.head
+        self.head = (self.head + 1) % self.size
+        self.fingerprints[slot] = fingerprint
+        self.timestamps[slot] = now
+        self.user_ids[slot] = user_id
+        self.message_ids[slot] = message_id
+        self.actioned[slot] = 0
+
+        if not wave_known:
+            users = {self.user_ids[match] for match in matches}
+            users.add(user_id)
+            if len(users) < DUPLICATE_MIN_USERS:
+                return []
+
+        matches.append(slot)
+        for match in matches:
+            self.actioned[match] = 1
+        return [(self.user_ids[match], self.message_ids[match]) for match in matches]
+
+def get_duplicate_window(bot_data, chat_id):
+    """Return the fingerprint ring for a chat"""
+    windows = bot_data.setdefault("duplicate_windows", {})
+    window = windows.get(chat_id)
+    if window is None:
+        window = DuplicateWindow()
+        windows[chat_id] = window
+    return window
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import math
+import time
+from config import EXPIRY_TICK_SECONDS, EXPIRY_WHEEL_SLOTS
+
+logger = logging.getLogger(__name__)
+
+# Expiry handlers by timer kind: async def handler(service, key, data)
+_handlers = {}
+
+def register_expiry_handler(kind, handler):
+    """Register the coroutine called when a timer of `kind` expires
+
+    The handler receives the service (which exposes `bot` and `bot_data` like a
+    callback context), the timer key and the data it was scheduled with.
+    """
+    _handlers[kind] = handler
+
+class _Timer:
+    __slots__ = ("kind", "key", "data", "deadline_tick")
+
+    def __init__(self, kind, key, data, deadline_tick):
+        self.kind = kind
+        self.key = key
+        self.data = data
+        self.deadline_tick = deadline_tick
+
+class ExpiryService:
+    """Hashed timing wheel for all time-bound moderation state
+
+    Timers are identified by (kind, key); scheduling an existing timer replaces
+    it. Insert and cancel are O(1): a timer lives in the slot of its deadline
+    tick and is found through an index. Each tick only looks at one slot;
+    timers more than one revolution away simply stay until their tick comes.
+    """
+
+    def __init__(self, bot, bot_data, tick=EXPIRY_TICK_SECONDS, slots=EXPIRY_WHEEL_SLOTS):
+        self.bot = bot
+        self.bot_data = bot_data
+        self.tick = tick
+        self._wheel = [{} for _ in range(slots)]
+        self._timers = {}
+        self._current_tick = 0
+        self._started_at = time.monotonic()
+        self._task = None
+        self._dispatching = set()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def start(self):
+        """Start the tick loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._started_at = time.monotonic() - self._current_tick * self.tick
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Expiry service started ({len(self._wheel)} slots, {self.tick}s tick)")
+
+    async def stop(self):
+        """Stop the tick loop and wait for running handlers; pending timers are kept"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatching:
+            await asyncio.gather(*self._dispatching, return_exceptions=True)
+
+    def schedule(self, kind, key, delay, data=None):
+        """Schedule (or reschedule) timer (kind, key) to expire after `delay` seconds"""
+        self.cancel(kind, key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = _Timer(kind, key, data, self._current_tick + ticks)
+        self._wheel[timer.deadline_tick % len(self._wheel)][(kind, key)] = timer
+        self._timers[(kind, key)] = timer
+        return timer
+
+    def cancel(self, kind, key):
+        """Cancel timer (kind, key), returning its data or None if it was not pending"""
+        timer = self._timers.pop((kind, key), None)
+        if timer is None:
+            return None
+        del self._wheel[timer.deadline_tick % len(self._wheel)][(kind, key)]
+        return timer.data
+
+    def pending(self, kind, key):
+        """Return True if timer (kind, key) is scheduled"""
+        return (kind, key) in self._timers
+
+    def remaining(self, kind, key):
+        """Seconds until timer (kind, key) expires, or None if it is not pending"""
+        timer = self._timers.get((kind, key))
+        if timer is None:
+            return None
+        return max(0.0, self._started_at + timer.deadline_tick * self.tick - time.monotonic())
+
+    def _advance(self):
+        """Pop every timer due up to the current tick, grouped by kind"""
+        target_tick = int((time.monotonic() - self._started_at) / self.tick)
+        expired = {}
+        while self._current_tick < target_tick:
+            self._current_tick += 1
+            slot = self._wheel[self._current_tick % len(self._wheel)]
+            due = [timer for timer in slot.values() if timer.deadline_tick <= self._current_tick]
+            for timer in due:
+                del slot[(timer.kind, timer.key)]
+                del self._timers[(timer.kind, timer.key)]
+                expired.setdefault(timer.kind, []).append(timer)
+        return expired
+
+    async def _dispatch(self, kind, timers):
+        handler = _handlers.get(kind)
+        if handler is None:
+            logger.error(f"No expiry handler registered for {kind!r}, dropping {len(timers)} timers")
+            return
+        for timer in timers:
+            try:
+                await handler(self, timer.key, timer.data)
+            except Exception as e:
+                logger.error(f"Expiry handler for {kind!r} failed on {timer.key}: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            next_tick_at = self._started_at + (self._current_tick + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick_at - time.monotonic()))
+            # Handlers run as tasks so a slow API call never delays the wheel
+            for kind, timers in self._advance().items():
+                task = loop.create_task(self._dispatch(kind, timers))
+                self._dispatching.add(task)
+                task.add_done_callback(self._dispatching.discard)
+
+def get_expiry_service(context):
+    """Return the shared expiry service, creating and starting it on first use"""
+    service = context.bot_data.get("expiry_service")
+    if service is None:
+        service = ExpiryService(context.bot, context.bot_data)
+        context.bot_data["expiry_service"] = service
+    service.start()
+    return service
@@ -0,0 +1,95 @@
+import logging
+import math
+import numpy as np
+from config import (
+    MAX_FLOOD_MESSAGES,
+    FLOOD_LIMIT_MIN,
+    FLOOD_LIMIT_MAX,
+    FLOOD_BASELINE_BINS,
+    FLOOD_BASELINE_PERCENTILE,
+    FLOOD_BASELINE_MARGIN,
+    FLOOD_BASELINE_MIN_SAMPLES,
+    FLOOD_BASELINE_HALF_LIFE,
+    FLOOD_BASELINE_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+class FloodBaseline:
+    """Learned flood limit of one chat
+
+    Every time a user goes quiet, the peak number of messages they sent within
+    FLOOD_TIME_WINDOW is recorded. Peaks are buffered as plain ints and folded
+    into a decaying histogram with one np.bincount per FLOOD_BASELINE_INTERVAL;
+    the limit is the FLOOD_BASELINE_PERCENTILE of that histogram times
+    FLOOD_BASELINE_MARGIN, clamped to the chat's bounds.
+    """
+
+    __slots__ = ("hist", "pending", "updated_at", "learned", "bounds")
+
+    def __init__(self):
+        self.hist = np.zeros(FLOOD_BASELINE_BINS, dtype=np.float64)
+        self.pending = []
+        self.updated_at = None
+        self.learned = None  # None until enough bursts have been seen
+        self.bounds = (FLOOD_LIMIT_MIN, FLOOD_LIMIT_MAX)
+
+    @property
+    def limit(self):
+        """Messages per FLOOD_TIME_WINDOW a user may send before being muted"""
+        low, high = self.bounds
+        limit = MAX_FLOOD_MESSAGES if self.learned is None else self.learned
+        return min(max(limit, low), high)
+
+    @property
+    def samples(self):
+        """Weighted number of bursts behind the learned limit"""
+        return float(self.hist.sum())
+
+    def record(self, peak, now):
+        """Record a user's peak burst; bursts that were over the limit are ignored"""
+        if peak > self.limit:
+            return
+        self.pending.append(peak)
+        if self.updated_at is None:
+            self.updated_at = now
+        elif now - self.updated_at >= FLOOD_BASELINE_INTERVAL:
+            self.recompute(now)
+
+    def recompute(self, now):
+        """Fold buffered bursts into the histogram and derive the learned limit"""
+        if self.updated_at is not None:
+            elapsed = max(0.0, now - self.updated_at)
+            self.hist *= 0.5 ** (elapsed / FLOOD_BASELINE_HALF_LIFE)
+        if self.pending:
+            peaks = np.minimum(np.asarray(self.pending, dtype=np.int64), FLOOD_BASELINE_BINS - 1)
+            self.hist += np.bincount(peaks, minlength=FLOOD_BASELINE_BINS)
+            self.pending.clear()
+        self.updated_at = now
+
+        cdf = np.cumsum(self.hist)
+        if cdf[-1] < FLOOD_BASELINE_MIN_SAMPLES:
+            self.learned = None
+            return self.limit
+        percentile = int(np.searchsorted(cdf, FLOOD_BASELINE_PERCENTILE * cdf[-1]))
+        self.learned = math.ceil(max(percentile, 1) * FLOOD_BASELINE_MARGIN)
+        return self.limit
+
+    def set_bounds(self, low, high):
+        """Set the admin bounds for the limit
+
+        Raises:
+            ValueError: If the bounds are not 1 <= low <= high
+        """
+        if not 1 <= low <= high:
+            raise ValueError("bounds must satisfy 1 <= min <= max")
+        self.bounds = (low, high)
+
+def get_flood_baseline(bot_data, chat_id):
+    """Return the flood baseline for a chat"""
+    baselines = bot_data.setdefault("flood_baselines", {})
+    baseline = baselines.get(chat_id)
+    if baseline is None:
+        baseline = FloodBaseline()
+        baselines[chat_id] = baseline
+    return baseline
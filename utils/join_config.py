@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import re
+from config import REQUIRED_CHANNEL, JOIN_REQUEST_TIMEOUT, JOIN_CONFIG_CACHE_TTL, JOIN_CONFIG_CACHE_SIZE
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+def parse_channels(value):
+    """Split a comma or space separated channel list into a tuple"""
+    return tuple(channel for channel in re.split(r"[\s,]+", value or "") if channel)
+
+def channel_chat_id(channel):
+    """Chat ID for get_chat_member: numeric IDs as int, usernames with a leading @"""
+    if channel.lstrip("-").isdigit():
+        return int(channel)
+    return channel if channel.startswith("@") else f"@{channel}"
+
+def channel_url(channel):
+    """Public t.me link for a channel username, or None for numeric IDs"""
+    if channel.lstrip("-").isdigit():
+        return None
+    return f"https://t.me/{channel.lstrip('@')}"
+
+class JoinConfig:
+    """Join-request requirements of one chat"""
+
+    __slots__ = ("channels", "timeout", "auto_decline")
+
+    def __init__(self, channels, timeout, auto_decline=False):
+        self.channels = tuple(channels)
+        self.timeout = timeout
+        self.auto_decline = auto_decline
+
+    def replace(self, **changes):
+        values = {"channels": self.channels, "timeout": self.timeout, "auto_decline": self.auto_decline}
+        values.update(changes)
+        return JoinConfig(**values)
+
+# Used for chats without their own settings
+DEFAULT_JOIN_CONFIG = JoinConfig(parse_channels(REQUIRED_CHANNEL), JOIN_REQUEST_TIMEOUT)
+
+def load_join_config(app, chat_id):
+    """Read a chat's join settings from ChatSettings (runs in a worker thread)"""
+    from sqlalchemy import select
+    from models import db, ChatSettings
+
+    with app.app_context():
+        row = db.session.execute(
+            select(ChatSettings).where(ChatSettings.chat_id == chat_id)
+        ).scalar_one_or_none()
+        if row is None:
+            return None
+        return JoinConfig(
+            parse_channels(row.required_channels) or DEFAULT_JOIN_CONFIG.channels,
+            row.join_timeout or DEFAULT_JOIN_CONFIG.timeout,
+            bool(row.auto_decline),
+        )
+
+def save_join_config(app, chat_id, join_config):
+    """Write a chat's join settings to ChatSettings (runs in a worker thread)"""
+    from sqlalchemy import select
+    from models import db, ChatSettings
+
+    with app.app_context():
+        row = db.session.execute(
+            select(ChatSettings).where(ChatSettings.chat_id == chat_id)
+        ).scalar_one_or_none()
+        if row is None:
+            row = ChatSettings(chat_id=chat_id)
+            db.session.add(row)
+        row.required_channels = ",".join(join_config.channels)
+        row.join_timeout = join_config.timeout
+        row.auto_decline = join_config.auto_decline
+        db.session.commit()
+
+async def get_join_config(bot_data, chat_id):
+    """Return a chat's join settings; steady state is a dictionary lookup
+
+    Misses read ChatSettings in a worker thread when the database is set up
+    (see utils.persistence.start_persistence). Settings saved while it was
+    unavailable are kept in bot_data["join_configs"].
+    """
+    cache = bot_data.get("join_config_cache")
+    if cache is None:
+        cache = bot_data["join_config_cache"] = TTLCache(JOIN_CONFIG_CACHE_TTL, JOIN_CONFIG_CACHE_SIZE)
+
+    async def load(key):
+        fallback = bot_data.get("join_configs", {}).get(key, DEFAULT_JOIN_CONFIG)
+        app = bot_data.get("db_app")
+        if app is None:
+            return fallback
+        try:
+            return await asyncio.to_thread(load_join_config, app, key) or fallback
+        except Exception as e:
+            logger.error(f"Failed to load join settings for chat {chat_id}: {e}")
+            return fallback
+
+    return await cache.get(chat_id, load)
+
+async def set_join_config(bot_data, chat_id, join_config):
+    """Store a chat's join settings and refresh the cache"""
+    bot_data.setdefault("join_configs", {})[chat_id] = join_config
+    app = bot_data.get("db_app")
+    if app is not None:
+        await asyncio.to_thread(save_join_config, app, chat_id, join_config)
+    cache = bot_data.get("join_config_cache")
+    if cache is not None:
+        cache.put(chat_id, join_config)
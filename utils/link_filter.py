@@ -0,0 +1,175 @@
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ALLOW = "allow"
+DENY = "deny"
+
+# Prefix that makes a domain rule also cover every subdomain
+WILDCARD_PREFIX = "*."
+
+def normalize_host(value):
+    """Extract a lowercase ASCII hostname from a URL or bare domain
+
+    Args:
+        value (str): URL as written in a message, or a domain rule
+
+    Returns:
+        str: Hostname (IDNA-encoded for non-ASCII names), or "" if none found
+    """
+    value = value.strip()
+    if "://" not in value:
+        value = "http://" + value
+    try:
+        host = urlsplit(value).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.lower()
+
+def parse_rule(rule):
+    """Split a domain rule into (key, host, wildcard); host is "" if invalid"""
+    rule = rule.strip().lower()
+    wildcard = rule.startswith(WILDCARD_PREFIX)
+    host = normalize_host(rule[len(WILDCARD_PREFIX):] if wildcard else rule)
+    return (WILDCARD_PREFIX + host if wildcard else host), host, wildcard
+
+class _Node:
+    __slots__ = ("children", "exact", "wildcard")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None     # policy for this exact host
+        self.wildcard = None  # policy for this host and all subdomains
+
+class DomainTrie:
+    """Domain rules stored by reversed labels (com -> example -> www)
+
+    A lookup is one walk from the TLD towards the full host; the most
+    specific rule on the path wins.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._rules = {}
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, rule, policy):
+        """Add `example.com` (exact host) or `*.example.com` (host and subdomains)
+
+        Returns:
+            tuple: (normalized rule, policy it replaced or None)
+
+        Raises:
+            ValueError: If the rule does not contain a valid domain
+        """
+        key, host, wildcard = parse_rule(rule)
+        if not host:
+            raise ValueError(f"invalid domain: {rule}")
+
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.children.setdefault(label, _Node())
+        if wildcard:
+            node.wildcard = policy
+        else:
+            node.exact = policy
+
+        previous = self._rules.get(key)
+        self._rules[key] = policy
+        return key, previous
+
+    def remove(self, rule):
+        """Remove a rule, returning the policy it had or None if it did not exist"""
+        key, host, wildcard = parse_rule(rule)
+        if not host or key not in self._rules:
+            return None
+        policy = self._rules.pop(key)
+
+        path = [self._root]
+        labels = list(reversed(host.split(".")))
+        for label in labels:
+            path.append(path[-1].children[label])
+        if wildcard:
+            path[-1].wildcard = None
+        else:
+            path[-1].exact = None
+
+        # Prune branches that no longer carry any rule
+        for depth in range(len(labels), 0, -1):
+            node = path[depth]
+            if node.children or node.exact or node.wildcard:
+                break
+            del path[depth - 1].children[labels[depth - 1]]
+        return policy
+
+    def lookup(self, host):
+        """Return the policy of the most specific rule covering `host`, or None"""
+        node = self._root
+        found = None
+        labels = host.split(".")
+        for index in range(len(labels) - 1, -1, -1):
+            node = node.children.get(labels[index])
+            if node is None:
+                return found
+            if node.wildcard is not None:
+                found = node.wildcard
+        return node.exact if node.exact is not None else found
+
+    def rules(self):
+        """Return {rule: policy} for all rules"""
+        return dict(self._rules)
+
+class LinkPolicy:
+    """Per-chat domain allowlist and denylist"""
+
+    def __init__(self):
+        self.trie = DomainTrie()
+        self.deny_count = 0
+
+    def set_rule(self, rule, policy):
+        """Add or replace a domain rule with ALLOW or DENY, returning the normalized rule"""
+        key, previous = self.trie.add(rule, policy)
+        self.deny_count += (policy == DENY) - (previous == DENY)
+        return key
+
+    def remove_rule(self, rule):
+        """Remove a domain rule, returning True if it existed"""
+        previous = self.trie.remove(rule)
+        if previous == DENY:
+            self.deny_count -= 1
+        return previous is not None
+
+    def is_blocked(self, url, links_blocked):
+        """Decide whether a link may stay in the chat
+
+        Args:
+            url (str): Link from a `url` entity or a `text_link` target
+            links_blocked (bool): Whether links are blocked by default in the chat
+
+        Returns:
+            bool: True if the link must be removed
+        """
+        host = normalize_host(url)
+        if not host:
+            return links_blocked
+        policy = self.trie.lookup(host)
+        if policy is None:
+            return links_blocked
+        return policy == DENY
+
+def get_link_policy(bot_data, chat_id):
+    """Return the cached link policy for a chat"""
+    policies = bot_data.setdefault("link_policies", {})
+    policy = policies.get(chat_id)
+    if policy is None:
+        policy = LinkPolicy()
+        policies[chat_id] = policy
+    return policy
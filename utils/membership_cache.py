@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from config import MEMBERSHIP_CACHE_TTL, MEMBERSHIP_NEGATIVE_TTL, MEMBERSHIP_CACHE_SIZE, MEMBERSHIP_LOOKUP_CONCURRENCY
+from utils.ttl_cache import TTLCache
+from utils.join_config import channel_chat_id
+from utils.telegram_helper import check_user_membership
+
+logger = logging.getLogger(__name__)
+
+def channel_key(channel):
+    """Cache key of a channel: its numeric ID, or its lowercased @username"""
+    chat_id = channel_chat_id(channel)
+    return chat_id.lower() if isinstance(chat_id, str) else chat_id
+
+def get_membership_cache(bot_data):
+    """Return the shared (channel, user) membership cache"""
+    cache = bot_data.get("membership_cache")
+    if cache is None:
+        cache = bot_data["membership_cache"] = TTLCache(
+            MEMBERSHIP_CACHE_TTL, MEMBERSHIP_CACHE_SIZE, negative_ttl=MEMBERSHIP_NEGATIVE_TTL
+        )
+    return cache
+
+def get_lookup_limiter(bot_data):
+    """Semaphore shared by every membership lookup, bounding calls in flight"""
+    limiter = bot_data.get("membership_limiter")
+    if limiter is None:
+        limiter = bot_data["membership_limiter"] = asyncio.Semaphore(MEMBERSHIP_LOOKUP_CONCURRENCY)
+    return limiter
+
+async def is_channel_member(context, channel, user_id):
+    """Check channel membership, answering from the cache when possible
+
+    Members are cached for MEMBERSHIP_CACHE_TTL seconds and non-members for
+    MEMBERSHIP_NEGATIVE_TTL, so someone who has just joined is noticed
+    quickly even without chat_member updates. Failed lookups are not cached.
+    Lookups that reach the API wait on the shared limiter, so checking many
+    channels or applicants at once stays within MEMBERSHIP_LOOKUP_CONCURRENCY.
+
+    Args:
+        context: Callback context (or anything with `bot` and `bot_data`)
+        channel: Channel username or numeric ID, as in the join settings
+        user_id: User ID to check
+
+    Returns:
+        bool: True if the user is a member, False if not, None if that could
+        not be determined
+    """
+    async def load(key):
+        async with get_lookup_limiter(context.bot_data):
+            return await check_user_membership(context.bot, channel_chat_id(channel), user_id)
+
+    return (await get_membership_cache(context.bot_data).get((channel_key(channel), user_id), load))
+
+def record_membership(bot_data, chat, user_id, is_member):
+    """Store a membership change seen in a chat_member update of `chat`
+
+    The entry is written under the channel's ID and, when it has one, its
+    username, matching however the channel is named in the join settings.
+    """
+    cache = get_membership_cache(bot_data)
+    cache.put((chat.id, user_id), is_member)
+    if chat.username:
+        cache.put((f"@{chat.username.lower()}", user_id), is_member)
@@ -0,0 +1,193 @@
+import logging
+from functools import lru_cache
+from config import BOT_TOKEN, HELP_MESSAGE
+
+# Check if we're in development mode
+dev_mode = BOT_TOKEN == "dummy_token_for_development"
+
+try:
+    from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from utils.callback_codec import (
+    encode_callback,
+    ACTION_TOGGLE_SETTING,
+    ACTION_CLOSE_SETTINGS,
+    ACTION_CHECK_JOINED,
+    SETTING_LINKS,
+    SETTING_SLOW_MODE,
+    SETTING_WELCOME,
+    SETTING_AUTO_SLOW_MODE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pre-rendered texts and keyboards. Telegram objects are immutable, so one
+# instance can be sent any number of times; handlers pick finished objects
+# instead of formatting and allocating on every update.
+
+SETTINGS_TEXT = (
+    "⚙️ *Apex Project Group Settings*\n\n"
+    "Configure protection protocols below:"
+)
+
+@lru_cache(maxsize=256)
+def settings_text(flood_limit, flood_window, learned):
+    """SETTINGS_TEXT with the chat's current flood limit (formatted once per limit)"""
+    source = "learned" if learned else "default"
+    return SETTINGS_TEXT + f"\n\n🌊 Flood limit: {flood_limit} messages per {flood_window}s ({source})"
+
+SETTINGS_CLOSED_TEXT = (
+    "⚙️ *Protocol Configuration Complete*\n\n"
+    "The Apex Project security parameters have been updated according to your specifications.\n\n"
+    "_Our sentinels are vigilant. Our protocols are active._\n\n"
+    "⚠️ *This control panel will self-destruct momentarily.* ⚠️"
+)
+
+@lru_cache(maxsize=1024)
+def _join_request_template(channels, timeout):
+    # Formatted with first_name; channels and timeout are filled in once per chat setup
+    return (
+        "🔒 *ACCESS REQUEST RECEIVED* 🔒\n\n"
+        "Greetings, {first_name}. The Apex Project has logged your infiltration attempt.\n\n"
+        "⚠️ *VERIFICATION PROTOCOLS ACTIVATED:* ⚠️\n"
+        f"📡 *PROTOCOL 7-A*: Subscribe to {', '.join(channels)}\n"
+        f"⏳ *PROTOCOL 7-B*: Endure a {int(timeout/60)}-minute verification period\n\n"
+        "_Both protocols must be satisfied for clearance. Those who fail will be forgotten._\n\n"
+        "The shadows are watching. Follow the instructions precisely."
+    )
+
+def join_request_text(first_name, channels, timeout):
+    """Join request DM for a chat requiring `channels` and a `timeout`-second wait"""
+    return _join_request_template(channels, timeout).format(first_name=first_name)
+
+ACCESS_GRANTED_TEXT = (
+    "✅ *ACCESS GRANTED*\n\n"
+    "Your verification is complete. Welcome to The Apex Project.\n\n"
+    "_Remember to adhere to all protocols._"
+)
+
+SECURITY_BREACH_TEXT = (
+    "⚠️ *SECURITY BREACH DETECTED* ⚠️\n\n"
+    "Unauthorized access attempt logged and reported.\n\n"
+    "_The Apex Project does not tolerate interference with another's verification process._"
+)
+
+REQUEST_NULLIFIED_TEXT = (
+    "⛔ *ACCESS REQUEST NULLIFIED* ⛔\n\n"
+    "Your application to The Apex Project has either expired or been purged from our systems.\n\n"
+    "_The shadows wait for no one. Reapply if you seek enlightenment._"
+)
+
+CRITICAL_ERROR_TEXT = (
+    "⚠️ *CRITICAL ERROR DETECTED* ⚠️\n\n"
+    "The Apex Project access mechanism encountered a critical malfunction.\n\n"
+    "_Report this code to the Inner Circle: ERROR-AP-7842_"
+)
+
+SYSTEM_MALFUNCTION_TEXT = (
+    "⚠️ *SYSTEM MALFUNCTION DETECTED* ⚠️\n\n"
+    "Our surveillance systems encountered an anomaly while verifying your status.\n\n"
+    "_Shadow protocols suggest you attempt verification again momentarily._"
+)
+
+@lru_cache(maxsize=1024)
+def verification_failed_text(channels):
+    return (
+        "❌ *VERIFICATION FAILED* ❌\n\n"
+        f"Access to The Apex Project requires subscription to {', '.join(channels)}.\n\n"
+        "_Those who seek knowledge must first demonstrate loyalty. Join our official channel to continue the initiation process._"
+    )
+
+@lru_cache(maxsize=1024)
+def verification_reminder_text(channels):
+    return (
+        "⚠️ *VERIFICATION REMINDER* ⚠️\n\n"
+        f"Your access request to The Apex Project requires subscription to {', '.join(channels)}.\n\n"
+        "_The shadows cannot embrace those who remain unaligned. Your clearance remains suspended until commitment is proven._"
+    )
+
+REQUEST_DECLINED_TEXT = (
+    "⛔ *ACCESS DENIED* ⛔\n\n"
+    "Your verification period has ended without the required subscriptions.\n\n"
+    "_The shadows wait for no one. Reapply once you have proven your loyalty._"
+)
+
+@lru_cache(maxsize=8)
+def help_text(bot_username):
+    """HELP_MESSAGE formatted for the bot's username (formatted once per username)"""
+    return HELP_MESSAGE.format(bot_username=bot_username)
+
+# Settings keyboard state as a bitmask
+SETTINGS_LINKS_BLOCKED = 1
+SETTINGS_SLOW_MODE = 2
+SETTINGS_WELCOME = 4
+SETTINGS_AUTO_SLOW_MODE = 8
+SETTINGS_MASK_LIMIT = 16
+
+def settings_mask(chat_settings):
+    """Encode the settings shown on the settings keyboard as a bitmask"""
+    mask = 0
+    if "url" in chat_settings.get("banned_content", []):
+        mask |= SETTINGS_LINKS_BLOCKED
+    if chat_settings.get("slow_mode", False):
+        mask |= SETTINGS_SLOW_MODE
+    if chat_settings.get("welcome_msg", True):
+        mask |= SETTINGS_WELCOME
+    if chat_settings.get("slow_mode_auto", False):
+        mask |= SETTINGS_AUTO_SLOW_MODE
+    return mask
+
+def _build_settings_keyboard(mask):
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(
+                "🔗 Links: " + ("❌ Blocked" if mask & SETTINGS_LINKS_BLOCKED else "✅ Allowed"),
+                callback_data=encode_callback(ACTION_TOGGLE_SETTING, SETTING_LINKS)
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "⏱ Slow Mode: " + ("✅ On" if mask & SETTINGS_SLOW_MODE else "❌ Off"),
+                callback_data=encode_callback(ACTION_TOGGLE_SETTING, SETTING_SLOW_MODE)
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "🤖 Auto Slow Mode: " + ("✅ On" if mask & SETTINGS_AUTO_SLOW_MODE else "❌ Off"),
+                callback_data=encode_callback(ACTION_TOGGLE_SETTING, SETTING_AUTO_SLOW_MODE)
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "📢 Welcome Messages: " + ("✅ On" if mask & SETTINGS_WELCOME else "❌ Off"),
+                callback_data=encode_callback(ACTION_TOGGLE_SETTING, SETTING_WELCOME)
+            )
+        ],
+        [
+            InlineKeyboardButton("Close", callback_data=encode_callback(ACTION_CLOSE_SETTINGS))
+        ]
+    ])
+
+# Every settings state, rendered once at startup
+SETTINGS_KEYBOARDS = tuple(_build_settings_keyboard(mask) for mask in range(SETTINGS_MASK_LIMIT))
+
+def settings_keyboard(chat_settings):
+    """Return the pre-rendered settings keyboard for a chat's current settings"""
+    return SETTINGS_KEYBOARDS[settings_mask(chat_settings)]
+
+@lru_cache(maxsize=256)
+def _channel_rows(channels):
+    # Link buttons depend only on the channels, so they are built once per set
+    from utils.join_config import channel_url
+    links = [(channel, channel_url(channel)) for channel in channels]
+    return tuple(
+        (InlineKeyboardButton(text="Execute Protocol 7-A" if len(links) == 1 else f"Join {channel}", url=url),)
+        for channel, url in links if url
+    )
+
+def join_keyboard(user_id, chat_id, channels, verify_label="Protocol 7-A Complete"):
+    """Keyboard with the channel links and the check button for one join request"""
+    verify_button = InlineKeyboardButton(text=verify_label, callback_data=encode_callback(ACTION_CHECK_JOINED, user_id, chat_id))
+    return InlineKeyboardMarkup(_channel_rows(tuple(channels)) + ((verify_button,),))
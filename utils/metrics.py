@@ -0,0 +1,29 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Process-wide gauges and counters, keyed by metric name
+_gauges = {}
+_counters = {}
+_lock = threading.Lock()
+
+def set_gauge(name, value):
+    """Set a gauge to its current value (e.g. a backlog size)"""
+    _gauges[name] = value
+
+def inc(name, amount=1):
+    """Add `amount` to a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def snapshot():
+    """Return a copy of every metric as {name: value}"""
+    with _lock:
+        metrics = dict(_counters)
+    metrics.update(_gauges)
+    return metrics
+
+def format_metrics():
+    """Metrics as `name value` lines, sorted by name"""
+    return "\n".join(f"{name} {value}" for name, value in sorted(snapshot().items()))
@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from config import OUTBOUND_CONCURRENCY, OUTBOUND_MAX_RETRIES, OUTBOUND_DRAIN_TIMEOUT
+from utils.rate_limit import retry_after_seconds
+from utils.metrics import set_gauge
+
+logger = logging.getLogger(__name__)
+
+# Lower values are sent first
+PRIORITY_HIGH = 0     # Join-request verification DMs
+PRIORITY_NORMAL = 1   # Follow-up notices
+PRIORITY_LOW = 2
+
+class OutboundQueue:
+    """Prioritized queue of outgoing messages in front of the send gateway
+
+    The send gateway decides when a message may go out; this queue decides
+    which message goes next. submit() only queues, and the dispatcher hands at
+    most OUTBOUND_CONCURRENCY sends to the gateway at a time, most urgent
+    first. A surge of join DMs therefore waits here, where a later urgent
+    send still overtakes it, instead of piling up as tasks in the gateway.
+    A RetryAfter that outlasts the gateway's own retries is waited out and
+    the send put back, up to OUTBOUND_MAX_RETRIES times. Other errors are for
+    the send callable to handle; anything it lets through is logged.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._ready = None
+        self._slots = None
+        self._task = None
+        self._sending = set()
+        self._parked = 0
+
+    def __len__(self):
+        return len(self._heap) + self._parked
+
+    def start(self):
+        """Start the dispatcher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._slots = asyncio.Semaphore(OUTBOUND_CONCURRENCY)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Send what is still queued (for up to OUTBOUND_DRAIN_TIMEOUT seconds), then stop"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), OUTBOUND_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Outbound queue stopped with {len(self)} messages unsent")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for task in list(self._sending):
+            task.cancel()
+
+    async def _drain(self):
+        while self._heap or self._sending or self._parked:
+            if self._sending:
+                await asyncio.wait(set(self._sending))
+            else:
+                await asyncio.sleep(0.1)
+
+    def submit(self, chat_id, send, priority=PRIORITY_NORMAL):
+        """Queue `send`, a no-argument coroutine function delivering one message to `chat_id`"""
+        self._push([priority, next(self._sequence), chat_id, send, 0])
+
+    def _push(self, item):
+        heapq.heappush(self._heap, item)
+        set_gauge("outbound_queue_backlog", len(self))
+        if self._ready is not None:
+            self._ready.set()
+
+    def _unpark(self, item):
+        self._parked -= 1
+        self._push(item)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            await self._slots.acquire()
+            item = heapq.heappop(self._heap)
+            set_gauge("outbound_queue_backlog", len(self))
+            task = loop.create_task(self._send(item))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+
+    def _sent(self, task):
+        self._sending.discard(task)
+        self._slots.release()
+
+    async def _send(self, item):
+        priority, sequence, chat_id, send, attempts = item
+        try:
+            await send()
+        except Exception as e:
+            delay = retry_after_seconds(e)
+            if delay is None or attempts >= OUTBOUND_MAX_RETRIES:
+                logger.error(f"Outbound message to chat {chat_id} failed: {e}")
+                return
+            logger.warning(f"Outbound message to chat {chat_id} rate limited, retrying in {delay}s")
+            self._parked += 1
+            asyncio.get_running_loop().call_later(delay, self._unpark, [priority, sequence, chat_id, send, attempts + 1])
+
+def get_outbound_queue(context):
+    """Return the shared outbound queue, starting it on first use"""
+    queue = context.bot_data.get("outbound_queue")
+    if queue is None:
+        queue = context.bot_data["outbound_queue"] = OutboundQueue()
+    queue.start()
+    return queue
+
+def queue_message(context, chat_id, priority=PRIORITY_NORMAL, **kwargs):
+    """Queue a send_message call; failures other than RetryAfter are only logged"""
+    async def send():
+        await context.bot.send_message(chat_id=chat_id, **kwargs)
+
+    get_outbound_queue(context).submit(chat_id, send, priority)
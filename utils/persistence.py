@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from config import PERSIST_FLUSH_INTERVAL, PERSIST_BATCH_SIZE, PERSIST_MAX_RETRIES, WARNING_EXPIRE_HOURS
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Batch database writes away from the event loop
+
+    submit() only appends to a list, so handlers never wait on the database.
+    A background task hands everything queued to `flush(batch)` in a worker
+    thread every PERSIST_FLUSH_INTERVAL seconds, or as soon as
+    PERSIST_BATCH_SIZE items are waiting. A failed batch is retried in front
+    of newer items up to PERSIST_MAX_RETRIES times, then dropped.
+    """
+
+    def __init__(self, flush, name="write-behind"):
+        self.flush = flush
+        self.name = name
+        self._items = []
+        self._failures = 0
+        self._full = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def start(self):
+        """Start the flush loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop after writing everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def submit(self, item):
+        """Queue one item for the next batch"""
+        self._items.append(item)
+        if len(self._items) >= PERSIST_BATCH_SIZE and self._full is not None:
+            self._full.set()
+
+    async def _drain(self):
+        batch, self._items = self._items, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.flush, batch)
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            if self._failures > PERSIST_MAX_RETRIES:
+                logger.error(f"{self.name}: dropping {len(batch)} items after {PERSIST_MAX_RETRIES} retries: {e}")
+                self._failures = 0
+                return
+            logger.warning(f"{self.name}: flush of {len(batch)} items failed, retrying: {e}")
+            self._items = batch + self._items
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._full.wait(), PERSIST_FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._full.clear()
+                await self._drain()
+        except asyncio.CancelledError:
+            # Shutting down: write what is left before the loop goes away
+            if self._items:
+                try:
+                    self.flush(self._items)
+                    self._items = []
+                except Exception as e:
+                    logger.error(f"{self.name}: lost {len(self._items)} items at shutdown: {e}")
+            raise
+
+def _to_datetime(timestamp):
+    """Epoch seconds to the naive UTC datetimes used by the models"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+def _to_timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def flush_warning_ops(app, batch):
+    """Apply queued warning inserts and clears in one transaction
+
+    Consecutive inserts go to the database as a single executemany.
+    """
+    from sqlalchemy import insert, delete
+    from models import db, UserWarning
+
+    with app.app_context():
+        try:
+            inserts = []
+            for op, row in batch:
+                if op == "add":
+                    inserts.append(row)
+                    continue
+                if inserts:
+                    db.session.execute(insert(UserWarning), inserts)
+                    inserts = []
+                db.session.execute(
+                    delete(UserWarning).where(
+                        UserWarning.chat_id == row["chat_id"],
+                        UserWarning.user_id == row["user_id"],
+                        UserWarning.warned_at <= row["until"],
+                    )
+                )
+            if inserts:
+                db.session.execute(insert(UserWarning), inserts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+def load_warnings(app, since):
+    """Load warnings issued after `since` (epoch seconds)
+
+    Returns:
+        dict: {chat_id: {user_id: {"count": int, "timestamps": [float, ...]}}},
+              the layout issue_warning keeps in bot_data["user_warnings"]
+    """
+    from sqlalchemy import select
+    from models import db, UserWarning
+
+    warnings = {}
+    with app.app_context():
+        rows = db.session.execute(
+            select(UserWarning.chat_id, UserWarning.user_id, UserWarning.warned_at)
+            .where(UserWarning.warned_at >= _to_datetime(since))
+            .order_by(UserWarning.chat_id, UserWarning.user_id, UserWarning.warned_at)
+        )
+        for chat_id, user_id, warned_at in rows:
+            entry = warnings.setdefault(chat_id, {}).setdefault(user_id, {"count": 0, "timestamps": []})
+            entry["timestamps"].append(_to_timestamp(warned_at))
+            entry["count"] += 1
+    return warnings
+
+def prune_warnings(app, before):
+    """Delete warnings issued before `before` (epoch seconds)
+
+    Returns:
+        int: Number of rows deleted
+    """
+    from sqlalchemy import delete
+    from models import db, UserWarning
+
+    with app.app_context():
+        try:
+            result = db.session.execute(delete(UserWarning).where(UserWarning.warned_at < _to_datetime(before)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return result.rowcount
+
+def flush_pending_ops(app, batch):
+    """Apply queued pending-request upserts and removals in one transaction"""
+    from sqlalchemy import insert, delete
+    from models import db, PendingJoinRequest
+
+    with app.app_context():
+        try:
+            # Only the last operation per request matters
+            latest = {}
+            for op, row in batch:
+                latest[(row["chat_id"], row["user_id"])] = (op, row)
+            for chat_id, user_id in latest:
+                db.session.execute(
+                    delete(PendingJoinRequest).where(
+                        PendingJoinRequest.chat_id == chat_id,
+                        PendingJoinRequest.user_id == user_id,
+                    )
+                )
+            rows = [row for op, row in latest.values() if op == "put"]
+            if rows:
+                db.session.execute(insert(PendingJoinRequest), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+def load_pending_requests(app):
+    """Load every persisted pending join request
+
+    Returns:
+        dict: {(chat_id, user_id): entry}, the layout of bot_data["pending_join_requests"]
+    """
+    from sqlalchemy import select
+    from models import db, PendingJoinRequest
+
+    pending = {}
+    with app.app_context():
+        for row in db.session.execute(select(PendingJoinRequest)).scalars():
+            pending[(row.chat_id, row.user_id)] = {
+                "chat_id": row.chat_id,
+                "user_id": row.user_id,
+                "user_chat_id": row.user_chat_id,
+                "timestamp": _to_timestamp(row.requested_at),
+                "timeout": row.timeout,
+            }
+    return pending
+
+def queue_pending_put(bot_data, chat_id, user_id, entry):
+    """Queue a pending join request for persistence; a no-op when persistence is not running"""
+    writer = bot_data.get("pending_writer")
+    if writer is None:
+        return
+    writer.submit(("put", {
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "user_chat_id": entry.get("user_chat_id"),
+        "requested_at": _to_datetime(entry["timestamp"]),
+        "timeout": entry["timeout"],
+    }))
+
+def queue_pending_remove(bot_data, chat_id, user_id):
+    """Queue removal of a persisted pending join request"""
+    writer = bot_data.get("pending_writer")
+    if writer is None:
+        return
+    writer.submit(("remove", {"chat_id": chat_id, "user_id": user_id}))
+
+def queue_warning(bot_data, chat_id, user_id, reason, warned_at, warned_by=None):
+    """Queue a warning insert; a no-op when persistence is not running"""
+    writer = bot_data.get("warning_writer")
+    if writer is None:
+        return
+    writer.submit(("add", {
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "reason": reason,
+        "warned_at": _to_datetime(warned_at),
+        "warned_by": warned_by,
+    }))
+
+def queue_warning_clear(bot_data, chat_id, user_id, until):
+    """Queue deletion of a user's warnings issued up to `until` (epoch seconds)"""
+    writer = bot_data.get("warning_writer")
+    if writer is None:
+        return
+    writer.submit(("clear", {"chat_id": chat_id, "user_id": user_id, "until": _to_datetime(until)}))
+
+async def start_persistence(application):
+    """Hydrate warnings and pending join requests and start the write-behind queues
+
+    Called once before the application starts handling updates. Warnings past
+    WARNING_EXPIRE_HOURS are deleted first. If the database cannot be reached,
+    the bot starts with empty state and without the writers, so nothing is
+    persisted until it is restarted.
+    """
+    from models import create_db_app
+    from utils.expiry import get_expiry_service
+    from utils.deadline_sweeper import get_sweeper
+
+    now = time.time()
+    expire_seconds = WARNING_EXPIRE_HOURS * 3600
+    try:
+        app = await asyncio.to_thread(create_db_app)
+        pruned = await asyncio.to_thread(prune_warnings, app, now - expire_seconds)
+        warnings = await asyncio.to_thread(load_warnings, app, now - expire_seconds)
+        pending = await asyncio.to_thread(load_pending_requests, app)
+    except Exception as e:
+        logger.error(f"Database unavailable, running without persistence: {e}", exc_info=True)
+        return
+    application.bot_data["db_app"] = app
+    application.bot_data.setdefault("user_warnings", {}).update(warnings)
+
+    # Re-arm expiry for the oldest warning of every hydrated user
+    expiry = get_expiry_service(application)
+    for chat_id, chat_warnings in warnings.items():
+        for user_id, entry in chat_warnings.items():
+            expiry.schedule("warning", (chat_id, user_id), entry["timestamps"][0] + expire_seconds - now)
+
+    # Pending join requests: every deadline goes back on the sweeper heap;
+    # overdue ones are due at once and are worked off in batches
+    application.bot_data.setdefault("pending_join_requests", {}).update(pending)
+    sweeper = get_sweeper(application, "join_request")
+    for key, entry in pending.items():
+        sweeper.push(key, entry["timestamp"] + entry["timeout"])
+
+    writer = WriteBehindQueue(lambda batch: flush_warning_ops(app, batch), name="warning-writer")
+    writer.start()
+    application.bot_data["warning_writer"] = writer
+    pending_writer = WriteBehindQueue(lambda batch: flush_pending_ops(app, batch), name="pending-writer")
+    pending_writer.start()
+    application.bot_data["pending_writer"] = pending_writer
+    logger.info(
+        f"Hydrated warnings for {sum(len(w) for w in warnings.values())} users "
+        f"and {len(pending)} pending join requests from the database, "
+        f"pruned {pruned} expired warnings"
+    )
+
+async def stop_persistence(application):
+    """Flush and stop the write-behind queues; called once at shutdown"""
+    for name in ("warning_writer", "pending_writer"):
+        writer = application.bot_data.pop(name, None)
+        if writer is not None:
+            await writer.stop()
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+def retry_after_seconds(error):
+    """Seconds a RetryAfter-style error asks us to wait, or None for other errors
+
+    RetryAfter.retry_after is an int in older python-telegram-bot releases and
+    a timedelta in newer ones.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        return None
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity`"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self):
+        """True when the bucket is full again, so forgetting it changes nothing"""
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+    def delay(self, now=None):
+        """Seconds until a token can be taken (0 when one is available now)"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+
+    def take(self):
+        """Consume one token; call after delay() returned 0"""
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Hand out nothing for `seconds` (e.g. after a RetryAfter)"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+
+    async def acquire(self):
+        """Wait for a token and consume it"""
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.take()
+                return
+            await asyncio.sleep(wait)
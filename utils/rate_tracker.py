@@ -0,0 +1,79 @@
+import logging
+import math
+from config import (
+    SLOW_MODE_AUTO_WINDOW,
+    SLOW_MODE_AUTO_THRESHOLD,
+    SLOW_MODE_AUTO_STEPS,
+    SLOW_MODE_AUTO_HYSTERESIS,
+    SLOW_MODE_AUTO_MIN_DWELL,
+)
+
+logger = logging.getLogger(__name__)
+
+class ChatRate:
+    """Exponentially weighted message rate of one chat plus its auto slow mode level
+
+    Each message costs one exp() and a few multiplications. Level N (1-based)
+    means slow mode is set to SLOW_MODE_AUTO_STEPS[N - 1] seconds; level 0 is off.
+    """
+
+    __slots__ = ("rate", "last", "level", "changed_at")
+
+    def __init__(self):
+        self.rate = 0.0  # messages per second
+        self.last = 0.0
+        self.level = 0
+        self.changed_at = 0.0
+
+    def current(self, now):
+        """Rate estimate at `now`, decayed since the last message"""
+        return self.rate * math.exp(-(now - self.last) / SLOW_MODE_AUTO_WINDOW)
+
+    def observe(self, now):
+        """Account for one message at `now` and return the new rate"""
+        self.rate = self.current(now) + 1.0 / SLOW_MODE_AUTO_WINDOW
+        self.last = now
+        return self.rate
+
+    @staticmethod
+    def threshold(level):
+        """Rate at which `level` is switched on"""
+        return SLOW_MODE_AUTO_THRESHOLD * 2 ** (level - 1)
+
+    def target_level(self, now):
+        """Return the level slow mode should move to, or None to keep the current one
+
+        Levels go up as soon as the rate crosses their threshold. They come down
+        one step at a time, only after the rate has fallen below a fraction
+        (SLOW_MODE_AUTO_HYSTERESIS) of the current level's threshold and the
+        level has been held for SLOW_MODE_AUTO_MIN_DWELL seconds.
+        """
+        rate = self.current(now)
+        level = self.level
+        while level < len(SLOW_MODE_AUTO_STEPS) and rate >= self.threshold(level + 1):
+            level += 1
+        if level > self.level:
+            return level
+
+        if (self.level > 0
+                and rate < self.threshold(self.level) * SLOW_MODE_AUTO_HYSTERESIS
+                and now - self.changed_at >= SLOW_MODE_AUTO_MIN_DWELL):
+            return self.level - 1
+        return None
+
+    def set_level(self, level, now):
+        self.level = level
+        self.changed_at = now
+
+    def interval(self):
+        """Slow mode delay in seconds for the current level"""
+        return SLOW_MODE_AUTO_STEPS[self.level - 1] if self.level else 0
+
+def get_chat_rate(bot_data, chat_id):
+    """Return the rate tracker for a chat"""
+    rates = bot_data.setdefault("chat_rates", {})
+    chat_rate = rates.get(chat_id)
+    if chat_rate is None:
+        chat_rate = ChatRate()
+        rates[chat_id] = chat_rate
+    return chat_rate
@@ -0,0 +1,75 @@
+import logging
+import random
+import time
+from config import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_DEADLINE
+from utils.rate_limit import retry_after_seconds
+
+try:
+    from telegram.error import RetryAfter, TimedOut, NetworkError, BadRequest
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import RetryAfter, TimedOut, NetworkError, BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Error classes
+RATE_LIMITED = "rate_limited"
+RETRYABLE = "retryable"
+PERMANENT = "permanent"
+
+# Calls whose repetition has no further effect, safe to retry after any
+# transient error. Everything else (sends, forwards, ...) is only retried
+# when the request cannot have reached Telegram.
+IDEMPOTENT_PREFIXES = ("get", "edit", "delete", "set", "ban", "unban", "restrict", "pin", "unpin")
+IDEMPOTENT_ENDPOINTS = frozenset({"approveChatJoinRequest", "declineChatJoinRequest", "answerCallbackQuery"})
+
+# httpx errors raised before the request was written
+_UNSENT_CAUSES = frozenset({"ConnectError", "ConnectTimeout", "PoolTimeout"})
+
+def classify_error(error):
+    """Return RATE_LIMITED, RETRYABLE or PERMANENT for an exception from a Bot API call"""
+    if isinstance(error, RetryAfter):
+        return RATE_LIMITED
+    # BadRequest derives from NetworkError but is the caller's fault
+    if isinstance(error, NetworkError) and not isinstance(error, BadRequest):
+        return RETRYABLE
+    return PERMANENT
+
+def is_idempotent(endpoint):
+    return endpoint in IDEMPOTENT_ENDPOINTS or endpoint.startswith(IDEMPOTENT_PREFIXES)
+
+def never_sent(error):
+    """True if a network error happened before the request reached Telegram"""
+    cause = error.__cause__
+    return (cause is not None and type(cause).__name__ in _UNSENT_CAUSES) or "Pool timeout" in str(error)
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def retry_delay(error, endpoint, attempt, started_at):
+    """Decide whether a failed call is tried again
+
+    Args:
+        error: The exception raised by the call
+        endpoint: Bot API method name, e.g. "sendMessage"
+        attempt: Number of tries made so far
+        started_at: time.monotonic() when the first try started
+
+    Returns:
+        tuple: (error class, seconds to wait), with None as the delay when the
+               error should reach the caller
+    """
+    kind = classify_error(error)
+    if kind == PERMANENT or attempt >= RETRY_MAX_ATTEMPTS:
+        return kind, None
+    if kind == RATE_LIMITED:
+        delay = retry_after_seconds(error)
+    else:
+        # A timed-out send may have been delivered; sending again could duplicate it
+        if not is_idempotent(endpoint) and not never_sent(error):
+            return kind, None
+        delay = backoff_delay(attempt - 1)
+    if time.monotonic() + delay - started_at > RETRY_DEADLINE:
+        return kind, None
+    return kind, delay
@@ -0,0 +1,193 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from config import (
+    GATEWAY_GLOBAL_RATE,
+    GATEWAY_PRIVATE_RATE,
+    GATEWAY_GROUP_RATE,
+    GATEWAY_CHAT_BURST,
+    GATEWAY_CHAT_BUCKETS,
+)
+from utils.rate_limit import TokenBucket
+from utils.retry_policy import retry_delay, RATE_LIMITED
+from utils.metrics import set_gauge, inc
+
+try:
+    from telegram.ext import BaseRateLimiter
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Priority classes of message calls; lower values get global tokens first.
+# Moderation actions (deletes, bans, restrictions) are not message calls and
+# never wait for a token.
+PRIORITY_MODERATION = 0
+PRIORITY_JOIN = 1
+PRIORITY_DEFAULT = 2
+PRIORITY_CHATTER = 3
+
+# Edits of one message that are still waiting are superseded by newer ones
+EDIT_ENDPOINTS = frozenset({"editMessageText", "editMessageCaption", "editMessageReplyMarkup"})
+
+_priority = contextvars.ContextVar("send_priority", default=None)
+
+@contextlib.contextmanager
+def send_priority(priority):
+    """Give the API calls made inside this block a priority class
+
+    Example:
+        with send_priority(PRIORITY_CHATTER):
+            await message.reply_text(answer)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+# Calls starting with these names post or change messages. Only these count
+# against Telegram's message limits; reads and moderation actions do not.
+MESSAGE_ENDPOINT_PREFIXES = ("send", "edit", "copy", "forward")
+NON_MESSAGE_ENDPOINTS = frozenset({"sendChatAction"})
+
+def _is_message_call(endpoint):
+    return endpoint.startswith(MESSAGE_ENDPOINT_PREFIXES) and endpoint not in NON_MESSAGE_ENDPOINTS
+
+class SendGateway(BaseRateLimiter):
+    """Rate limiter every Bot API call of the application goes through
+
+    Installed with ApplicationBuilder.rate_limiter(), so handlers keep calling
+    bot methods as before. Only message calls (sends, edits, copies, forwards)
+    are limited: each first takes a token from its chat's bucket
+    (GATEWAY_PRIVATE_RATE for private chats, GATEWAY_GROUP_RATE for groups),
+    then one from the global bucket, which goes to the waiting call with the
+    best priority class. Reads and moderation actions go straight through.
+    An edit still waiting for its chat when a newer edit of the same message
+    arrives is dropped and reports success. Failures are retried as
+    utils.retry_policy decides: a RetryAfter pauses the global bucket, transient
+    network errors back off with jitter.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(GATEWAY_GLOBAL_RATE)
+        self._chat_buckets = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._edits = {}
+        self._ready = None
+        self._task = None
+
+    async def initialize(self) -> None:
+        self._ready = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= GATEWAY_CHAT_BUCKETS:
+                self._chat_buckets = {key: b for key, b in self._chat_buckets.items() if not b.idle}
+            # Positive IDs are private chats; groups and channels are negative
+            rate = GATEWAY_PRIVATE_RATE if isinstance(chat_id, int) and chat_id > 0 else GATEWAY_GROUP_RATE
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, GATEWAY_CHAT_BURST)
+        return bucket
+
+    async def _run(self):
+        # Hands out global tokens, best priority first
+        while True:
+            if not self._waiters:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            wait = self.bucket.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, turn = heapq.heappop(self._waiters)
+            set_gauge("send_gateway_waiting", len(self._waiters))
+            if not turn.done():
+                self.bucket.take()
+                turn.set_result(None)
+
+    async def _global_turn(self, priority):
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), turn))
+        set_gauge("send_gateway_waiting", len(self._waiters))
+        self._ready.set()
+        await turn
+
+    async def _chat_turn(self, chat_id, edit_key, generation):
+        """Wait for a chat token; returns False if a newer edit superseded this one"""
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            if edit_key is not None and self._edits.get(edit_key) != generation:
+                return False
+            wait = bucket.delay()
+            if wait <= 0:
+                bucket.take()
+                if edit_key is not None:
+                    del self._edits[edit_key]
+                return True
+            await asyncio.sleep(wait)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        message_call = _is_message_call(endpoint)
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            priority = rate_limit_args["priority"]
+        else:
+            priority = _priority.get()
+            if priority is None:
+                priority = PRIORITY_DEFAULT
+
+        if chat_id is not None and message_call:
+            edit_key = None
+            generation = None
+            if endpoint in EDIT_ENDPOINTS and "message_id" in data:
+                edit_key = (endpoint, chat_id, data["message_id"])
+                generation = self._edits.get(edit_key, 0) + 1
+                self._edits[edit_key] = generation
+            if not await self._chat_turn(chat_id, edit_key, generation):
+                inc("send_gateway_coalesced")
+                return True
+
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            if message_call:
+                await self._global_turn(priority)
+            attempt += 1
+            try:
+                result = await callback(*args, **kwargs)
+            except Exception as e:
+                kind, delay = retry_delay(e, endpoint, attempt, started_at)
+                if delay is None:
+                    inc(f"api_calls_failed_{kind}")
+                    raise
+                inc(f"api_retries_{kind}")
+                if kind == RATE_LIMITED:
+                    # Flood control applies to the whole bot, so every call waits
+                    self.bucket.pause(delay)
+                    logger.warning(f"Rate limited on {endpoint}, pausing all sends for {delay}s")
+                    if not message_call:
+                        await asyncio.sleep(delay)
+                else:
+                    logger.warning(f"{endpoint} failed ({e}), retry {attempt} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                continue
+            inc("api_calls_ok" if attempt == 1 else "api_calls_ok_after_retry")
+            return result
@@ -1,10 +1,18 @@
 import logging
-from telegram import Bot
-from telegram.error import TelegramError
+
+try:
+    from telegram import Bot
+    from telegram.error import TelegramError
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import Bot, TelegramError
 
 logger = logging.getLogger(__name__)
 
-async def check_user_membership(bot: Bot, channel_id: str, user_id: int) -> bool:
+# Chat member statuses that count as being in a channel
+MEMBER_STATUSES = ('member', 'administrator', 'creator')
+
+async def check_user_membership(bot: Bot, channel_id, user_id: int):
     """
     Check if a user is a member of a specific channel
     
@@ -14,14 +22,14 @@ async def check_user_membership(bot: Bot, channel_id: str, user_id: int) -> bool
         user_id: User ID to check
         
     Returns:
-        bool: True if user is a member, False otherwise
+        bool: True if user is a member, False if not, None if the lookup failed
     """
     try:
         chat_member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
-        return chat_member.status in ['member', 'administrator', 'creator']
+        return chat_member.status in MEMBER_STATUSES
     except TelegramError as e:
         logger.error(f"Error checking membership status for user {user_id} in channel {channel_id}: {e}")
-        return False
+        return None
 
 async def send_formatted_message(bot: Bot, chat_id: int, text: str, **kwargs) -> bool:
     """
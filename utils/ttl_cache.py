@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+class TTLCache:
+    """Read-through cache whose entries expire `ttl` seconds after loading
+
+    Falsy values expire after `negative_ttl` instead when it is given, so a
+    negative answer is re-checked sooner than a positive one. Concurrent
+    misses for one key share a single load. When full, the oldest entry is
+    evicted.
+    """
+
+    def __init__(self, ttl, max_entries, negative_ttl=None):
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, key, value):
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        ttl = self.ttl if value else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def peek(self, key, default=None):
+        """Return the cached value for `key` without loading"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return default
+
+    async def get(self, key, load):
+        """Return the cached value for `key`, awaiting load(key) on a miss
+
+        `load` must not raise; it is expected to fall back on its own. A load
+        returning None is passed through without being cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[key] = loading
+        try:
+            value = await load(key)
+            if value is not None:
+                self.put(key, value)
+            loading.set_result(value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+            if not loading.done():
+                loading.cancel()
@@ -0,0 +1,88 @@
+import logging
+from collections import deque
+from utils.metrics import set_gauge
+
+try:
+    from telegram.ext import BaseUpdateProcessor
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+def update_key(update):
+    """Key whose updates must be handled in order, or None if any order will do
+
+    Callback queries are keyed by the user pressing the button; everything
+    else by its chat, falling back to the user for chat-less updates.
+    """
+    if getattr(update, "callback_query", None) is not None:
+        return ("user", update.callback_query.from_user.id)
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return ("chat", chat.id)
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return ("user", user.id)
+    return None
+
+class KeyedUpdateProcessor(BaseUpdateProcessor):
+    """Handle updates of different chats concurrently, each chat's in order
+
+    Installed with ApplicationBuilder.concurrent_updates(); the base class
+    keeps at most `max_concurrent_updates` updates in do_process_update().
+    The first update of a key runs its key's queue in that slot; updates of
+    the same key arriving meanwhile are appended to the queue and give their
+    slot back at once. A chat with a backlog therefore holds one slot, and a
+    slow handler only delays later updates of its own chat. An update keeps its
+    chat's turn until every handler group has finished with it; work that may
+    take long (an AI reply, say) is for handlers to start in the background.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._queues = {}
+        self._waiting = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update, coroutine):
+        key = update_key(update)
+        if key is None:
+            await coroutine
+            return
+        queue = self._queues.get(key)
+        if queue is not None:
+            # The slot already running this key picks it up in turn
+            queue.append(coroutine)
+            self._set_waiting(1)
+            return
+
+        queue = self._queues[key] = deque()
+        try:
+            await self._run(key, coroutine)
+            while queue:
+                coroutine = queue.popleft()
+                self._set_waiting(-1)
+                await self._run(key, coroutine)
+        finally:
+            del self._queues[key]
+            # Only left over if this runner was cancelled
+            for coroutine in queue:
+                coroutine.close()
+            self._set_waiting(-len(queue))
+
+    async def _run(self, key, coroutine):
+        # A failure must not strand the updates queued behind it
+        try:
+            await coroutine
+        except Exception as e:
+            logger.error(f"Processing an update for {key} failed: {e}")
+
+    def _set_waiting(self, change):
+        self._waiting += change
+        set_gauge("updates_waiting", self._waiting)
@@ -0,0 +1,116 @@
+import asyncio
+import hmac
+import logging
+import threading
+from config import (
+    WEBHOOK_URL,
+    WEBHOOK_URL_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_START_TIMEOUT,
+)
+try:
+    from telegram import Update
+except ImportError:
+    # In development mode, import from our mock module
+    from mock_telegram import Update
+from utils.app_factory import build_application, register_handlers
+from utils.metrics import inc
+
+logger = logging.getLogger(__name__)
+
+class WebhookRuntime:
+    """The bot Application on its own event loop, fed by a web framework's webhook route
+
+    start() runs the loop in a daemon thread: the application is built,
+    initialized and started, and the webhook is registered with Telegram when
+    WEBHOOK_URL is set (leave it unset to POST recorded updates locally).
+    WEBHOOK_SECRET_TOKEN must be set: every web worker has to check the same
+    secret Telegram was given, so one made up per process will not do.
+    The web thread only checks the secret and hands the raw JSON to submit(),
+    which schedules it onto the loop and returns at once; parsing and
+    handling happen on the loop.
+    """
+
+    def __init__(self):
+        self.secret_token = WEBHOOK_SECRET_TOKEN
+        self.application = None
+        self._loop = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._ready.is_set() and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the bot loop thread and wait until it accepts updates
+
+        Returns:
+            bool: True if the bot came up within WEBHOOK_START_TIMEOUT
+        """
+        if not self.secret_token:
+            logger.error("WEBHOOK_SECRET_TOKEN is not set; refusing to start in webhook mode")
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._thread_main, name="bot-loop", daemon=True)
+            self._thread.start()
+        return self._ready.wait(WEBHOOK_START_TIMEOUT)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._startup())
+        except Exception as e:
+            logger.error(f"Bot failed to start in webhook mode: {e}", exc_info=True)
+            return
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _startup(self):
+        application = build_application()
+        register_handlers(application)
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        self.application = application
+
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_URL_PATH,
+                secret_token=self.secret_token,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+            logger.info(f"Webhook set to {WEBHOOK_URL.rstrip('/')}{WEBHOOK_URL_PATH}")
+        else:
+            logger.info(f"WEBHOOK_URL not set; accepting locally POSTed updates at {WEBHOOK_URL_PATH}")
+
+    def check_secret(self, token):
+        """Compare the X-Telegram-Bot-Api-Secret-Token header in constant time"""
+        if not self.secret_token:
+            return False
+        return hmac.compare_digest((token or "").encode(), self.secret_token.encode())
+
+    def submit(self, data):
+        """Queue one raw update (decoded JSON) for the bot loop; safe from any thread
+
+        Returns:
+            bool: False if the bot is not running, so the caller can ask Telegram to retry
+        """
+        if not self.running:
+            return False
+        self._loop.call_soon_threadsafe(self._enqueue, data)
+        inc("webhook_updates_received")
+        return True
+
+    def _enqueue(self, data):
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            logger.error(f"Dropping malformed update {data.get('update_id')}: {e}")
+            return
+        self.application.update_queue.put_nowait(update)